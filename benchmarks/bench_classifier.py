@@ -0,0 +1,104 @@
+"""
+Offline benchmark for the page classifier: classifications/sec and precision/recall on a labeled corpus.
+
+Usage: python benchmarks/bench_classifier.py [--corpus FILE] [--iterations 2000] [--set working_quality=6 ...]
+
+"Broken" is the positive class, since red cells are what the bot reports.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import fields, replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_classifier import DEFAULT_THRESHOLDS, ClassifierThresholds, PageFeatures, classify_page
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classifier_corpus.jsonl')
+
+def load_corpus(path):
+    """Read (features, label, note) records from a JSONL corpus"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get('label') not in ('working', 'broken'):
+                raise ValueError(f"{path}:{line_number}: label must be 'working' or 'broken'")
+            records.append((PageFeatures.from_dict(data), data['label'], data.get('note', '')))
+    return records
+
+def parse_overrides(pairs):
+    """Turn ['working_quality=6', ...] into a ClassifierThresholds"""
+    known = {f.name: f.type for f in fields(ClassifierThresholds)}
+    overrides = {}
+    for pair in pairs:
+        name, _, value = pair.partition('=')
+        if name not in known:
+            raise SystemExit(f"Unknown threshold '{name}'. Known: {', '.join(sorted(known))}")
+        overrides[name] = float(value) if known[name] in (float, 'float') else int(value)
+    return replace(DEFAULT_THRESHOLDS, **overrides)
+
+def evaluate(records, thresholds):
+    """Return confusion counts and the misclassified records"""
+    counts = {'tp': 0, 'fp': 0, 'tn': 0, 'fn': 0}
+    mistakes = []
+    for features, label, note in records:
+        verdict = classify_page(features, thresholds)
+        predicted_broken = not verdict.is_working
+        actually_broken = label == 'broken'
+        if predicted_broken and actually_broken:
+            counts['tp'] += 1
+        elif predicted_broken:
+            counts['fp'] += 1
+            mistakes.append((note, label, verdict))
+        elif actually_broken:
+            counts['fn'] += 1
+            mistakes.append((note, label, verdict))
+        else:
+            counts['tn'] += 1
+    return counts, mistakes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='labeled JSONL corpus')
+    parser.add_argument('--iterations', type=int, default=2000, help='passes over the corpus for timing')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='NAME=VALUE',
+                        help='override a ClassifierThresholds field, may be repeated')
+    args = parser.parse_args()
+
+    records = load_corpus(args.corpus)
+    thresholds = parse_overrides(args.overrides)
+
+    features_only = [features for features, _, _ in records]
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for features in features_only:
+            classify_page(features, thresholds)
+    elapsed = time.perf_counter() - start
+    total = args.iterations * len(features_only)
+
+    counts, mistakes = evaluate(records, thresholds)
+    precision = counts['tp'] / (counts['tp'] + counts['fp']) if counts['tp'] + counts['fp'] else 0.0
+    recall = counts['tp'] / (counts['tp'] + counts['fn']) if counts['tp'] + counts['fn'] else 0.0
+    accuracy = (counts['tp'] + counts['tn']) / len(records) if records else 0.0
+
+    print(f"Corpus: {args.corpus} ({len(records)} pages)")
+    if args.overrides:
+        print(f"Threshold overrides: {', '.join(args.overrides)}")
+    print(f"Throughput: {total / elapsed:,.0f} classifications/sec ({total} in {elapsed:.3f}s)")
+    print(f"Confusion (positive = broken): TP={counts['tp']} FP={counts['fp']} TN={counts['tn']} FN={counts['fn']}")
+    print(f"Precision: {precision:.3f}  Recall: {recall:.3f}  Accuracy: {accuracy:.3f}")
+
+    if mistakes:
+        print("\nMisclassified:")
+        for note, label, verdict in mistakes:
+            predicted = 'working' if verdict.is_working else 'broken'
+            print(f"- [{label} -> {predicted}] {note}: {verdict.reason} ({verdict.tier})")
+
+if __name__ == '__main__':
+    main()
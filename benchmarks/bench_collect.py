@@ -0,0 +1,147 @@
+"""
+Benchmark collecting the URLs to check from a sheet. The original collection visited every cell,
+went through re's pattern cache and urlparse()d every match, and kept one dict per URL with per-cell lists
+of processed URLs. The current one scans column by column, skips empty and URL-free cells, extracts
+once per distinct cell text with precompiled patterns and keeps slotted UrlTask records.
+
+Usage: python benchmarks/bench_collect.py [--rows 2000] [--columns 50]
+
+"Retained" is the memory held by the collected tasks; "peak" also counts what collection
+allocated on the way. The sheet values themselves are allocated before measuring.
+"""
+import argparse
+import gc
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import url_checker_bot as bot
+
+def is_valid_url(url):
+    """The original validation, one urlparse per URL"""
+    try:
+        parsed = urlparse(url)
+        domain = parsed.netloc
+        if not domain:
+            if '.' in url and not url.startswith(('http://', 'https://')):
+                return is_valid_url('http://' + url)
+            return False
+        return '.' in domain
+    except Exception:
+        return False
+
+def extract_with_urlparse(text):
+    """The original extraction: the pattern looked up through re.findall for every cell"""
+    if not text:
+        return []
+    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^/\s]*)*(?:\?[^\s]*)?(?:#[^\s]*)?'
+    valid_urls = []
+    for url in re.findall(url_pattern, text):
+        url = url.strip()
+        if url.endswith(('.', ',', ')', ']', '}', ':', ';')):
+            url = url[:-1]
+        if is_valid_url(url):
+            valid_urls.append(url)
+    return valid_urls
+
+def collect_with_dicts(sheet, all_values, columns):
+    """The collection loop as it was: one dict per URL, processed URLs tracked in lists per 'N5' cell id"""
+    urls_to_check = []
+    processed_cell_urls = {}
+    column_indices = [bot.column_to_index(col) for col in columns]
+    for row_idx in range(1, len(all_values)):
+        row_data = all_values[row_idx]
+        for col_idx in column_indices:
+            cell_content = row_data[col_idx] if col_idx < len(row_data) else ""
+            if not cell_content.strip():
+                continue
+            col_name = bot.index_to_column(col_idx)
+            cell_id = f"{col_name}{row_idx + 1}"
+            urls = extract_with_urlparse(cell_content)
+            if cell_id not in processed_cell_urls:
+                processed_cell_urls[cell_id] = []
+            if urls:
+                for url in reversed(urls):
+                    if url in processed_cell_urls[cell_id]:
+                        continue
+                    urls_to_check.append({'url': url, 'sheet': sheet, 'row': row_idx + 1, 'col': col_name,
+                                          'original_content': cell_content, 'is_last_url': (url == urls[-1])})
+                    processed_cell_urls[cell_id].append(url)
+            else:
+                possible_url = cell_content
+                if not possible_url.startswith(('http://', 'https://')):
+                    possible_url = 'http://' + possible_url
+                urls_to_check.append({'url': possible_url, 'sheet': sheet, 'row': row_idx + 1, 'col': col_name,
+                                      'original_content': cell_content, 'is_potential_url': True,
+                                      'is_last_url': True})
+                processed_cell_urls[cell_id].append(possible_url)
+    return urls_to_check
+
+def make_sheet(rows, columns, seed):
+    """Sheet values where most cells hold one URL, some several, some plain domains and some nothing"""
+    rng = random.Random(seed)
+    pages = [f"https://offers{n}.example.com/landing/{n}?utm_source=fb&utm_campaign=c{n % 13}" for n in range(400)]
+    values = [[f"Column {col}" for col in range(columns)]]
+    for _ in range(rows):
+        row = []
+        for _ in range(columns):
+            roll = rng.random()
+            if roll < 0.15:
+                row.append('')
+            elif roll < 0.8:
+                row.append(rng.choice(pages))
+            elif roll < 0.95:
+                row.append(f"old: {rng.choice(pages)}\nnew: {rng.choice(pages)}")
+            else:
+                row.append(f"offers{rng.randrange(400)}.example.com")
+        values.append(row)
+    return values
+
+def measure(collect, values, columns):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    tasks = collect(None, values, columns)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Timed again without tracemalloc, which slows allocation down
+    gc.collect()
+    started = time.perf_counter()
+    collect(None, values, columns)
+    untraced = time.perf_counter() - started
+    return len(tasks), min(elapsed, untraced), retained, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark URL collection time and memory")
+    parser.add_argument('--rows', type=int, default=2000, help="Sheet rows")
+    parser.add_argument('--columns', type=int, default=50, help="URL columns checked")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    values = make_sheet(args.rows, args.columns, args.seed)
+    columns = [bot.index_to_column(index) for index in range(args.columns)]
+    print(f"{args.rows} rows x {args.columns} columns = {args.rows * args.columns} cells")
+    print(f"{'collection':24} {'tasks':>8} {'time':>8} {'retained':>10} {'peak':>10} {'per task':>9}")
+    for name, collect in (("original", collect_with_dicts), ("column-major, UrlTask", bot.collect_urls_to_check)):
+        count, elapsed, retained, peak = measure(collect, values, columns)
+        print(f"{name:24} {count:8} {elapsed:7.2f}s {retained / 1e6:8.1f}MB {peak / 1e6:8.1f}MB "
+              f"{retained / max(count, 1):7.0f}B")
+
+    texts = [text for row in values[1:] for text in row]
+    extractors = (("extract, original", extract_with_urlparse), ("extract, precompiled", bot.extract_urls_from_text))
+    for name, extract in extractors:
+        started = time.perf_counter()
+        for text in texts:
+            extract(text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:24} {len(texts):8} cells {elapsed / len(texts) * 1e6:6.2f}us per cell")
+
+if __name__ == '__main__':
+    main()
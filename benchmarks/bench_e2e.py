@@ -0,0 +1,131 @@
+"""
+Offline end-to-end benchmark: runs the bot's checking pipeline (verdict cache, breaker,
+static tier, render tier) against generated URLs on a local fixture server, without Sheets.
+
+Usage: python benchmarks/bench_e2e.py [--urls 2000] [--concurrency 8] [--render] [--breaker] [--kinds ok,parked,...]
+
+Reports URLs/sec, p50/p95 latency per tier, peak RSS and classification accuracy per
+fixture kind. Without --render the plframe and js_error fixtures can only be judged
+from their static HTML, so some of them are expected to be misclassified.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import resource
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import url_checker_bot as bot
+from fixture_server import FIXTURE_KINDS, FixtureServer
+from host_health import percentile
+from metrics import process_rss_bytes
+from url_traces import url_trace
+
+STATIC_STAGES = ('dns', 'ttfb', 'download', 'parse')
+RENDER_STAGES = ('navigation', 'dom_probe')
+
+class MemorySink:
+    """Keeps trace records in a list instead of a file"""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+async def run_checks(urls, concurrency, render):
+    """Evaluate every (url, kind, label) with concurrency workers; returns their trace records"""
+    sink = MemorySink()
+    queue = asyncio.Queue()
+    for item in urls:
+        queue.put_nowait(item)
+
+    async def worker():
+        driver = await asyncio.to_thread(bot.run_context.browser_pool.acquire) if render else None
+        try:
+            while not queue.empty():
+                url, kind, label = queue.get_nowait()
+                with url_trace(sink, url, kind=kind, expected=label) as trace:
+                    verdict = await bot.evaluate_url(driver, url)
+                    trace.fields.update(tier=verdict.tier, label='working' if verdict.is_working else 'broken')
+        finally:
+            if driver is not None:
+                bot.run_context.browser_pool.release(driver)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sink.records
+
+def stage_seconds(record, stages):
+    return sum(record['stages'].get(stage, 0.0) for stage in stages)
+
+def report(records, elapsed, render):
+    lines = [f"{len(records)} URLs in {elapsed:.2f}s: {len(records) / elapsed:.1f} URLs/sec"]
+
+    lines.append("\nLatency (seconds):")
+    tiers = {
+        'static tier': [stage_seconds(r, STATIC_STAGES) for r in records if r['tier'] != 'breaker'],
+        'render tier': [stage_seconds(r, RENDER_STAGES) for r in records if r['stages'].get('navigation')],
+    }
+    for record in records:
+        tiers[f"total ({record['tier']} verdicts)"] = tiers.get(f"total ({record['tier']} verdicts)", []) + [record['total']]
+    for name, values in tiers.items():
+        if values:
+            lines.append(f"  {name:26} p50 {percentile(values, 0.5):7.3f}  p95 {percentile(values, 0.95):7.3f}  "
+                         f"({len(values)} URLs)")
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+    lines.append(f"\nPeak RSS: {peak_kb / 1024:.1f} MB (bot process)")
+    if render:
+        lines.append(f"Chrome RSS at the end: {process_rss_bytes() / 1e6:.1f} MB")
+
+    correct = sum(r['label'] == r['expected'] for r in records)
+    lines.append(f"\nAccuracy: {correct}/{len(records)} ({correct / len(records):.1%})")
+    confusion = Counter((r['expected'], r['label']) for r in records)
+    lines.append("  expected -> got: " + ", ".join(f"{e}->{g} {n}" for (e, g), n in sorted(confusion.items())))
+    by_kind = defaultdict(lambda: [0, 0])
+    for record in records:
+        by_kind[record['kind']][0] += 1
+        by_kind[record['kind']][1] += record['label'] != record['expected']
+    lines.append("  per kind (URLs / misclassified):")
+    for kind, (count, wrong) in sorted(by_kind.items()):
+        lines.append(f"    {kind:13} {count:5} / {wrong:<5} expected {FIXTURE_KINDS[kind]}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--urls', type=int, default=2000, help="Generated URLs to check")
+    parser.add_argument('--concurrency', type=int, default=8, help="Checks in flight")
+    parser.add_argument('--render', action='store_true', help="Use Chrome for the render tier (needs chromedriver)")
+    parser.add_argument('--breaker', action='store_true',
+                        help="Keep the circuit breaker on (all fixtures share one host, so resets open it)")
+    parser.add_argument('--kinds', help="Comma-separated fixture kinds (default: all)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    bot.init()
+
+    kinds = args.kinds.split(',') if args.kinds else None
+    unknown = set(kinds or ()) - set(FIXTURE_KINDS)
+    if unknown:
+        parser.error(f"unknown fixture kinds: {', '.join(sorted(unknown))}")
+    if not args.breaker:
+        bot.host_health.failure_threshold = 10 ** 9
+    bot.run_context.verdict_cache.clear()
+
+    with FixtureServer() as server:
+        urls = server.urls(args.urls, kinds, args.seed)
+        started = time.monotonic()
+        # The bot logs every check; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = asyncio.run(run_checks(urls, args.concurrency, args.render))
+        elapsed = time.monotonic() - started
+    if args.render:
+        bot.run_context.browser_pool.close()
+    print(report(records, elapsed, args.render))
+
+if __name__ == '__main__':
+    main()
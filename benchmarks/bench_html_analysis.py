@@ -0,0 +1,106 @@
+"""
+Benchmark the HTML analysis stage: BeautifulSoup tree + find_all (old) vs the streaming backends,
+then throughput and event-loop lag when pages are analyzed through the process pool.
+
+Usage: python benchmarks/bench_html_analysis.py [--pages 200] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_analysis
+from html_analysis import analyze_html, analyze_html_async
+
+def make_page(blocks, seed):
+    """Synthetic landing page with nav, articles, forms, images and inline scripts"""
+    rng = random.Random(seed)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+    parts = ["<!DOCTYPE html><html><head><title>Offer page</title>",
+             "<style>body{font-family:Arial}</style><script>var cfg={a:1};</script></head><body>",
+             "<nav>" + "".join(f"<a href='/p{i}'>Link {i}</a>" for i in range(20)) + "</nav>"]
+    for i in range(blocks):
+        text = " ".join(rng.choice(words) for _ in range(40))
+        parts.append(f"<section><h2>Heading {i}</h2><p>{text}</p><p>{text}</p>"
+                     f"<img src='/img/{i}.png' alt='x'><!-- block {i} --></section>")
+        if i % 10 == 0:
+            parts.append("<form><input name='email'><button>Go</button></form>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def time_backend(backend, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        analyze_html(html, backend)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def available_backends():
+    backends = ['bs4', 'html.parser']
+    try:
+        import lxml.etree  # noqa: F401
+        backends.append('lxml')
+    except ImportError:
+        pass
+    return backends
+
+async def measure_pool(pages, backend, workers):
+    """Analyze all pages concurrently, tracking how late a 10ms ticker runs on the loop"""
+    max_lag = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not stop.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - expected)
+
+    ticker_task = asyncio.create_task(ticker())
+    # Warm up the pool so process start-up is not counted
+    await asyncio.gather(*(analyze_html_async(pages[0], backend, workers) for _ in range(max(workers, 1))))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(analyze_html_async(page, backend, workers) for page in pages))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker_task
+    html_analysis.shutdown_analysis_pool()
+    return elapsed, max_lag
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200, help='pages analyzed in the pool run')
+    parser.add_argument('--workers', default='0,1,2,4', help='comma-separated pool sizes (0 = thread)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed iterations per single-page measurement')
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print("Single page, on the calling thread (ms per page)")
+    print(f"{'page':>10} " + " ".join(f"{b:>12}" for b in backends))
+    for blocks in (10, 100, 1000):
+        html = make_page(blocks, blocks)
+        reference = analyze_html(html, 'bs4')
+        for backend in backends[1:]:
+            result = analyze_html(html, backend)
+            if {k: v for k, v in result.items() if k != 'backend'} != {k: v for k, v in reference.items() if k != 'backend'}:
+                print(f"  note: {backend} differs from bs4 on {blocks} blocks: {result} vs {reference}")
+        timings = [time_backend(backend, html, args.repeat) for backend in backends]
+        print(f"{len(html) // 1024:>8}KB " + " ".join(f"{t:>12.2f}" for t in timings))
+
+    backend = 'lxml' if 'lxml' in backends else 'html.parser'
+    pages = [make_page(200, seed) for seed in range(args.pages)]
+    print(f"\n{args.pages} pages of {len(pages[0]) // 1024}KB through analyze_html_async (backend={backend}, "
+          f"{os.cpu_count()} CPUs)")
+    print(f"{'workers':>8} {'pages/sec':>10} {'max loop lag ms':>16}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        elapsed, max_lag = asyncio.run(measure_pool(pages, backend, workers))
+        label = 'thread' if workers == 0 else str(workers)
+        print(f"{label:>8} {args.pages / elapsed:>10.1f} {max_lag * 1000:>16.1f}")
+
+if __name__ == '__main__':
+    main()
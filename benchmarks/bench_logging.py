@@ -0,0 +1,139 @@
+"""
+Benchmark the logging overhead of checking a URL: the old print() calls vs leveled logging
+through the queue (log_setup.py), at INFO (production) and DEBUG.
+
+Usage: python benchmarks/bench_logging.py [--urls 20000]
+
+"Caller" is the time spent in the checking code itself, which is what the event loop sees;
+"total" also waits for the queue listener to finish writing.
+"""
+import argparse
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_setup import configure_logging
+
+log = logging.getLogger('url_checker')
+
+class Features:
+    status_code = 200
+    static_paragraphs, static_headings, static_forms, static_images = 14, 5, 1, 9
+    static_text_length = 5321
+    rendered_paragraphs, rendered_headings, rendered_forms = 15, 5, 1
+    rendered_buttons, rendered_inputs, rendered_images = 3, 4, 9
+
+def check_with_print(url, urls, row, features):
+    """The messages one rendered URL check used to print"""
+    print(f"Extracted {len(urls)} valid URLs: {urls}")
+    print(f"Checking URL {row}/20000: {url} in cell N{row}")
+    print(f"=== Checking URL: {url} at cell N{row} (FINAL URL in cell) ===")
+    print(f"Checking full URL: {url}")
+    print(f"Response status code: {features.status_code}")
+    print(f"Final URL after redirects: {url}")
+    print(f"Page title: Landing page {row}")
+    print(f"Content elements: 29 (paragraphs: {features.static_paragraphs}, " +
+          f"headings: {features.static_headings}, forms: {features.static_forms}, images: {features.static_images})")
+    print(f"Text content length: {features.static_text_length} characters")
+    print("✅ Page has substantial content elements and text")
+    print("Performing thorough rendering check with Selenium")
+    print(f"Loading URL in Selenium (attempt 1): {url}")
+    print(f"Rendered text length: {features.static_text_length} characters")
+    print(f"Rendered content: {features.rendered_paragraphs} paragraphs, " +
+          f"{features.rendered_headings} headings, {features.rendered_forms} forms, " +
+          f"{features.rendered_buttons} buttons, {features.rendered_inputs} inputs, " +
+          f"{features.rendered_images} images")
+    print("Content quality score: 11")
+    print(f"✅ URL is working: {url} (Substantial rendered content)")
+    print(f"Marked cell N{row} as blue #0000EE using batch update API")
+    print(f"Marked cell N{row} as blue (#0000EE) for working URL")
+
+def check_with_logging(url, urls, row, features):
+    """The same messages as leveled log calls"""
+    log.debug("Extracted %s valid URLs: %s", len(urls), urls)
+    log.debug("Checking URL %s/%s: %s in cell %s", row, 20000, url, f"N{row}")
+    log.debug("=== Checking URL: %s at cell N%s %s ===", url, row, '(FINAL URL in cell)')
+    log.debug("Checking full URL: %s", url)
+    log.debug("Response status code: %s", features.status_code)
+    log.debug("Final URL after redirects: %s", url)
+    log.debug("Page title: %s", f"Landing page {row}")
+    log.debug("Content elements: %s (paragraphs: %s, headings: %s, forms: %s, images: %s)", 29,
+              features.static_paragraphs, features.static_headings, features.static_forms, features.static_images)
+    log.debug("Text content length: %s characters", features.static_text_length)
+    log.debug("✅ Page has substantial content elements and text")
+    log.debug("Performing thorough rendering check with Selenium")
+    log.debug("Loading URL in Selenium (attempt %s): %s", 1, url)
+    log.debug("Rendered text length: %s characters", features.static_text_length)
+    log.debug("Rendered content: %s paragraphs, %s headings, %s forms, %s buttons, %s inputs, %s images",
+              features.rendered_paragraphs, features.rendered_headings, features.rendered_forms,
+              features.rendered_buttons, features.rendered_inputs, features.rendered_images)
+    log.debug("Content quality score: %s", 11)
+    log.debug("✅ URL is working: %s (%s)", url, "Substantial rendered content")
+    log.debug("Marked cell N%s as blue #0000EE using batch update API", row)
+    log.debug("Marked cell N%s as blue (#0000EE) for working URL", row)
+
+def workload(count):
+    urls = [f"https://offers{n % 97}.example.com/landing/{n}?utm_source=fb&utm_campaign=c{n % 13}" for n in range(count)]
+    return [(url, urls[max(0, n - 2):n + 1], n + 2) for n, url in enumerate(urls)]
+
+def run_print(items, path):
+    features = Features()
+    with open(path, 'w', encoding='utf-8', buffering=1) as stream, redirect_stdout(stream):
+        started = time.perf_counter()
+        for url, urls, row in items:
+            check_with_print(url, urls, row, features)
+        caller = time.perf_counter() - started
+    return caller, caller
+
+def run_logging(items, path, level, queued=True):
+    features = Features()
+    with open(path, 'w', encoding='utf-8') as stream:
+        if queued:
+            listener = configure_logging(level, stream=stream)
+        else:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(message)s'))
+            root = logging.getLogger()
+            root.handlers[:] = [handler]
+            root.setLevel(level)
+        started = time.perf_counter()
+        for url, urls, row in items:
+            check_with_logging(url, urls, row, features)
+        caller = time.perf_counter() - started
+        if queued:
+            listener.stop()
+            atexit.unregister(listener.stop)
+        total = time.perf_counter() - started
+        logging.getLogger().handlers[:] = []
+    return caller, total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-URL logging overhead")
+    parser.add_argument('--urls', type=int, default=20000, help="Simulated URL checks")
+    args = parser.parse_args()
+
+    items = workload(args.urls)
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-logging-'), 'out.log')
+    modes = [
+        ("print() (before)", lambda: run_print(items, path)),
+        ("logging INFO, queued", lambda: run_logging(items, path, 'INFO')),
+        ("logging DEBUG, queued", lambda: run_logging(items, path, 'DEBUG')),
+        ("logging DEBUG, direct handler", lambda: run_logging(items, path, 'DEBUG', queued=False)),
+    ]
+    print(f"{args.urls} URL checks, 18 messages each")
+    print(f"{'mode':32} {'caller':>9} {'per URL':>9} {'total':>9} {'output':>10}")
+    for name, run in modes:
+        caller, total = run()
+        size = os.path.getsize(path)
+        print(f"{name:32} {caller:8.2f}s {caller / args.urls * 1e6:7.1f}us {total:8.2f}s {size / 1e6:8.1f}MB")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+if __name__ == '__main__':
+    main()
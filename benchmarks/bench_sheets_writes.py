@@ -0,0 +1,113 @@
+"""
+Sheets write-path benchmark against the local fake Sheets API (fake_sheets.py): formats cells
+red/blue through the bot's own functions and reports write throughput, 429s and backoff.
+
+Usage: python benchmarks/bench_sheets_writes.py [--cells 40] [--write-quota 60] [--limiter 60] [--latency 0.02]
+       python benchmarks/bench_sheets_writes.py --stragglers 200
+
+Set --limiter above --write-quota to see how the bot backs off from RESOURCE_EXHAUSTED.
+--stragglers times the end-of-sweep verification instead: it reads back that many cells that
+never got their color and rewrites them in bulk.
+Exits with status 1 when a cell ends up with the wrong color and is not queued for a retry.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import url_checker_bot as bot
+from fake_sheets import FakeSheets, FakeSheetsServer
+from host_health import percentile
+from run_context import RateLimiter
+
+SPREADSHEET_ID = 'bench-spreadsheet'
+COLUMN = 'N'
+RED = (0.95, 0.2, 0.1)
+BLUE = (0, 0, round(238 / 255, 4))
+
+def color_of(sheets, cell):
+    fmt = sheets.user_entered_format(SPREADSHEET_ID, 0, cell) or {}
+    color = fmt.get('textFormat', {}).get('foregroundColor', {})
+    return tuple(round(color.get(channel, 0), 4) for channel in ('red', 'green', 'blue'))
+
+def report_stragglers(sheets, sheet, args):
+    """Verify cells that were never written: one read back, one bulk rewrite"""
+    expected = [(sheet, row, COLUMN, 'red' if row % 2 == 0 else 'blue') for row in range(2, args.cells + 2)]
+    started = time.monotonic()
+    mismatched = asyncio.run(bot.verify_formats(expected))
+    elapsed = time.monotonic() - started
+    stats = sheets.stats()
+    wrong = [f"{COLUMN}{row}" for _, row, _, color in expected
+             if color_of(sheets, f"{COLUMN}{row}") != (RED if color == 'red' else BLUE)]
+    print(f"{args.cells} stragglers verified in {elapsed:.2f}s, {len(mismatched or [])} rewritten "
+          f"(one at a time with 120s pauses this took {args.cells * 2 / 60:.1f} hours)")
+    print(f"API requests: {stats['reads']} reads, {stats['writes']} writes, by method {stats['requests']}")
+    print(f"Wrong color: {len(wrong)}{' ' + ', '.join(wrong[:10]) if wrong else ''}")
+    return 1 if wrong else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Sheets write path against fake_sheets.py")
+    parser.add_argument('--cells', type=int, default=40, help="Cells to format (alternately red and blue)")
+    parser.add_argument('--write-quota', type=int, default=60, help="Fake API writes per minute")
+    parser.add_argument('--read-quota', type=int, default=60, help="Fake API reads per minute")
+    parser.add_argument('--limiter', type=int, help="Bot write limiter per minute (default: --write-quota)")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every fake API request")
+    parser.add_argument('--max-backoff', type=float, default=8,
+                        help="Cap on the bot's retry pause, to keep runs short (RATE_LIMIT_PAUSE_MAX)")
+    parser.add_argument('--stragglers', type=int, default=0,
+                        help="Time verifying and rewriting this many unformatted cells instead")
+    args = parser.parse_args()
+    bot.init()
+    if args.stragglers:
+        args.cells = args.stragglers
+
+    sheets = FakeSheets(args.read_quota, args.write_quota, args.latency)
+    sheets.add_sheet(SPREADSHEET_ID, 0, 'Sheet1',
+                     [['Name'] + [''] * 12 + ['URL']] +
+                     [[f"Row {row}"] + [''] * 12 + [f"https://example.com/{row}"] for row in range(2, args.cells + 2)])
+    bot.run_context.sheets_limiter = RateLimiter(args.limiter or args.write_quota)
+    bot.RATE_LIMIT_PAUSE_MAX = args.max_backoff
+
+    latencies = []
+    with FakeSheetsServer(sheets) as server:
+        bot.SHEETS_API_URL = server.base_url
+        bot.gspread_client = None
+        sheet = bot.get_gspread_client().open_by_key(SPREADSHEET_ID).get_worksheet(0)
+        if args.stragglers:
+            return report_stragglers(sheets, sheet, args)
+        started = time.monotonic()
+        # The bot logs every write; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for row in range(2, args.cells + 2):
+                call_started = time.monotonic()
+                if row % 2 == 0:
+                    bot.mark_cell_text_red(sheet, row, COLUMN)
+                else:
+                    bot.reset_cell_formatting(sheet, row, COLUMN)
+                latencies.append(time.monotonic() - call_started)
+        elapsed = time.monotonic() - started
+
+    stats = sheets.stats()
+    pending = {entry['format_key'] for entry in bot.run_context.pending_formats}
+    wrong = [f"{COLUMN}{row}" for row in range(2, args.cells + 2)
+             if color_of(sheets, f"{COLUMN}{row}") != (RED if row % 2 == 0 else BLUE)
+             and f"{COLUMN}{row}:{'red' if row % 2 == 0 else 'blue'}" not in pending]
+
+    print(f"{args.cells} cells in {elapsed:.1f}s: {args.cells / elapsed:.2f} cells/sec "
+          f"(bot limiter {args.limiter or args.write_quota}/min, fake quota {args.write_quota} writes/min)")
+    print(f"Per cell: p50 {percentile(latencies, 0.5):.2f}s  p95 {percentile(latencies, 0.95):.2f}s  "
+          f"max {max(latencies):.2f}s")
+    print(f"API requests: {stats['reads']} reads, {stats['writes']} writes ({stats['writes'] / args.cells:.2f} per cell), "
+          f"by method {stats['requests']}")
+    print(f"429 RESOURCE_EXHAUSTED: {stats['rate_limited'] or 'none'}")
+    print(f"Queued for a later retry: {len(pending)}")
+    print(f"Wrong color and not queued: {len(wrong)}{' ' + ', '.join(wrong[:10]) if wrong else ''}")
+    return 1 if wrong else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
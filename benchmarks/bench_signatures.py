@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: precompiled SignatureMatcher vs the per-phrase `in` loops it replaced.
+
+Usage: python benchmarks/bench_signatures.py [--size 200000] [--repeat 20] [--extra 400]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_signatures import DEFAULT_SIGNATURES, SignatureMatcher
+
+WORDS = ("the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet consectetur "
+         "adipiscing elit sed do eiusmod tempor <div class=\"row\"> <span> </span> <a href=\"/\"> "
+         "domain search offer page error found").split()
+
+def legacy_scan(text, signatures, placeholder_re):
+    """The loops check_url and analyze_domain_status used to run, one category at a time"""
+    found = {}
+    for category, phrases in signatures.items():
+        for phrase in phrases:
+            if phrase in text:
+                found[category] = phrase
+                break
+    if '{{' in text and '}}' in text:
+        found['template'] = '{{}}'
+    elif '{' in text and '}' in text:
+        match = placeholder_re.search(text)
+        if match:
+            found['template'] = match.group(0)
+    return found
+
+def make_body(size, seed):
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)
+
+def extra_signatures(count):
+    """Synthetic registrar/parking phrases, to show how each approach scales with the signature list"""
+    subjects = ["this", "our", "your", "the", "a"]
+    nouns = ["domain", "site", "page", "listing", "offer"]
+    return [f"{subjects[i % 5]} {nouns[(i // 5) % 5]} parked page {i}" for i in range(count)]
+
+def time_it(func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def run(signatures, bodies, repeat, label):
+    placeholder_re = re.compile(r'\{[a-zA-Z0-9_]+\}')
+    matcher = SignatureMatcher(signatures)
+    phrase_count = sum(len(phrases) for phrases in signatures.values())
+
+    print(f"\n{label}: {phrase_count} phrases, backend={matcher.backend}")
+    print(f"{'body':>12} {'legacy ms':>12} {'matcher ms':>12} {'speedup':>9}")
+    for name, body in bodies:
+        # Both approaches must agree before their timings mean anything
+        assert legacy_scan(body, signatures, placeholder_re) == matcher.scan(body), name
+        legacy_ms = time_it(lambda text: legacy_scan(text, signatures, placeholder_re), body, repeat)
+        matcher_ms = time_it(matcher.scan, body, repeat)
+        print(f"{name:>12} {legacy_ms:>12.3f} {matcher_ms:>12.3f} {legacy_ms / matcher_ms:>8.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000, help='characters in the large synthetic body')
+    parser.add_argument('--repeat', type=int, default=20, help='timed iterations per measurement')
+    parser.add_argument('--extra', type=int, default=400, help='synthetic phrases added for the scaling run')
+    args = parser.parse_args()
+
+    bodies = [
+        ('2KB text', make_body(2000, 1)),
+        ('50KB html', make_body(50000, 2)),
+        (f'{args.size // 1000}KB html', make_body(args.size, 3)),
+        ('parked page', make_body(5000, 4) + " this domain may be for sale. buy this domain {{offer}} "),
+    ]
+
+    run(DEFAULT_SIGNATURES, bodies, args.repeat, "Default signatures")
+
+    scaled = {category: list(phrases) for category, phrases in DEFAULT_SIGNATURES.items()}
+    scaled['parked'] = scaled['parked'] + extra_signatures(args.extra)
+    run(scaled, bodies, args.repeat, "Scaled signatures")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Local HTTP fixture server with synthetic landing pages for the end-to-end benchmark.
+
+Each URL is /<kind>/<n>; FIXTURE_KINDS lists the kinds and the verdict the bot
+should reach for them (with a browser). Everything is served from 127.0.0.1.
+"""
+import http.server
+import json
+import random
+import socket
+import struct
+import threading
+import time
+
+# kind -> expected label
+FIXTURE_KINDS = {
+    'ok': 'working',            # Fast 200 with real content
+    'slow': 'working',          # Same page after a 0.2-1.0s delay
+    'not_found': 'broken',      # 404
+    'server_error': 'broken',   # 500
+    'parked': 'broken',         # Parked-domain page
+    'error_page': 'broken',     # 200 with an error message
+    'plframe': 'broken',        # Parking page whose expiration notice is inside the plFrame iframe
+    'js_shell': 'working',      # Empty shell whose content is rendered by JavaScript
+    'js_error': 'broken',       # Shell whose JavaScript renders an error
+    'redirect': 'working',      # Three redirects, then a working page
+    'registrar': 'broken',      # Redirect to a registrar expiration page
+    'huge': 'working',          # ~3 MB body
+    'reset': 'broken',          # Connection reset without a response
+}
+
+CONTENT_PAGE = """<html><head><title>Landing page {n}</title></head><body>
+<h1>Get your free quote</h1><h2>Why choose us</h2>
+{paragraphs}
+<img src="/static/a.png"><img src="/static/b.png">
+<form action="/submit"><input name="email"><button>Submit</button></form>
+</body></html>"""
+
+PARKED_PAGE = """<html><head><title>example.com</title></head><body>
+<h1>This domain is for sale</h1><p>Buy this domain today.</p></body></html>"""
+
+ERROR_PAGE = """<html><head><title>Oops</title></head><body>
+<h1>This page isn't working</h1><p>Please try again later.</p></body></html>"""
+
+PLFRAME_PAGE = """<html><head><title>Parking</title></head><body>
+<iframe id="plFrame" src="/plframe_inner/{n}" width="100%" height="600"></iframe></body></html>"""
+
+PLFRAME_INNER = """<html><body><span>The domain has expired. Is this your domain? Renew now</span></body></html>"""
+
+JS_SHELL = """<html><head><title>App</title></head><body><div id="root"></div>
+<script>document.getElementById('root').innerHTML = {content};</script></body></html>"""
+
+def content_page(n, paragraph_count=6):
+    paragraphs = '\n'.join(f"<p>Paragraph {i} of landing page {n}: " + "lorem ipsum dolor sit amet " * 12 + "</p>"
+                           for i in range(paragraph_count))
+    return CONTENT_PAGE.format(n=n, paragraphs=paragraphs)
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, body, content_type='text/html'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        kind, n = parts[0], parts[1] if len(parts) > 1 else '0'
+        if kind in ('ok', 'slow', 'huge'):
+            if kind == 'slow':
+                time.sleep(random.Random(n).uniform(0.2, 1.0))
+            self._send(200, content_page(n, 6000 if kind == 'huge' else 6))
+        elif kind == 'not_found':
+            self._send(404, "<html><body><h1>Not Found</h1></body></html>")
+        elif kind == 'server_error':
+            self._send(500, "<html><body><h1>Internal Server Error</h1></body></html>")
+        elif kind == 'parked':
+            self._send(200, PARKED_PAGE)
+        elif kind == 'error_page':
+            self._send(200, ERROR_PAGE)
+        elif kind == 'plframe':
+            self._send(200, PLFRAME_PAGE.format(n=n))
+        elif kind == 'plframe_inner':
+            self._send(200, PLFRAME_INNER)
+        elif kind == 'js_shell':
+            self._send(200, JS_SHELL.format(content=json.dumps(content_page(n).split('<body>')[1].split('</body>')[0])))
+        elif kind == 'js_error':
+            self._send(200, JS_SHELL.format(content=json.dumps("<h1>This page isn't working</h1>")))
+        elif kind == 'redirect':
+            hops = int(parts[2]) if len(parts) > 2 else 3
+            self._redirect(f"/redirect/{n}/{hops - 1}" if hops > 1 else f"/ok/{n}")
+        elif kind == 'registrar':
+            self._redirect(f"/www.godaddy.com/expired/{n}")
+        elif kind == 'www.godaddy.com':
+            self._send(200, "<html><body><h1>Expired</h1><p>Renew at GoDaddy</p></body></html>")
+        elif kind == 'reset':
+            # Abort the connection with a RST instead of answering
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+            self.connection.close()
+        else:
+            self._send(404, "unknown fixture")
+
+    def log_message(self, format, *args):
+        return
+
+class QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Reset fixtures abort their own connections
+        pass
+
+class FixtureServer:
+    """Threaded fixture server on a free local port; use as a context manager"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.httpd = QuietServer((host, port), FixtureHandler)
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def urls(self, count, kinds=None, seed=1):
+        """count (url, kind, expected label) tuples with kinds mixed in at random"""
+        kinds = list(kinds or FIXTURE_KINDS)
+        rng = random.Random(seed)
+        return [(f"{self.base_url}/{kind}/{n}", kind, FIXTURE_KINDS[kind])
+                for n, kind in ((n, rng.choice(kinds)) for n in range(count))]
@@ -0,0 +1,258 @@
+"""Continuous check scheduler: cells in a priority queue ordered by next-due time, paced by a throughput budget"""
+import hashlib
+import heapq
+import json
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+SECONDS_PER_HOUR = 3600
+
+@dataclass
+class SchedulePolicy:
+    """How often a cell is rechecked, and how many checks per hour the bot may spend"""
+    working_interval_hours: float = 24      # Cells whose URL worked last time
+    broken_interval_hours: float = 6        # Red cells are rechecked sooner so recoveries show up
+    flapping_interval_hours: float = 2      # Cells whose verdict keeps changing
+    flap_changes: int = 2                   # Verdict changes within the history that count as flapping
+    history_size: int = 8                   # Verdicts remembered per cell
+    recent_edit_hours: float = 48           # Cells edited this recently ...
+    recent_edit_interval_hours: float = 6   # ... are rechecked this often
+    edit_delay_seconds: float = 60          # New or edited cells become due this soon
+    jitter_fraction: float = 0.1            # Spread due times so cells do not move in lockstep
+    checks_per_hour: float = 0              # Throughput budget, 0 = derive from the number of cells
+    min_checks_per_hour: float = 60
+    budget_headroom: float = 1.25           # Auto budget fits a day's checks into 24h / headroom
+
+class CellSchedule:
+    """Scheduling state for one cell"""
+    __slots__ = ('key', 'content_hash', 'payload', 'next_due', 'last_checked',
+                 'last_edited', 'verdicts', 'daily_checks')
+
+    def __init__(self, key, content_hash, payload, next_due, history_size):
+        self.key = key
+        self.content_hash = content_hash
+        self.payload = payload
+        self.next_due = next_due
+        self.last_checked = None
+        self.last_edited = None
+        self.verdicts = deque(maxlen=history_size)
+        self.daily_checks = 0.0  # This cell's share of the auto budget, 24 / interval_hours
+
+    def flap_count(self):
+        """Number of verdict changes in the remembered history"""
+        history = list(self.verdicts)
+        return sum(1 for previous, current in zip(history, history[1:]) if previous != current)
+
+def content_hash(content):
+    """Stable fingerprint of a cell's text, used to detect edits between sheet refreshes"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+class CheckScheduler:
+    """
+    Priority queue of cells keyed by next-due time. Due times come from the last
+    verdict, how often the verdict flapped and how recently the cell was edited;
+    next_check() hands out due cells no faster than the throughput budget allows.
+    """
+
+    def __init__(self, policy=None, clock=time.time, rng=None):
+        self.policy = policy or SchedulePolicy()
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.cells = {}
+        self._heap = []
+        self._sequence = 0
+        self._last_check_started = None
+        # Sum of the cells' daily_checks, kept up to date so next_check() does not walk every cell
+        self._daily_checks = 0.0
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _push(self, cell):
+        self._sequence += 1
+        heapq.heappush(self._heap, (cell.next_due, self._sequence, cell.key))
+
+    def checks_per_hour(self):
+        """Configured budget, or one derived from how often each cell is due per day"""
+        if self.policy.checks_per_hour > 0:
+            return self.policy.checks_per_hour
+        return max(self.policy.min_checks_per_hour, self._daily_checks / 24 * self.policy.budget_headroom)
+
+    def _update_daily_checks(self, cell, now):
+        daily_checks = 24 / self.interval_hours(cell, now)
+        self._daily_checks += daily_checks - cell.daily_checks
+        cell.daily_checks = daily_checks
+
+    def _recount_daily_checks(self, now):
+        """Recompute every cell's share of the budget - edits age out of the recent-edit window between refreshes"""
+        for cell in self.cells.values():
+            cell.daily_checks = 24 / self.interval_hours(cell, now)
+        self._daily_checks = sum(cell.daily_checks for cell in self.cells.values())
+
+    def interval_hours(self, cell, now):
+        """Recheck interval for a cell: the shortest interval any of its signals asks for"""
+        policy = self.policy
+        last_verdict = cell.verdicts[-1] if cell.verdicts else None
+        interval = policy.working_interval_hours if last_verdict is not False else policy.broken_interval_hours
+        if cell.flap_count() >= policy.flap_changes:
+            interval = min(interval, policy.flapping_interval_hours)
+        if cell.last_edited is not None and now - cell.last_edited < policy.recent_edit_hours * SECONDS_PER_HOUR:
+            interval = min(interval, policy.recent_edit_interval_hours)
+        return interval
+
+    def _jittered(self, seconds):
+        jitter = self.policy.jitter_fraction
+        return seconds * self.rng.uniform(1 - jitter, 1 + jitter) if jitter else seconds
+
+    def sync_cells(self, cells):
+        """
+        Reconcile with the current sheet contents. cells maps key -> (content, payload).
+        New and edited cells become due shortly, deleted cells are dropped.
+        Returns (added, edited, removed) counts.
+        """
+        now = self.clock()
+        added = edited = 0
+        for key, (content, payload) in cells.items():
+            fingerprint = content_hash(content)
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = CellSchedule(key, fingerprint, payload, now + self.policy.edit_delay_seconds,
+                                    self.policy.history_size)
+                self.cells[key] = cell
+                self._push(cell)
+                added += 1
+            elif cell.content_hash != fingerprint:
+                # Edited since the last refresh: the old verdicts no longer apply
+                cell.content_hash = fingerprint
+                cell.payload = payload
+                cell.last_edited = now
+                cell.verdicts.clear()
+                cell.next_due = now + self.policy.edit_delay_seconds
+                self._push(cell)
+                edited += 1
+            else:
+                cell.payload = payload
+
+        removed_keys = [key for key in self.cells if key not in cells]
+        for key in removed_keys:
+            del self.cells[key]
+        self._recount_daily_checks(now)
+        return added, edited, len(removed_keys)
+
+    def next_check(self):
+        """
+        Return (cell, 0) when a cell may be checked now, or (None, seconds_to_wait)
+        when nothing is due yet or the throughput budget needs a pause first.
+        """
+        now = self.clock()
+        # Drop heap entries for cells that were removed or rescheduled
+        while self._heap:
+            due, _, key = self._heap[0]
+            cell = self.cells.get(key)
+            if cell is None or cell.next_due != due:
+                heapq.heappop(self._heap)
+                continue
+            break
+        if not self._heap:
+            return None, 60.0
+
+        due = self._heap[0][0]
+        if due > now:
+            return None, due - now
+
+        if self._last_check_started is not None:
+            spacing = SECONDS_PER_HOUR / self.checks_per_hour()
+            wait = self._last_check_started + spacing - now
+            if wait > 0:
+                return None, wait
+
+        _, _, key = heapq.heappop(self._heap)
+        self._last_check_started = now
+        return self.cells[key], 0.0
+
+    def record_result(self, key, is_working):
+        """Store a cell's verdict and schedule its next check"""
+        cell = self.cells.get(key)
+        if cell is None:
+            return None
+        now = self.clock()
+        cell.verdicts.append(bool(is_working))
+        cell.last_checked = now
+        self._update_daily_checks(cell, now)
+        cell.next_due = now + self._jittered(self.interval_hours(cell, now) * SECONDS_PER_HOUR)
+        self._push(cell)
+        return cell.next_due
+
+    def last_verdict(self, key):
+        """The cell's latest verdict, None when it has not been checked"""
+        cell = self.cells.get(key)
+        return cell.verdicts[-1] if cell is not None and cell.verdicts else None
+
+    def defer(self, key, seconds):
+        """Push a cell's next check back without recording a verdict"""
+        cell = self.cells.get(key)
+        if cell is not None:
+            cell.next_due = self.clock() + seconds
+            self._push(cell)
+
+    def priority(self, key):
+        """Sort key for a sweep that cannot check everything: red cells, then new or recently edited ones, then the rest, least recently checked first"""
+        cell = self.cells.get(key)
+        if cell is None:
+            return (1, 0)
+        now = self.clock()
+        if cell.verdicts and cell.verdicts[-1] is False:
+            rank = 0
+        elif not cell.verdicts or (cell.last_edited is not None and
+                                   now - cell.last_edited < self.policy.recent_edit_hours * SECONDS_PER_HOUR):
+            rank = 1
+        else:
+            rank = 2
+        return (rank, cell.last_checked or 0)
+
+    def overdue_count(self):
+        now = self.clock()
+        return sum(1 for cell in self.cells.values() if cell.next_due <= now)
+
+    def save(self, path):
+        """Persist due times and verdict history so a restart does not re-check everything at once"""
+        state = {
+            key: {
+                'hash': cell.content_hash,
+                'next_due': cell.next_due,
+                'last_checked': cell.last_checked,
+                'last_edited': cell.last_edited,
+                'verdicts': list(cell.verdicts),
+            }
+            for key, cell in self.cells.items()
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'saved_at': self.clock(), 'cells': state}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path, cells):
+        """
+        Restore saved state for cells that still have the same content, then sync the rest.
+        Returns the number of cells restored.
+        """
+        restored = 0
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f).get('cells', {})
+            for key, (content, payload) in cells.items():
+                entry = saved.get(key)
+                if not entry or entry.get('hash') != content_hash(content):
+                    continue
+                cell = CellSchedule(key, entry['hash'], payload, entry['next_due'], self.policy.history_size)
+                cell.last_checked = entry.get('last_checked')
+                cell.last_edited = entry.get('last_edited')
+                cell.verdicts.extend(entry.get('verdicts', []))
+                self.cells[key] = cell
+                self._push(cell)
+                restored += 1
+        self.sync_cells(cells)
+        return restored
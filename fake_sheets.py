@@ -0,0 +1,534 @@
+"""
+Local stand-in for the Google Sheets API, for load-testing the write path without real quotas.
+
+Usage: python fake_sheets.py [--port 8090] [--csv FILE] [--read-quota 60] [--write-quota 60] [--latency 0.05]
+then run the bot with SHEETS_API_URL=http://127.0.0.1:8090 SHEET_URL=fake-spreadsheet WORKSHEET_ID=0
+
+Serves spreadsheets.get (with grid data and formats), values get/batchGet/update/batchUpdate and
+spreadsheets.batchUpdate with repeatCell and updateCells (formats, values and notes). Reads and
+writes are limited per rolling minute like Google's per-user quotas; over quota the request gets
+Google's 429 RESOURCE_EXHAUSTED error. Request counts are served as JSON on /_fake/stats.
+"""
+import argparse
+import copy
+import csv
+import http.server
+import json
+import re
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs, unquote, urlparse
+
+import requests
+
+GOOGLE_SHEETS_API = 'https://sheets.googleapis.com'
+
+DEFAULT_ROWS = 1000
+DEFAULT_COLUMNS = 26
+
+DEFAULT_FORMAT = {
+    'backgroundColor': {'red': 1, 'green': 1, 'blue': 1},
+    'verticalAlignment': 'BOTTOM',
+    'wrapStrategy': 'OVERFLOW_CELL',
+    'textFormat': {'foregroundColor': {}, 'fontFamily': 'arial', 'fontSize': 10, 'bold': False,
+                   'italic': False, 'strikethrough': False, 'underline': False},
+}
+
+QUOTA_MESSAGES = {
+    'read': ("Read requests", "ReadRequestsPerMinutePerUser", "read_requests"),
+    'write': ("Write requests", "WriteRequestsPerMinutePerUser", "write_requests"),
+}
+
+class SheetsApiError(Exception):
+    """An error answered in the Google API error format"""
+
+    def __init__(self, code, status, message, details=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.details = details
+
+    def body(self):
+        error = {'code': self.code, 'message': str(self), 'status': self.status}
+        if self.details:
+            error['details'] = self.details
+        return {'error': error}
+
+def quota_exceeded(kind):
+    metric, limit, quota_metric = QUOTA_MESSAGES[kind]
+    return SheetsApiError(
+        429, 'RESOURCE_EXHAUSTED',
+        f"Quota exceeded for quota metric '{metric}' and limit '{metric} per minute per user' of service "
+        f"'sheets.googleapis.com' for consumer 'project_number:000000000000'.",
+        [{'@type': 'type.googleapis.com/google.rpc.ErrorInfo', 'reason': 'RATE_LIMIT_EXCEEDED',
+          'domain': 'googleapis.com',
+          'metadata': {'quota_metric': f'sheets.googleapis.com/{quota_metric}', 'quota_limit': limit,
+                       'service': 'sheets.googleapis.com', 'consumer': 'projects/000000000000'}}])
+
+def column_to_index(letters):
+    """'A' -> 0, 'BL' -> 63"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def index_to_column(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+_CELL_REF = re.compile(r'^([A-Za-z]*)(\d*)$')
+_CELLS_ONLY = re.compile(r'^[A-Za-z]{0,3}\d*(:[A-Za-z]{0,3}\d*)?$')
+
+def parse_a1(a1):
+    """
+    Split "'Sheet 1'!A2:C" into (title or None, start_row, start_col, end_row, end_col):
+    zero-based, end exclusive, None where the range is unbounded.
+    """
+    if '!' in a1:
+        title, _, cells = a1.rpartition('!')
+    elif _CELLS_ONLY.match(a1):
+        title, cells = '', a1
+    else:
+        title, cells = a1, ''  # A bare sheet name
+    title = title.strip("'").replace("''", "'") or None
+    if not cells:
+        return title, 0, 0, None, None
+    start, _, end = cells.partition(':')
+    start_match, end_match = _CELL_REF.match(start), _CELL_REF.match(end or start)
+    if not start_match or not end_match:
+        raise SheetsApiError(400, 'INVALID_ARGUMENT', f"Unable to parse range: {a1}")
+    start_col, start_row = start_match.groups()
+    end_col, end_row = end_match.groups()
+    return (title,
+            int(start_row) - 1 if start_row else 0,
+            column_to_index(start_col) if start_col else 0,
+            int(end_row) if end_row else None,
+            column_to_index(end_col) + 1 if end_col else None)
+
+def parse_field_mask(mask):
+    """'userEnteredFormat(textFormat,backgroundColor),note' -> ['userEnteredFormat.textFormat', ...]"""
+    paths, depth, current = [], 0, ''
+    for char in mask + ',':
+        if char == ',' and depth == 0:
+            current = current.strip()
+            if '(' in current:
+                prefix, inner = current.split('(', 1)
+                paths.extend(f"{prefix.strip()}.{path}" for path in parse_field_mask(inner[:-1]))
+            elif current:
+                paths.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    return paths
+
+def _get_path(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+def _set_path(data, path, value):
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    if value is None:
+        data.pop(path[-1], None)
+    else:
+        data[path[-1]] = copy.deepcopy(value)
+
+def _merge(base, override):
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+class FakeWorksheet:
+    """Values, user-entered formats and notes of one sheet, keyed by zero-based (row, col)"""
+
+    def __init__(self, sheet_id, title, index, values=()):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.index = index
+        self.values = {}
+        self.formats = {}
+        self.notes = {}
+        for row, row_values in enumerate(values):
+            for col, value in enumerate(row_values):
+                if value != '':
+                    self.values[(row, col)] = str(value)
+
+    def extent(self):
+        """(rows, cols) of the used area"""
+        rows = max((row + 1 for row, _ in self.values), default=0)
+        cols = max((col + 1 for _, col in self.values), default=0)
+        return rows, cols
+
+    def properties(self):
+        rows, cols = self.extent()
+        return {'sheetId': self.sheet_id, 'title': self.title, 'index': self.index, 'sheetType': 'GRID',
+                'gridProperties': {'rowCount': max(DEFAULT_ROWS, rows), 'columnCount': max(DEFAULT_COLUMNS, cols)}}
+
+    def bounds(self, start_row, start_col, end_row, end_col):
+        rows, cols = self.extent()
+        return start_row, start_col, rows if end_row is None else end_row, cols if end_col is None else end_col
+
+    def a1(self, start_row, start_col, end_row, end_col):
+        title = "'" + self.title.replace("'", "''") + "'"
+        if end_row <= start_row or end_col <= start_col:
+            return f"{title}!{index_to_column(start_col)}{start_row + 1}"
+        return f"{title}!{index_to_column(start_col)}{start_row + 1}:{index_to_column(end_col - 1)}{end_row}"
+
+    def value_rows(self, start_row, start_col, end_row, end_col):
+        """Rows of the range with trailing empty cells and rows trimmed, as Google returns them"""
+        rows = []
+        for row in range(start_row, end_row):
+            values = [self.values.get((row, col), '') for col in range(start_col, end_col)]
+            while values and values[-1] == '':
+                values.pop()
+            rows.append(values)
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def write_values(self, start_row, start_col, rows):
+        for row_offset, values in enumerate(rows):
+            for col_offset, value in enumerate(values):
+                key = (start_row + row_offset, start_col + col_offset)
+                if value is None or value == '':
+                    self.values.pop(key, None)
+                else:
+                    self.values[key] = str(value)
+
+    def cell_data(self, row, col):
+        cell = {}
+        value = self.values.get((row, col))
+        if value is not None:
+            cell['userEnteredValue'] = {'stringValue': value}
+            cell['formattedValue'] = value
+        user_format = self.formats.get((row, col))
+        if user_format:
+            cell['userEnteredFormat'] = copy.deepcopy(user_format)
+        cell['effectiveFormat'] = _merge(DEFAULT_FORMAT, user_format or {})
+        if (row, col) in self.notes:
+            cell['note'] = self.notes[(row, col)]
+        return cell
+
+    def apply_cell(self, row, col, source, paths):
+        """Copy the field-mask paths of a CellData into a cell; paths missing from source are cleared"""
+        key = (row, col)
+        for path in paths:
+            keys = path.split('.')
+            if keys[0] in ('*', 'userEnteredFormat'):
+                if len(keys) == 1:
+                    self.formats[key] = copy.deepcopy(source.get('userEnteredFormat', {}))
+                else:
+                    _set_path(self.formats.setdefault(key, {}), keys[1:], _get_path(source, keys))
+                if not self.formats[key]:
+                    del self.formats[key]
+            if keys[0] in ('*', 'userEnteredValue'):
+                entered = source.get('userEnteredValue') or {}
+                self.write_values(row, col, [[next(iter(entered.values()), None)]])
+            if keys[0] in ('*', 'note'):
+                if source.get('note'):
+                    self.notes[key] = source['note']
+                else:
+                    self.notes.pop(key, None)
+
+class FakeSheets:
+    """In-memory spreadsheets with per-minute read and write quotas and request counters; thread-safe"""
+
+    def __init__(self, read_quota=60, write_quota=60, latency_seconds=0.0, clock=time.monotonic):
+        self.quotas = {'read': read_quota, 'write': write_quota}  # Requests per rolling minute, 0 = unlimited
+        self.latency_seconds = latency_seconds
+        self.clock = clock
+        self.spreadsheets = {}  # spreadsheet id -> (title, [FakeWorksheet])
+        self.requests = Counter()  # API method -> requests answered
+        self.rate_limited = Counter()  # 'read' / 'write' -> 429 responses
+        self.subrequests = Counter()  # batchUpdate request type -> count
+        self._windows = {'read': deque(), 'write': deque()}
+        self._lock = threading.Lock()
+
+    def add_sheet(self, spreadsheet_id, sheet_id=0, title='Sheet1', values=()):
+        """Add a worksheet, creating the spreadsheet on first use"""
+        with self._lock:
+            spreadsheet_title, sheets = self.spreadsheets.setdefault(spreadsheet_id, (f"Fake {spreadsheet_id}", []))
+            worksheet = FakeWorksheet(int(sheet_id), title, len(sheets), values)
+            sheets.append(worksheet)
+            return worksheet
+
+    def worksheet(self, spreadsheet_id, sheet_id=None, title=None):
+        if spreadsheet_id not in self.spreadsheets:
+            raise SheetsApiError(404, 'NOT_FOUND', "Requested entity was not found.")
+        sheets = self.spreadsheets[spreadsheet_id][1]
+        for worksheet in sheets:
+            if (sheet_id is not None and worksheet.sheet_id == sheet_id) or (title is not None and worksheet.title == title):
+                return worksheet
+        if sheet_id is None and title is None and sheets:
+            return sheets[0]
+        raise SheetsApiError(400, 'INVALID_ARGUMENT',
+                             f"Unable to parse range: {title}" if title else f"No grid with id: {sheet_id}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'reads': sum(count for method, count in self.requests.items() if self._kind(method) == 'read'),
+                'writes': sum(count for method, count in self.requests.items() if self._kind(method) == 'write'),
+                'rate_limited': dict(self.rate_limited),
+                'batch_update_requests': dict(self.subrequests),
+                'quotas_per_minute': dict(self.quotas),
+            }
+
+    @staticmethod
+    def _kind(method):
+        return 'read' if method in ('spreadsheets.get', 'values.get', 'values.batchGet') else 'write'
+
+    def _admit(self, method):
+        """Count the request against its per-minute quota; raises the 429 error when over quota"""
+        kind = self._kind(method)
+        limit = self.quotas[kind]
+        window = self._windows[kind]
+        now = self.clock()
+        while window and now - window[0] >= 60:
+            window.popleft()
+        if limit and len(window) >= limit:
+            self.rate_limited[kind] += 1
+            raise quota_exceeded(kind)
+        window.append(now)
+        self.requests[method] += 1
+
+    def handle(self, http_method, path, params, body):
+        """Answer one API request: returns the JSON response body or raises SheetsApiError"""
+        match = re.match(r'^/v4/spreadsheets/([^/:]+)(.*)$', path)
+        if not match:
+            raise SheetsApiError(404, 'NOT_FOUND', f"Method not found: {path}")
+        spreadsheet_id, rest = match.groups()
+        routes = {
+            ('GET', ''): ('spreadsheets.get', self._get_spreadsheet),
+            ('POST', ':batchUpdate'): ('spreadsheets.batchUpdate', self._batch_update),
+            ('GET', '/values:batchGet'): ('values.batchGet', self._values_batch_get),
+            ('POST', '/values:batchUpdate'): ('values.batchUpdate', self._values_batch_update),
+        }
+        if rest.startswith('/values/') and not rest.endswith((':append', ':clear')):
+            route = {'GET': ('values.get', self._values_get),
+                     'PUT': ('values.update', self._values_update)}.get(http_method)
+            params = dict(params, range=[unquote(rest[len('/values/'):])])
+        else:
+            route = routes.get((http_method, rest))
+        if route is None:
+            raise SheetsApiError(404, 'NOT_FOUND', f"Method not supported by the fake Sheets API: {http_method} {path}")
+        method, handler = route
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            self._admit(method)
+            return handler(spreadsheet_id, params, body)
+
+    def _get_spreadsheet(self, spreadsheet_id, params, body):
+        self.worksheet(spreadsheet_id)
+        title, sheets = self.spreadsheets[spreadsheet_id]
+        response = {
+            'spreadsheetId': spreadsheet_id,
+            'properties': {'title': title, 'locale': 'en_US', 'autoRecalc': 'ON_CHANGE', 'timeZone': 'America/New_York'},
+            'sheets': [{'properties': worksheet.properties()} for worksheet in sheets],
+            'spreadsheetUrl': f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit",
+        }
+        if params.get('includeGridData', ['false'])[0].lower() == 'true':
+            response['sheets'] = []
+            for a1 in params.get('ranges', []):
+                title, *grid = parse_a1(a1)
+                worksheet = self.worksheet(spreadsheet_id, title=title)
+                start_row, start_col, end_row, end_col = worksheet.bounds(*grid)
+                row_data = [{'values': [worksheet.cell_data(row, col) for col in range(start_col, end_col)]}
+                            for row in range(start_row, end_row)]
+                response['sheets'].append({'properties': worksheet.properties(), 'data': [
+                    {'startRow': start_row, 'startColumn': start_col, 'rowData': row_data}]})
+        return response
+
+    def _value_range(self, spreadsheet_id, a1):
+        title, *grid = parse_a1(a1)
+        worksheet = self.worksheet(spreadsheet_id, title=title)
+        bounds = worksheet.bounds(*grid)
+        value_range = {'range': worksheet.a1(*bounds), 'majorDimension': 'ROWS'}
+        rows = worksheet.value_rows(*bounds)
+        if rows:
+            value_range['values'] = rows
+        return value_range
+
+    def _values_get(self, spreadsheet_id, params, body):
+        return self._value_range(spreadsheet_id, params['range'][0])
+
+    def _values_batch_get(self, spreadsheet_id, params, body):
+        return {'spreadsheetId': spreadsheet_id,
+                'valueRanges': [self._value_range(spreadsheet_id, a1) for a1 in params.get('ranges', [])]}
+
+    def _write_range(self, spreadsheet_id, a1, rows):
+        title, start_row, start_col, _, _ = parse_a1(a1)
+        worksheet = self.worksheet(spreadsheet_id, title=title)
+        worksheet.write_values(start_row, start_col, rows)
+        return {'spreadsheetId': spreadsheet_id, 'updatedRange': a1, 'updatedRows': len(rows),
+                'updatedColumns': max((len(row) for row in rows), default=0),
+                'updatedCells': sum(len(row) for row in rows)}
+
+    def _values_update(self, spreadsheet_id, params, body):
+        return self._write_range(spreadsheet_id, params['range'][0], (body or {}).get('values', []))
+
+    def _values_batch_update(self, spreadsheet_id, params, body):
+        responses = [self._write_range(spreadsheet_id, data['range'], data.get('values', []))
+                     for data in (body or {}).get('data', [])]
+        return {'spreadsheetId': spreadsheet_id, 'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+                'responses': responses}
+
+    def _batch_update(self, spreadsheet_id, params, body):
+        replies = []
+        for request in (body or {}).get('requests', []):
+            kind = next(iter(request), None)
+            self.subrequests[kind] += 1
+            if kind == 'repeatCell':
+                self._repeat_cell(spreadsheet_id, request[kind])
+            elif kind == 'updateCells':
+                self._update_cells(spreadsheet_id, request[kind])
+            else:
+                raise SheetsApiError(400, 'INVALID_ARGUMENT', f"Request type not supported by the fake Sheets API: {kind}")
+            replies.append({})
+        return {'spreadsheetId': spreadsheet_id, 'replies': replies}
+
+    def _grid(self, spreadsheet_id, grid_range):
+        worksheet = self.worksheet(spreadsheet_id, sheet_id=grid_range.get('sheetId', 0))
+        return worksheet, worksheet.bounds(grid_range.get('startRowIndex', 0), grid_range.get('startColumnIndex', 0),
+                                           grid_range.get('endRowIndex'), grid_range.get('endColumnIndex'))
+
+    def _repeat_cell(self, spreadsheet_id, request):
+        worksheet, (start_row, start_col, end_row, end_col) = self._grid(spreadsheet_id, request['range'])
+        paths = parse_field_mask(request['fields'])
+        for row in range(start_row, end_row):
+            for col in range(start_col, end_col):
+                worksheet.apply_cell(row, col, request.get('cell', {}), paths)
+
+    def _update_cells(self, spreadsheet_id, request):
+        if 'start' in request:
+            start = request['start']
+            worksheet = self.worksheet(spreadsheet_id, sheet_id=start.get('sheetId', 0))
+            start_row, start_col = start.get('rowIndex', 0), start.get('columnIndex', 0)
+        else:
+            worksheet, (start_row, start_col, _, _) = self._grid(spreadsheet_id, request['range'])
+        paths = parse_field_mask(request['fields'])
+        for row_offset, row_data in enumerate(request.get('rows', [])):
+            for col_offset, cell in enumerate(row_data.get('values', [])):
+                worksheet.apply_cell(start_row + row_offset, start_col + col_offset, cell, paths)
+
+    def user_entered_format(self, spreadsheet_id, sheet_id, a1):
+        """User-entered format of one cell ('N5'), or None; bypasses quotas and counters"""
+        with self._lock:
+            _, row, col, _, _ = parse_a1(a1)
+            return copy.deepcopy(self.worksheet(spreadsheet_id, sheet_id=sheet_id).formats.get((row, col)))
+
+class FakeSheetsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/_fake/stats':
+            self._answer(200, self.server.sheets.stats())
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            body = json.loads(raw) if raw else None
+            self._answer(200, self.server.sheets.handle(self.command, parsed.path, parse_qs(parsed.query), body))
+        except SheetsApiError as e:
+            self._answer(e.code, e.body())
+        except (ValueError, KeyError, TypeError) as e:
+            self._answer(400, SheetsApiError(400, 'INVALID_ARGUMENT', f"Invalid request: {e}").body())
+
+    do_GET = do_POST = do_PUT = _dispatch
+
+    def log_message(self, format, *args):
+        return
+
+class FakeSheetsServer:
+    """Serves a FakeSheets on a local port in a background thread; use as a context manager"""
+
+    def __init__(self, sheets=None, host='127.0.0.1', port=0):
+        self.sheets = sheets or FakeSheets()
+        self.httpd = http.server.ThreadingHTTPServer((host, port), FakeSheetsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.sheets = self.sheets
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class RedirectedSession(requests.Session):
+    """requests session that sends Sheets API calls to base_url instead of Google"""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(GOOGLE_SHEETS_API):
+            url = self.base_url + url[len(GOOGLE_SHEETS_API):]
+        return super().request(method, url, *args, **kwargs)
+
+def client_for(base_url):
+    """Unauthenticated gspread client talking to a fake Sheets API at base_url"""
+    import gspread
+    return gspread.Client(None, session=RedirectedSession(base_url))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Google Sheets API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--spreadsheet-id', default='fake-spreadsheet')
+    parser.add_argument('--sheet-id', type=int, default=0)
+    parser.add_argument('--title', default='Sheet1')
+    parser.add_argument('--csv', help="Initial worksheet values")
+    parser.add_argument('--read-quota', type=int, default=60, help="Read requests per minute (0 = unlimited)")
+    parser.add_argument('--write-quota', type=int, default=60, help="Write requests per minute (0 = unlimited)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    args = parser.parse_args()
+
+    values = []
+    if args.csv:
+        with open(args.csv, newline='', encoding='utf-8') as f:
+            values = list(csv.reader(f))
+    sheets = FakeSheets(args.read_quota, args.write_quota, args.latency)
+    sheets.add_sheet(args.spreadsheet_id, args.sheet_id, args.title, values)
+    server = FakeSheetsServer(sheets, args.host, args.port)
+    print(f"Fake Sheets API on {server.base_url} - spreadsheet {args.spreadsheet_id}, worksheet {args.sheet_id} "
+          f"({len(values)} rows), quotas {args.read_quota} reads / {args.write_quota} writes per minute")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(sheets.stats(), indent=2))
+
+if __name__ == '__main__':
+    main()
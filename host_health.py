@@ -0,0 +1,123 @@
+"""Per-host circuit breakers and timeouts derived from each host's latency history"""
+import math
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+def host_of(url):
+    return (urlparse(url).hostname or '').lower()
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+class HostStats:
+    """Latency history and breaker state of one host"""
+    __slots__ = ('latencies', 'consecutive_failures', 'state', 'opened_at', 'probe_started')
+
+    def __init__(self):
+        self.latencies = {}  # tier -> deque of seconds
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started = None
+
+class HostHealth:
+    """
+    A host's breaker opens after failure_threshold consecutive unreachable checks;
+    while open its URLs fail fast. After cooldown_seconds one probe is let through
+    (half-open): success closes the breaker, failure opens it again.
+    Timeouts are the host's p99 latency for the tier times a multiplier plus a margin,
+    kept between min_timeout and the tier's default.
+    """
+
+    def __init__(self, default_timeouts, failure_threshold=3, cooldown_seconds=300, min_timeout=5,
+                 multiplier=1.5, margin_seconds=2, min_samples=5, history_size=50, clock=time.time):
+        self.default_timeouts = dict(default_timeouts)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.min_timeout = min_timeout
+        self.multiplier = multiplier
+        self.margin_seconds = margin_seconds
+        self.min_samples = min_samples
+        self.history_size = history_size
+        self.clock = clock
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, url):
+        host = host_of(url)
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = HostStats()
+        return stats
+
+    def allow(self, url):
+        """False while the host's breaker is open; lets one probe through once the cooldown is over"""
+        with self._lock:
+            stats = self._stats(url)
+            now = self.clock()
+            if stats.state == CLOSED:
+                return True
+            if stats.state == OPEN and now - stats.opened_at < self.cooldown_seconds:
+                return False
+            # One probe at a time; a probe that never reported back is replaced after a cooldown
+            if stats.probe_started is not None and now - stats.probe_started < self.cooldown_seconds:
+                return False
+            stats.state = HALF_OPEN
+            stats.probe_started = now
+            return True
+
+    def state(self, url):
+        return self._stats(url).state
+
+    def consecutive_failures(self, url):
+        return self._stats(url).consecutive_failures
+
+    def observe(self, url, tier, seconds):
+        """Record how long a successful request of a tier took"""
+        with self._lock:
+            latencies = self._stats(url).latencies.setdefault(tier, deque(maxlen=self.history_size))
+            latencies.append(seconds)
+
+    def record_success(self, url):
+        """The host answered: close its breaker"""
+        with self._lock:
+            stats = self._stats(url)
+            stats.consecutive_failures = 0
+            stats.state = CLOSED
+            stats.probe_started = None
+
+    def record_failure(self, url):
+        """
+        The host could not be reached. Returns True when this failure opened the breaker
+        (threshold reached, or the half-open probe failed).
+        """
+        with self._lock:
+            stats = self._stats(url)
+            stats.consecutive_failures += 1
+            stats.probe_started = None
+            if stats.state == HALF_OPEN or (stats.state == CLOSED and
+                                            stats.consecutive_failures >= self.failure_threshold):
+                stats.state = OPEN
+                stats.opened_at = self.clock()
+                return True
+            return False
+
+    def timeout(self, url, tier):
+        """Timeout for the next request of a tier to the URL's host"""
+        default = self.default_timeouts[tier]
+        latencies = self._stats(url).latencies.get(tier)
+        if not latencies or len(latencies) < self.min_samples:
+            return default
+        derived = percentile(latencies, 0.99) * self.multiplier + self.margin_seconds
+        return max(self.min_timeout, min(default, derived))
+
+    def open_hosts(self):
+        return sorted(host for host, stats in self._hosts.items() if stats.state != CLOSED)
@@ -0,0 +1,250 @@
+"""Single-pass HTML analysis: title, content element counts and text length"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+COUNTED_TAGS = {'p': 'paragraphs', 'a': 'links', 'form': 'forms', 'img': 'images'}
+
+# Text inside these elements is not page text (BeautifulSoup's get_text skips it too)
+NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+# Whitespace-only text is kept verbatim inside these, and collapsed elsewhere
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+
+class PageStatsCollector:
+    """Accumulates element counts and text length from start-tag/end-tag/data events"""
+
+    def __init__(self):
+        self.counts = {'paragraphs': 0, 'headings': 0, 'links': 0, 'forms': 0, 'images': 0}
+        self.title = None
+        self._title_parts = None
+        self._non_text_depth = 0
+        self._preserve_depth = 0
+        self._pending = []
+        # Text length is tracked without keeping the text: total length minus
+        # the whitespace a final strip() would remove from either end
+        self._text_chars = 0
+        self._leading_ws = 0
+        self._trailing_ws = 0
+        self._seen_text = False
+
+    def start(self, tag):
+        self.flush()
+        tag = tag.lower()
+        if tag in HEADING_TAGS:
+            self.counts['headings'] += 1
+        elif tag in COUNTED_TAGS:
+            self.counts[COUNTED_TAGS[tag]] += 1
+        elif tag in NON_TEXT_TAGS:
+            self._non_text_depth += 1
+        elif tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        elif tag == 'title' and self.title is None and self._title_parts is None:
+            self._title_parts = []
+
+    def end(self, tag):
+        self.flush()
+        tag = tag.lower()
+        if tag in NON_TEXT_TAGS and self._non_text_depth:
+            self._non_text_depth -= 1
+        elif tag in PRESERVE_WHITESPACE_TAGS and self._preserve_depth:
+            self._preserve_depth -= 1
+        elif tag == 'title' and self._title_parts is not None:
+            self.title = ''.join(self._title_parts).strip()
+            self._title_parts = None
+
+    def data(self, text):
+        if text and not self._non_text_depth:
+            self._pending.append(text)
+
+    def flush(self):
+        """Account for the run of text since the last tag or comment"""
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        self._pending = []
+
+        stripped_right = text.rstrip()
+        if not stripped_right and not self._preserve_depth:
+            # Whitespace-only runs between tags collapse to one character, as in BeautifulSoup
+            text = '\n' if '\n' in text else ' '
+
+        if self._title_parts is not None:
+            self._title_parts.append(text)
+
+        self._text_chars += len(text)
+        if not stripped_right:
+            if self._seen_text:
+                self._trailing_ws += len(text)
+            else:
+                self._leading_ws += len(text)
+            return
+        if not self._seen_text:
+            self._leading_ws += len(text) - len(text.lstrip())
+            self._seen_text = True
+        self._trailing_ws = len(text) - len(stripped_right)
+
+    def result(self, backend):
+        self.flush()
+        # An unclosed <title> still counts, as it does for BeautifulSoup
+        if self.title is None and self._title_parts is not None:
+            self.title = ''.join(self._title_parts).strip()
+        text_length = self._text_chars - self._leading_ws - self._trailing_ws if self._seen_text else 0
+        return dict(self.counts, title=self.title, text_length=text_length, backend=backend)
+
+class _StdlibStreamParser(HTMLParser):
+    """html.parser front end, feeds events straight into a collector without building a tree"""
+
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag)
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.flush()
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> sections count as text
+        if data.startswith('CDATA['):
+            self.collector.flush()
+            self.collector.data(data[6:])
+            self.collector.flush()
+
+class _LxmlTarget:
+    """lxml parser target, receives the same events from libxml2's C parser"""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag)
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        self.collector.flush()
+
+    def close(self):
+        return None
+
+def _analyze_stdlib(html):
+    collector = PageStatsCollector()
+    parser = _StdlibStreamParser(collector)
+    parser.feed(html)
+    parser.close()
+    return collector.result('html.parser')
+
+def _analyze_lxml(html):
+    from lxml import etree
+    collector = PageStatsCollector()
+    parser = etree.HTMLParser(target=_LxmlTarget(collector))
+    parser.feed(html)
+    parser.close()
+    return collector.result('lxml')
+
+def _analyze_bs4(html):
+    """The original tree-building analysis, kept as a reference for parity and benchmarks"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.find('title')
+    return {
+        'paragraphs': len(soup.find_all('p')),
+        'headings': len(soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])),
+        'links': len(soup.find_all('a')),
+        'forms': len(soup.find_all('form')),
+        'images': len(soup.find_all('img')),
+        'title': title.text.strip() if title else None,
+        'text_length': len(soup.get_text().strip()),
+        'backend': 'bs4',
+    }
+
+BACKENDS = {
+    'html.parser': _analyze_stdlib,
+    'lxml': _analyze_lxml,
+    'bs4': _analyze_bs4,
+}
+
+def resolve_backend(backend):
+    """Map a configured backend name to an available one ('auto' prefers lxml when installed)"""
+    if backend in (None, '', 'auto'):
+        try:
+            import lxml.etree  # noqa: F401
+            return 'lxml'
+        except ImportError:
+            return 'html.parser'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend '{backend}', expected one of: auto, {', '.join(BACKENDS)}")
+    return backend
+
+def analyze_html(html, backend='html.parser'):
+    """
+    Parse HTML in one streaming pass and return its title, content element counts
+    (paragraphs, headings, links, forms, images) and stripped text length.
+    Pure function, safe to run in a worker process.
+    """
+    return BACKENDS[resolve_backend(backend)](html or '')
+
+DEFAULT_WORKERS = 2  # Not the CPU count, which in a container is often the host's
+
+# Worker pool shared by all checks, created on first use
+_analysis_pool = None
+_analysis_pool_workers = None
+
+def get_analysis_pool(workers=None):
+    """
+    Return the shared process pool for HTML analysis. Workers are spawned rather than forked,
+    since the bot has started its health server and log threads by the time the pool is created.
+    Spawned workers re-import the main script as __mp_main__, so it must not build anything at
+    import (url_checker_bot does that in init()).
+    """
+    global _analysis_pool, _analysis_pool_workers
+    workers = workers or DEFAULT_WORKERS
+    if _analysis_pool is None or _analysis_pool_workers != workers:
+        if _analysis_pool is not None:
+            _analysis_pool.shutdown(wait=False)
+        _analysis_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _analysis_pool_workers = workers
+    return _analysis_pool
+
+def shutdown_analysis_pool():
+    """Stop the analysis workers, if any were started"""
+    global _analysis_pool, _analysis_pool_workers
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown(wait=False)
+    _analysis_pool = None
+    _analysis_pool_workers = None
+
+async def analyze_html_async(html, backend='html.parser', workers=None):
+    """
+    Run analyze_html off the event loop. workers=0 uses a thread instead of the
+    process pool (useful on single-core instances where process startup is not worth it).
+    """
+    if workers == 0:
+        return await asyncio.to_thread(analyze_html, html, backend)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_analysis_pool(workers), analyze_html, html, backend)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool next time and finish this page in a thread
+        shutdown_analysis_pool()
+        return await asyncio.to_thread(analyze_html, html, backend)
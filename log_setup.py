@@ -0,0 +1,66 @@
+"""Leveled logging through a queue, so formatting output and writing it happen off the event loop thread"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(message)s'
+
+# Chatty libraries stay at WARNING even when LOG_LEVEL=DEBUG
+QUIET_LOGGERS = ('urllib3', 'selenium', 'oauth2client', 'google', 'googleapiclient')
+
+_STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and any fields passed with extra="""
+
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                 'msg': record.getMessage()}
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener without running the formatter (the stock QueueHandler formats in
+    the caller's thread). The message is still merged with its arguments here, so mutable arguments
+    are logged as they were at the call.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks cannot cross to the listener thread safely; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(level='INFO', log_format='text', stream=None):
+    """
+    Route all logging through an unbounded queue to one stream handler on a listener thread.
+    Returns the started QueueListener; it is stopped (and the queue drained) at exit.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(DeferredFormatQueueHandler(log_queue))
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,124 @@
+"""In-process counters, gauges and histograms, rendered in the Prometheus text exposition format"""
+import os
+import threading
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for key, value in sorted(labels.items()))
+    return '{' + pairs + '}'
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+class Metrics:
+    """
+    Registry of metric families. Counters and histograms are updated as things
+    happen; gauges can also be callbacks that are read when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}  # name -> (type, help, {labels tuple: value or Histogram})
+        self._callbacks = {}  # name -> callable returning a number
+
+    def describe(self, name, kind, help_text):
+        with self._lock:
+            self._families.setdefault(name, (kind, help_text, {}))
+
+    def _series(self, name, kind):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, '', {})
+        return family[2]
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series(name, 'counter')
+            series[key] = series.get(key, 0) + value
+
+    def counts(self, name):
+        """Current values of a counter, keyed by sorted label tuples"""
+        with self._lock:
+            family = self._families.get(name)
+            return dict(family[2]) if family else {}
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._series(name, 'gauge')[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series(name, 'histogram')
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def gauge_callback(self, name, help_text, callback, kind='gauge'):
+        """Report callback() whenever metrics are rendered"""
+        self.describe(name, kind, help_text)
+        self._callbacks[name] = callback
+
+    def render(self):
+        lines = []
+        with self._lock:
+            families = {name: (kind, help_text, dict(series)) for name, (kind, help_text, series) in self._families.items()}
+        for name, (kind, help_text, series) in sorted(families.items()):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if name in self._callbacks:
+                try:
+                    series = {(): self._callbacks[name]()}
+                except Exception:
+                    continue
+            for key, value in sorted(series.items()):
+                labels = dict(key)
+                if isinstance(value, Histogram):
+                    for bound, count in zip(value.buckets, value.counts):
+                        lines.append(f"{name}_bucket{_label_text({**labels, 'le': bound})} {count}")
+                    lines.append(f"{name}_bucket{_label_text({**labels, 'le': '+Inf'})} {value.count}")
+                    lines.append(f"{name}_sum{_label_text(labels)} {value.total}")
+                    lines.append(f"{name}_count{_label_text(labels)} {value.count}")
+                else:
+                    lines.append(f"{name}{_label_text(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+def process_rss_bytes(name_fragments=('chrome',)):
+    """Total resident memory of processes whose name contains one of name_fragments (Linux /proc only)"""
+    page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+    total = 0
+    try:
+        pids = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/comm', encoding='utf-8') as f:
+                name = f.read().strip().lower()
+            if not any(fragment in name for fragment in name_fragments):
+                continue
+            with open(f'/proc/{pid}/statm', encoding='utf-8') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
@@ -0,0 +1,187 @@
+"""Side-effect-free page classifier: structured page features in, verdict and reason out"""
+from dataclasses import asdict, dataclass, field, fields
+
+@dataclass
+class ClassifierThresholds:
+    """Tunable weights and thresholds used by classify_page"""
+    # Static HTML: elements and text needed to count as real content
+    real_content_elements: int = 10
+    real_content_text: int = 500
+    static_form_weight: float = 3
+
+    # Rendered page: content quality score weights
+    paragraph_weight: float = 1
+    heading_weight: float = 2
+    form_weight: float = 3
+    button_weight: float = 1
+    input_weight: float = 1
+    image_weight: float = 0.5
+
+    # Rendered page: verdict thresholds
+    working_quality: float = 8
+    landing_page_quality: float = 5
+    minimal_text: int = 50
+    minimal_quality: float = 3
+
+    # Selenium fallback after the HTTP request failed
+    fallback_min_text: int = 100
+
+DEFAULT_THRESHOLDS = ClassifierThresholds()
+
+@dataclass
+class PageFeatures:
+    """Everything the verdict depends on, gathered by the static (HTTP) and render (Selenium) tiers"""
+    url: str
+
+    # Static tier - status_code stays None when the HTTP request itself failed
+    status_code: int = None
+    request_error: str = None
+    redirect_chain: list = field(default_factory=list)
+    registrar_redirect: str = None
+    static_parsed: bool = False
+    static_paragraphs: int = 0
+    static_headings: int = 0
+    static_forms: int = 0
+    static_images: int = 0
+    static_text_length: int = 0
+    has_template_vars: bool = False
+    static_error_phrase: str = None
+    static_parked_phrase: str = None
+
+    # Render tier - rendered is False when the page was never loaded in a browser
+    rendered: bool = False
+    render_failed: bool = False
+    expired_reason: str = None
+    rendered_error_phrase: str = None
+    rendered_parked_phrase: str = None
+    elements_counted: bool = False
+    rendered_paragraphs: int = 0
+    rendered_headings: int = 0
+    rendered_forms: int = 0
+    rendered_buttons: int = 0
+    rendered_inputs: int = 0
+    rendered_images: int = 0
+    rendered_text_length: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build features from a dict, ignoring unknown keys (e.g. corpus labels)"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+@dataclass
+class Verdict:
+    """Outcome of classify_page: tier is the tier whose evidence decided ('static' or 'render')"""
+    is_working: bool
+    reason: str
+    tier: str
+
+def is_template_url(url):
+    """Landing page URLs with {placeholders} are treated leniently"""
+    return "{" in url
+
+def has_real_static_content(features, thresholds=DEFAULT_THRESHOLDS):
+    """Static HTML has substantial content elements and text"""
+    if not features.static_parsed:
+        return False
+    content_elements = (features.static_paragraphs + features.static_headings +
+                        features.static_forms * thresholds.static_form_weight + features.static_images)
+    return content_elements >= thresholds.real_content_elements and features.static_text_length > thresholds.real_content_text
+
+def content_quality_score(features, thresholds=DEFAULT_THRESHOLDS):
+    """Weighted score of the rendered page's content and interactive elements"""
+    return (
+        features.rendered_paragraphs * thresholds.paragraph_weight +
+        features.rendered_headings * thresholds.heading_weight +
+        features.rendered_forms * thresholds.form_weight +
+        features.rendered_buttons * thresholds.button_weight +
+        features.rendered_inputs * thresholds.input_weight +
+        features.rendered_images * thresholds.image_weight
+    )
+
+def classify_static(features, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Return a Verdict when the static tier alone is decisive (HTTP error status,
+    registrar expiration redirect), or None when the page still needs rendering.
+    """
+    if features.request_error is None and features.status_code is not None:
+        if features.status_code >= 400:
+            return Verdict(False, f"HTTP Status {features.status_code}", 'static')
+        if features.registrar_redirect:
+            return Verdict(False, f"Domain expired: redirected to {features.registrar_redirect}", 'static')
+    return None
+
+def _classify_request_failure(features, thresholds):
+    """The HTTP request failed, so only a Selenium fallback load can rescue the URL"""
+    if not features.rendered:
+        return Verdict(False, features.request_error, 'render' if features.render_failed else 'static')
+    if features.expired_reason:
+        return Verdict(False, f"Expired domain: {features.expired_reason}", 'render')
+    if features.rendered_text_length > thresholds.fallback_min_text:
+        return Verdict(True, "Selenium found reasonable content despite request error", 'render')
+    # For landing pages, minimal content might be valid
+    if is_template_url(features.url):
+        return Verdict(True, "Minimal content on landing page with template variables", 'render')
+    return Verdict(False, "Minimal content despite successful load", 'render')
+
+def _classify_rendered(features, thresholds):
+    """Verdict from the rendered page, before static error indicators are applied"""
+    if features.expired_reason:
+        return Verdict(False, f"Expired domain: {features.expired_reason}", 'render')
+    if features.rendered_error_phrase or features.rendered_parked_phrase:
+        if features.rendered_parked_phrase:
+            return Verdict(False, f"Rendered parked domain: {features.rendered_parked_phrase}", 'render')
+        return Verdict(False, f"Rendered error: {features.rendered_error_phrase}", 'render')
+    if not features.elements_counted:
+        # Since the page loaded with a good status, it is likely working
+        return Verdict(True, "HTTP status good, element analysis unavailable", 'render')
+
+    has_interactive_elements = (features.rendered_forms > 0 or features.rendered_buttons > 0 or
+                                features.rendered_inputs > 0)
+    content_quality = content_quality_score(features, thresholds)
+
+    # Landing pages with template variables are typically functional with forms or a decent score
+    is_landing_page = has_interactive_elements and is_template_url(features.url)
+    is_working_landing_page = is_landing_page and (
+        features.rendered_forms > 0 or
+        (features.rendered_buttons > 0 and features.rendered_inputs > 0) or
+        content_quality >= thresholds.landing_page_quality
+    )
+
+    if content_quality >= thresholds.working_quality or has_real_static_content(features, thresholds):
+        return Verdict(True, "Page has high quality content", 'render')
+    if is_working_landing_page:
+        return Verdict(True, "Working landing page detected", 'render')
+    if (features.rendered_text_length < thresholds.minimal_text and
+            content_quality < thresholds.minimal_quality and not has_interactive_elements):
+        return Verdict(False, "Empty or minimal content page", 'render')
+    # Default to working if we passed all error checks and the HTTP status was 200
+    return Verdict(True, "Page passed basic content checks with HTTP 200", 'render')
+
+def classify_page(features, thresholds=DEFAULT_THRESHOLDS):
+    """Classify a page from its features. Pure function: no network, browser or sheet access."""
+    if features.request_error is not None:
+        return _classify_request_failure(features, thresholds)
+
+    verdict = classify_static(features, thresholds)
+    if verdict is not None:
+        return verdict
+
+    if features.rendered:
+        verdict = _classify_rendered(features, thresholds)
+        if not verdict.is_working:
+            return verdict
+    else:
+        # Selenium failed (or was skipped): fall back to the HTTP result
+        verdict = Verdict(True, "HTTP status good, considering page working without rendering",
+                          'render' if features.render_failed else 'static')
+
+    # Error phrases in the static HTML override a positive rendered result
+    if features.static_parked_phrase:
+        return Verdict(False, f"Parked domain: {features.static_parked_phrase}", 'static')
+    if features.static_error_phrase:
+        return Verdict(False, f"Error content: {features.static_error_phrase}", 'static')
+    return verdict
@@ -0,0 +1,209 @@
+"""Precompiled multi-pattern matcher for error, parked-domain and expired-domain signatures"""
+import json
+import re
+
+# Default signatures, grouped by category. A JSON file with the same shape
+# (see SIGNATURES_FILE) can replace any of these lists.
+DEFAULT_SIGNATURES = {
+    # Specific error phrases - focus on actual error messages
+    'error': [
+        "404 not found", "403 forbidden", "500 server error", "502 bad gateway",
+        "dns_probe_finished_nxdomain", "page not found", "site can't be reached",
+        "connection refused", "site not found", "this page isn't working",
+        "this site can't be reached", "server not found", "website is unavailable"
+    ],
+    # Parked domain indicators
+    'parked': [
+        "domain is for sale", "buy this domain", "purchase this domain",
+        "domain expired", "renew your domain", "this domain may be for sale",
+        "domain parking", "parked domain", "this web page is parked"
+    ],
+    # Expiration notices shown by registrar and parking pages, matched against visible text only.
+    # Bare "domain expired" / "expired domain" are left out: they appear on registrar sites,
+    # domain auction pages and SEO blogs that are working fine.
+    'expired': [
+        # Exact matches from screenshot
+        "the domain has expired. is this your domain?",
+        "the domain has expired. is this your domain? renew now",
+        "domain has expired. renew now",
+
+        # Common variations
+        "this domain has expired",
+        "domain name has expired",
+        "domain registration has expired",
+        "domain has lapsed",
+        "this domain is expired",
+        "this domain name has expired",
+        "domain has been expired",
+        "domain registration has lapsed",
+        "domain has expired and is pending renewal",
+        "domain expiration notice"
+    ],
+    # Registrar expiration pages, matched against redirect URLs
+    'registrar': [
+        'godaddy.com/expired',
+        'expired.namecheap.com',
+        'expired.domain',
+        'domainexpired',
+        'domain-expired',
+    ],
+}
+
+# Placeholder parameters such as {{name}} or {clickid} left in landing pages
+PLACEHOLDER_PATTERN = r'\{[a-zA-Z0-9_]+\}'
+
+# Below this many phrases, per-phrase `in` loops (C substring search) beat the prefix-factored
+# regex, which steps through the text in Python; see benchmarks/bench_signatures.py
+LOOPS_MAX_PHRASES = 150
+
+def load_signatures(path=None):
+    """Load signatures from a JSON file, falling back to the defaults for missing categories"""
+    signatures = {category: list(phrases) for category, phrases in DEFAULT_SIGNATURES.items()}
+    if not path:
+        return signatures
+
+    with open(path, encoding='utf-8') as f:
+        overrides = json.load(f)
+
+    for category, phrases in overrides.items():
+        if not isinstance(phrases, list):
+            raise ValueError(f"Signature category '{category}' must be a list of phrases")
+        signatures[category] = [str(phrase).lower() for phrase in phrases if str(phrase).strip()]
+    return signatures
+
+def _trie_pattern(phrases, extra_branches=()):
+    """Build a regex alternation factored by common prefixes, so each position is tried once"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        is_terminal = '' in node
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_terminal:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        # Greedy optional group keeps the longest phrase at each position
+        return group + '?' if is_terminal else group
+
+    # Extra branches share the root group, capture groups would slow every position down
+    root_branches = [re.escape(char) + build(child) for char, child in sorted(trie.items())]
+    return '(?:' + '|'.join(root_branches + list(extra_branches)) + ')'
+
+class SignatureMatcher:
+    """Find every signature category in a single pass over lowercased text"""
+
+    def __init__(self, signatures=None, backend='auto'):
+        """backend: 'auto' (loops for small signature sets, else aho-corasick when installed, else regex),
+        'loops', 'regex' or 'aho-corasick'"""
+        self.signatures = signatures or load_signatures()
+
+        # phrase -> [(category, priority)], priority being the phrase's position in its list
+        self._owners = {}
+        for category, phrases in self.signatures.items():
+            for priority, phrase in enumerate(phrases):
+                self._owners.setdefault(phrase, []).append((category, priority))
+
+        # A phrase found in the text also implies every shorter phrase it contains,
+        # which keeps results identical to checking each phrase with `in`
+        all_phrases = list(self._owners)
+        self._implied = {
+            phrase: [owner for other in all_phrases if other in phrase for owner in self._owners[other]]
+            for phrase in all_phrases
+        }
+
+        self._placeholder_re = re.compile(PLACEHOLDER_PATTERN)
+        self._automaton = None
+        self._regex = None
+        if backend == 'loops' or (backend == 'auto' and len(all_phrases) < LOOPS_MAX_PHRASES):
+            self.backend = 'loops'
+            return
+        if backend in ('auto', 'aho-corasick'):
+            try:
+                import ahocorasick
+                automaton = ahocorasick.Automaton()
+                for phrase in all_phrases:
+                    automaton.add_word(phrase, phrase)
+                automaton.make_automaton()
+                self._automaton = automaton
+            except ImportError:
+                if backend == 'aho-corasick':
+                    raise
+
+        if self._automaton is not None:
+            self.backend = 'aho-corasick'
+        else:
+            self.backend = 'regex'
+            # The template placeholder checks ride along in the same pass
+            self._regex = re.compile(_trie_pattern(all_phrases, [r'\{(?:\{|[a-zA-Z0-9_]+\})']))
+
+    def scan(self, text):
+        """
+        Scan lowercased text once and return {category: phrase} for every category found.
+        For each category the phrase reported is the first one in its list, matching the
+        old `for phrase in ...: if phrase in text: break` loops. A 'template' key holds
+        the first placeholder parameter found, if any.
+        """
+        if not text:
+            return {}
+
+        if self.backend == 'loops':
+            return self._scan_loops(text)
+
+        best = {}
+        has_handlebars = False
+        placeholder = None
+        if self._automaton is not None:
+            for _, phrase in self._automaton.iter(text):
+                for category, priority in self._owners[phrase]:
+                    if priority < best.get(category, len(self.signatures[category])):
+                        best[category] = priority
+            has_handlebars = '{{' in text
+            placeholder_match = self._placeholder_re.search(text)
+            if placeholder_match:
+                placeholder = placeholder_match.group(0)
+        else:
+            search = self._regex.search
+            match = search(text)
+            while match is not None:
+                token = match.group(0)
+                implied = self._implied.get(token)
+                if implied is not None:
+                    for category, priority in implied:
+                        if priority < best.get(category, len(self.signatures[category])):
+                            best[category] = priority
+                elif token == '{{':
+                    has_handlebars = True
+                elif placeholder is None:
+                    placeholder = token
+                # Resume one character in, so phrases overlapping this match are still found
+                match = search(text, match.start() + 1)
+
+        found = {category: self.signatures[category][priority] for category, priority in best.items()}
+        # Handlebars placeholders need a closing pair somewhere in the text
+        if has_handlebars and '}}' in text:
+            found['template'] = '{{}}'
+        elif placeholder:
+            found['template'] = placeholder
+        return found
+
+    def _scan_loops(self, text):
+        """The per-phrase `in` loops the matcher replaced, still the fastest for a few dozen phrases"""
+        found = {}
+        for category, phrases in self.signatures.items():
+            for phrase in phrases:
+                if phrase in text:
+                    found[category] = phrase
+                    break
+        if '{{' in text and '}}' in text:
+            found['template'] = '{{}}'
+        elif '{' in text and '}' in text:
+            match = self._placeholder_re.search(text)
+            if match:
+                found['template'] = match.group(0)
+        return found
@@ -0,0 +1,137 @@
+"""Opt-in profiling for production runs: CPU profiles, tracemalloc snapshots and asyncio task / thread stack dumps"""
+import asyncio
+import cProfile
+import faulthandler
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+log = logging.getLogger(__name__)
+
+class ProfilingHooks:
+    """
+    Writes everything to output_dir, with a timestamp in each file name.
+    arm() makes the next run() call run under cProfile, or the next start()/stop()
+    window of a loop that has no single run to wrap; tracemalloc snapshots
+    are taken by snapshot() once start_memory_tracing() was called; dump_stacks()
+    can be called from any thread.
+    """
+
+    def __init__(self, output_dir='profiles', top=40):
+        self.output_dir = output_dir
+        self.top = top
+        self.loop = None  # The event loop whose tasks dump_stacks() reports
+        self._armed = threading.Event()
+        self._previous_snapshot = None
+        self._profiler = None
+        self._profile_name = None
+        self._profile_started = None
+
+    def _path(self, name, suffix):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}{suffix}")
+
+    def arm(self):
+        """Profile the next run() call, or the next window a loop opens with start()"""
+        self._armed.set()
+
+    @property
+    def armed(self):
+        return self._armed.is_set()
+
+    @property
+    def active_seconds(self):
+        """Seconds the current profile has been running, None when nothing is profiled"""
+        return None if self._profiler is None else time.monotonic() - self._profile_started
+
+    def start(self, name):
+        """Start profiling the calling thread if armed; True when a profile started. Ended by stop()."""
+        if not self._armed.is_set() or self._profiler is not None:
+            return False
+        self._armed.clear()
+        self._profiler = cProfile.Profile()
+        self._profile_name = name
+        self._profile_started = time.monotonic()
+        self._profiler.enable()
+        return True
+
+    def stop(self):
+        """End the current profile and write it, as .pstats and as text"""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None
+        profiler.disable()
+        path = self._path(self._profile_name, '.pstats')
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(self.top)
+        with open(path.replace('.pstats', '.txt'), 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        log.info("🔬 CPU profile of %s written to %s", self._profile_name, path)
+        return path
+
+    async def run(self, name, coroutine_function):
+        """Await coroutine_function(), under cProfile if armed. Only the event loop thread is profiled."""
+        if not self.start(name):
+            return await coroutine_function()
+        try:
+            return await coroutine_function()
+        finally:
+            self.stop()
+
+    def start_memory_tracing(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def snapshot(self, label):
+        """Dump a tracemalloc snapshot and its top allocation growth since the previous one"""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        path = self._path(f"memory-{label}", '.tracemalloc')
+        snapshot.dump(path)
+        if self._previous_snapshot is not None:
+            stats = snapshot.compare_to(self._previous_snapshot, 'lineno')
+            heading = f"Top allocation growth since the previous snapshot ({label})"
+        else:
+            stats = snapshot.statistics('lineno')
+            heading = f"Top allocations ({label})"
+        current, peak = tracemalloc.get_traced_memory()
+        with open(path.replace('.tracemalloc', '.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"{heading}\ncurrent {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            for stat in stats[:self.top]:
+                f.write(f"{stat}\n")
+        self._previous_snapshot = snapshot
+        log.info("🔬 Memory snapshot %s: %.1f MB traced, written to %s", label, current / 1e6, path)
+        return path
+
+    def dump_stacks(self):
+        """
+        Write the stack of every asyncio task and every thread. A loop thread stuck
+        outside an await shows up in the thread stacks. Returns (path, text).
+        """
+        output = io.StringIO()
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            tasks = asyncio.all_tasks(loop)
+            output.write(f"===== {len(tasks)} asyncio tasks =====\n")
+            for task in tasks:
+                output.write(f"\n--- {task.get_name()} ---\n")
+                task.print_stack(file=output)
+        path = self._path('stacks', '.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(output.getvalue())
+            f.write("\n===== Threads =====\n")
+            f.flush()
+            faulthandler.dump_traceback(file=f, all_threads=True)
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        log.info("🔬 Task and thread stacks written to %s", path)
+        return path, text
@@ -0,0 +1,299 @@
+"""
+Per-URL check history in a local SQLite file: every check's verdict, reason, deciding tier,
+latency and final URL, queryable by URL, domain, cell and time, and a summary CLI.
+
+Usage: python result_history.py HISTORY_DB [--url URL | --host HOST | --cell TARGET!N5 | --flapping] [--days 7]
+       python result_history.py HISTORY_DB --compact
+
+Checks older than raw_days are compacted into one row per URL and day; those are kept for
+retention_days.
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+from host_health import host_of
+
+log = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+MAX_PENDING = 10000  # Checks kept in memory while the database cannot be written, oldest dropped first
+
+# Trace stages spent writing to the sheet rather than checking the URL
+SHEETS_STAGES = ('sheets_wait', 'sheets_write')
+
+class ResultHistoryStore:
+    """
+    A trace sink: write() takes the record of one finished URL check (see url_traces) and buffers it,
+    the buffer goes to the database in one transaction every flush_every checks (from a writer thread,
+    since write() runs on the event loop) or on flush(). Queries see flushed checks only.
+    """
+
+    def __init__(self, path, raw_days=14, retention_days=180, flush_every=50, clock=time.time):
+        self.path = path
+        self.raw_days = raw_days
+        self.retention_days = retention_days
+        self.flush_every = flush_every
+        self.clock = clock
+        self._pending = []
+        self._lock = threading.Lock()
+        self._writer = None
+        self._create_tables()
+
+    def _connect(self):
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _create_tables(self):
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS checks (
+                              checked_at REAL NOT NULL,
+                              url TEXT NOT NULL,
+                              host TEXT NOT NULL,
+                              target TEXT,
+                              cell TEXT,
+                              is_working INTEGER NOT NULL,
+                              reason TEXT,
+                              tier TEXT,
+                              latency REAL,
+                              final_url TEXT)""")
+            db.execute("CREATE INDEX IF NOT EXISTS checks_url ON checks (url, checked_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS checks_host ON checks (host, checked_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS checks_cell ON checks (target, cell, checked_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS checks_time ON checks (checked_at)")
+            # One row per URL and UTC day for checks older than raw_days. broken_from is the day's first
+            # broken check after its last working one, None when the day ended working.
+            db.execute("""CREATE TABLE IF NOT EXISTS daily (
+                              day TEXT NOT NULL,
+                              url TEXT NOT NULL,
+                              host TEXT NOT NULL,
+                              checks INTEGER NOT NULL,
+                              broken INTEGER NOT NULL,
+                              last_working_at REAL,
+                              broken_from REAL,
+                              last_reason TEXT,
+                              PRIMARY KEY (url, day))""")
+            db.execute("CREATE INDEX IF NOT EXISTS daily_host ON daily (host, day)")
+            db.execute("CREATE INDEX IF NOT EXISTS daily_day ON daily (day)")
+
+    def write(self, record):
+        """Buffer one trace record; records without a verdict (the check raised) are skipped"""
+        if record.get('is_working') is None:
+            return
+        latency = record.get('total')
+        if latency is not None:
+            latency = max(0.0, latency - sum(record.get('stages', {}).get(stage, 0) for stage in SHEETS_STAGES))
+        row = (record.get('ts') or self.clock(), record['url'], host_of(record['url']), record.get('target'),
+               record.get('cell'), int(bool(record['is_working'])), record.get('reason') or None,
+               record.get('tier'), latency, record.get('final_url'))
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) < self.flush_every or (self._writer is not None and self._writer.is_alive()):
+                return
+            # Called on the event loop as the check finishes - the database write must not block it
+            self._writer = threading.Thread(target=self._background_flush, name='result-history', daemon=True)
+            self._writer.start()
+
+    def _background_flush(self):
+        # A locked or broken database must not fail the checks; the rows stay buffered for the next flush
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            log.warning("⚠️ Could not write the result history to %s: %s", self.path, e)
+
+    def flush(self):
+        """Write the buffered checks in one transaction; returns how many were written"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            with closing(self._connect()) as db:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    db.executemany("""INSERT INTO checks (checked_at, url, host, target, cell, is_working,
+                                                          reason, tier, latency, final_url)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+        except Exception:
+            # Keep the checks for the next flush
+            with self._lock:
+                self._pending[:0] = rows
+                del self._pending[:-MAX_PENDING]
+            raise
+        return len(rows)
+
+    def checks(self, url=None, host=None, target=None, cell=None, since=None, until=None, limit=100):
+        """Checks matching every given filter, newest first, as dicts"""
+        clauses, params = [], []
+        for clause, value in (('url = ?', url), ('host = ?', host and host.lower()), ('target = ?', target),
+                              ('cell = ?', cell), ('checked_at >= ?', since), ('checked_at < ?', until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as db:
+            rows = db.execute(f"SELECT * FROM checks {where} ORDER BY checked_at DESC LIMIT ?",
+                              params + [limit if limit is not None else -1]).fetchall()
+        return [dict(row) for row in rows]
+
+    def daily(self, url=None, host=None, since_day=None):
+        """Compacted per-day rows, newest first; since_day is a 'YYYY-MM-DD' UTC day"""
+        clauses, params = [], []
+        for clause, value in (('url = ?', url), ('host = ?', host and host.lower()), ('day >= ?', since_day)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as db:
+            rows = db.execute(f"SELECT * FROM daily {where} ORDER BY day DESC, url", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def broken_since(self, url):
+        """
+        When the URL's current run of broken checks started, or None if its last check worked
+        (or it was never checked). Compacted days count too, so long outages keep their start.
+        """
+        with closing(self._connect()) as db:
+            last = db.execute("SELECT is_working FROM checks WHERE url = ? ORDER BY checked_at DESC LIMIT 1",
+                              (url,)).fetchone()
+            if last is None:
+                last = db.execute("SELECT broken_from IS NULL FROM daily WHERE url = ? ORDER BY day DESC LIMIT 1",
+                                  (url,)).fetchone()
+            if last is None or last[0]:
+                return None
+            working = db.execute("""SELECT MAX(at) FROM (
+                                        SELECT MAX(checked_at) AS at FROM checks WHERE url = ? AND is_working = 1
+                                        UNION ALL
+                                        SELECT MAX(last_working_at) FROM daily WHERE url = ?)""",
+                                 (url, url)).fetchone()[0] or 0
+            return db.execute("""SELECT MIN(at) FROM (
+                                     SELECT MIN(checked_at) AS at FROM checks
+                                     WHERE url = ? AND is_working = 0 AND checked_at > ?
+                                     UNION ALL
+                                     SELECT MIN(broken_from) FROM daily WHERE url = ? AND broken_from > ?)""",
+                              (url, working, url, working)).fetchone()[0]
+
+    def flapping(self, since, min_changes=3, limit=20):
+        """(url, verdict changes) for URLs whose verdict changed at least min_changes times since, most first"""
+        changes = {}
+        with closing(self._connect()) as db:
+            previous_url, previous = None, None
+            for row in db.execute("""SELECT url, is_working FROM checks WHERE checked_at >= ?
+                                     ORDER BY url, checked_at""", (since,)):
+                if row['url'] == previous_url and row['is_working'] != previous:
+                    changes[row['url']] = changes.get(row['url'], 0) + 1
+                previous_url, previous = row['url'], row['is_working']
+        flaps = sorted(((url, count) for url, count in changes.items() if count >= min_changes),
+                       key=lambda item: (-item[1], item[0]))
+        return flaps[:limit]
+
+    def host_summary(self, since, limit=20):
+        """(host, checks, broken, average latency) since a time, most broken first"""
+        with closing(self._connect()) as db:
+            rows = db.execute("""SELECT host, COUNT(*) AS checks, SUM(1 - is_working) AS broken, AVG(latency) AS latency
+                                 FROM checks WHERE checked_at >= ? GROUP BY host
+                                 ORDER BY broken DESC, checks DESC LIMIT ?""", (since, limit)).fetchall()
+        return [(row['host'], row['checks'], row['broken'], row['latency']) for row in rows]
+
+    def compact(self):
+        """
+        Roll checks older than raw_days into per-day rows and drop days older than retention_days.
+        Only whole days are compacted, so each day's row is written once. Returns (checks compacted, days dropped).
+        """
+        self.flush()
+        now = self.clock()
+        raw_cutoff = _day_start(now - self.raw_days * SECONDS_PER_DAY)
+        days = {}  # (day, url) -> [host, checks, broken, last_working_at, broken_from, last_reason]
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for row in db.execute("""SELECT checked_at, url, host, is_working, reason FROM checks
+                                         WHERE checked_at < ? ORDER BY url, checked_at""", (raw_cutoff,)):
+                    day = days.setdefault((_day(row['checked_at']), row['url']), [row['host'], 0, 0, None, None, None])
+                    day[1] += 1
+                    if row['is_working']:
+                        day[3] = row['checked_at']
+                        day[4] = None
+                    else:
+                        day[2] += 1
+                        day[4] = day[4] or row['checked_at']
+                    day[5] = row['reason']
+                db.executemany("""INSERT OR REPLACE INTO daily (day, url, host, checks, broken,
+                                                                last_working_at, broken_from, last_reason)
+                                  VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                               [(day, url, *values) for (day, url), values in days.items()])
+                compacted = db.execute("DELETE FROM checks WHERE checked_at < ?", (raw_cutoff,)).rowcount
+                dropped = db.execute("DELETE FROM daily WHERE day < ?",
+                                     (_day(now - self.retention_days * SECONDS_PER_DAY),)).rowcount
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return compacted, dropped
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+def _day_start(timestamp):
+    return timestamp - timestamp % SECONDS_PER_DAY
+
+def _when(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+
+def format_checks(checks):
+    lines = []
+    for check in checks:
+        verdict = 'working' if check['is_working'] else 'BROKEN'
+        latency = f"{check['latency']:.2f}s" if check['latency'] is not None else '-'
+        cell = f"{check['target'] or ''}!{check['cell']}" if check['cell'] else '-'
+        lines.append(f"  {_when(check['checked_at'])}  {verdict:7}  {check['tier'] or '-':8} {latency:>7}  "
+                     f"{cell}  {check['url']}{'  -> ' + check['final_url'] if check['final_url'] and check['final_url'] != check['url'] else ''}"
+                     f"{'  (' + check['reason'] + ')' if check['reason'] else ''}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the URL check history")
+    parser.add_argument('path', help="HISTORY_DB file")
+    parser.add_argument('--url', help="Checks of one URL")
+    parser.add_argument('--host', help="Checks of one domain")
+    parser.add_argument('--cell', help="Checks of one cell, as TARGET!N5")
+    parser.add_argument('--flapping', action='store_true', help="URLs whose verdict keeps changing")
+    parser.add_argument('--compact', action='store_true', help="Compact old checks now")
+    parser.add_argument('--days', type=float, default=7, help="How far back to look")
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    store = ResultHistoryStore(args.path)
+    since = time.time() - args.days * SECONDS_PER_DAY
+    if args.compact:
+        compacted, dropped = store.compact()
+        print(f"Compacted {compacted} checks, dropped {dropped} expired days")
+    elif args.url:
+        print(f"Broken since: {_when(store.broken_since(args.url))}")
+        print("\n".join(format_checks(store.checks(url=args.url, since=since, limit=args.limit))))
+    elif args.host or args.cell:
+        target, _, cell = (args.cell or '').rpartition('!')
+        checks = store.checks(host=args.host, target=target if args.cell else None, cell=cell or None,
+                              since=since, limit=args.limit)
+        print("\n".join(format_checks(checks)))
+    elif args.flapping:
+        for url, changes in store.flapping(since, limit=args.limit):
+            print(f"  {changes:4} changes  {url}")
+    else:
+        print(f"Domains over the last {args.days:g} days (most broken first):")
+        for host, checks, broken, latency in store.host_summary(since, limit=args.limit):
+            print(f"  {broken:5}/{checks:<5} broken  {latency or 0:6.2f}s avg  {host}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Run deadline: estimate a sweep's remaining time from observed check latency and pick a concurrency that finishes on time"""
+import math
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+def next_deadline(spec, timezone='America/New_York', now=None):
+    """Epoch seconds of the next 'HH:MM' in timezone, or None without a spec"""
+    if not spec:
+        return None
+    hour, minute = (int(part) for part in spec.strip().split(':'))
+    zone = pytz.timezone(timezone)
+    local_now = now.astimezone(zone) if now else datetime.now(zone)
+    deadline = zone.localize(datetime(local_now.year, local_now.month, local_now.day, hour, minute))
+    if deadline <= local_now:
+        deadline = zone.localize(datetime.combine(local_now.date() + timedelta(days=1), deadline.time()))
+    return deadline.timestamp()
+
+class LatencyTracker:
+    """Moving averages of static and render tier latency, and of how often a check needs rendering"""
+
+    def __init__(self, alpha=0.2, static_seconds=3.0, render_seconds=20.0, render_share=0.8):
+        self.alpha = alpha
+        self.seconds = {'static': static_seconds, 'render': render_seconds}
+        self.render_share = render_share
+        self.checks = 0
+
+    def _average(self, previous, value):
+        return previous + self.alpha * (value - previous)
+
+    def observe(self, tier, seconds):
+        self.seconds[tier] = self._average(self.seconds.get(tier, seconds), seconds)
+
+    def observe_check(self, rendered):
+        self.checks += 1
+        self.render_share = self._average(self.render_share, 1.0 if rendered else 0.0)
+
+    def expected_check_seconds(self):
+        return self.seconds['static'] + self.render_share * self.seconds['render']
+
+class RunBudget:
+    """
+    Picks the smallest concurrency that finishes the remaining checks before the
+    deadline, and says how many checks fit when even max_concurrency is not enough.
+    """
+
+    def __init__(self, deadline, tracker, max_concurrency=3, min_observed_checks=5, clock=time.time):
+        self.deadline = deadline
+        self.tracker = tracker
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_observed_checks = min_observed_checks
+        self.clock = clock
+
+    def seconds_left(self):
+        return self.deadline - self.clock()
+
+    def estimate_seconds(self, remaining, concurrency):
+        return remaining * self.tracker.expected_check_seconds() / max(concurrency, 1)
+
+    def concurrency_for(self, remaining):
+        seconds_left = self.seconds_left()
+        if remaining <= 0:
+            return 1
+        if seconds_left <= 0:
+            return self.max_concurrency
+        needed = math.ceil(self.estimate_seconds(remaining, 1) / seconds_left)
+        return min(self.max_concurrency, max(1, needed))
+
+    def capacity(self):
+        """Checks that still fit before the deadline at max concurrency"""
+        seconds_left = max(self.seconds_left(), 0)
+        return int(seconds_left * self.max_concurrency / self.tracker.expected_check_seconds())
+
+    def checks_to_defer(self, remaining):
+        """
+        How many of the remaining (lowest priority last) checks to give up on.
+        Estimates only count once enough checks were observed; after the deadline everything left is deferred.
+        """
+        if self.seconds_left() <= 0:
+            return remaining
+        if self.tracker.checks < self.min_observed_checks:
+            return 0
+        return max(0, remaining - self.capacity())
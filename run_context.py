@@ -0,0 +1,319 @@
+"""Run context: the sheet targets one process checks, their formatting state, and the engines they share"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class SheetTarget:
+    """One (spreadsheet, worksheet, columns) combination to check"""
+    spreadsheet_id: str
+    worksheet_id: str = None  # None = first worksheet
+    columns: list = field(default_factory=list)
+
+    @property
+    def label(self):
+        return f"{self.spreadsheet_id}/{self.worksheet_id or 'first'}"
+
+def load_targets(spec, default_spreadsheet, default_worksheet, default_columns):
+    """
+    Parse SHEET_TARGETS: a JSON list (inline, or a path to a JSON file) of
+    {"spreadsheet": ..., "worksheet": ..., "columns": "N,O,P"} objects.
+    Without a spec, the single SHEET_URL / WORKSHEET_ID / URL_COLUMNS target is used.
+    """
+    if not spec:
+        return [SheetTarget(default_spreadsheet, default_worksheet or None, list(default_columns))]
+
+    if os.path.exists(spec):
+        with open(spec, encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        entries = json.loads(spec)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("SHEET_TARGETS must be a non-empty JSON list of targets")
+
+    targets = []
+    for entry in entries:
+        columns = entry.get('columns') or default_columns
+        if isinstance(columns, str):
+            columns = [column.strip() for column in columns.split(',') if column.strip()]
+        worksheet = entry.get('worksheet')
+        targets.append(SheetTarget(entry['spreadsheet'], str(worksheet) if worksheet else None, list(columns)))
+    return targets
+
+def parse_reason_columns(spec):
+    """
+    Parse REASON_COLUMNS ("N:BM,O:BN") into {url column: status column}.
+    Raises ValueError naming the first entry that is not two column letters.
+    """
+    columns = {}
+    for pair in spec.replace(' ', '').upper().split(','):
+        if not pair:
+            continue
+        url_col, _, status_col = pair.partition(':')
+        if not (url_col.isalpha() and status_col.isalpha() and url_col.isascii() and status_col.isascii()):
+            raise ValueError(f"REASON_COLUMNS entry '{pair}' must be URL_COLUMN:STATUS_COLUMN, e.g. N:BM")
+        columns[url_col] = status_col
+    return columns
+
+@dataclass
+class TargetState:
+    """Formatting state of one target's worksheet"""
+    target: SheetTarget
+    sheet: object = None
+    successfully_formatted_cells: set = field(default_factory=set)
+    failed_formatted_cells: set = field(default_factory=set)
+
+    # (spreadsheet id, worksheet id) of the worksheet last bound, kept when sheet is dropped for a re-lookup
+    worksheet_key: tuple = None
+
+    def bind(self, sheet):
+        self.sheet = sheet
+        self.worksheet_key = worksheet_key(sheet)
+
+    def reset_formatting(self):
+        self.successfully_formatted_cells = set()
+        self.failed_formatted_cells = set()
+
+def worksheet_key(sheet):
+    """(spreadsheet id, worksheet id) of a gspread worksheet, with None for ids it does not expose"""
+    worksheet_id = getattr(sheet, 'id', None)
+    return (getattr(getattr(sheet, 'spreadsheet', None), 'id', None),
+            str(worksheet_id) if worksheet_id is not None else None)
+
+class UrlTask:
+    """
+    One URL to check. Slotted because a sweep holds one per URL for every cell of every target;
+    content refers to the cell text shared by all URLs of the cell, and col to one interned letter string.
+    """
+    __slots__ = ('url', 'sheet', 'row', 'col', 'content', 'is_last_url', 'is_potential_url')
+
+    def __init__(self, url, sheet, row, col, content, is_last_url=True, is_potential_url=False):
+        self.url = url
+        self.sheet = sheet
+        self.row = row
+        self.col = col
+        self.content = content
+        self.is_last_url = is_last_url            # The cell's color follows its last URL
+        self.is_potential_url = is_potential_url  # Cell text without a recognizable URL, checked as http://<text>
+
+    @property
+    def cell_id(self):
+        return f"{self.col}{self.row}"
+
+class VerdictCache:
+    """
+    URL -> (is_working, reason) for ttl_seconds, so a URL that appears in many cells or sheets is checked once.
+    Expired entries are pruned once per ttl_seconds, so a continuous run holds at most two TTLs' worth of URLs.
+    """
+
+    def __init__(self, ttl_seconds=3600, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = {}
+        self._next_prune = clock() + ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url):
+        entry = self._entries.get(url)
+        if entry is None or self.clock() - entry[2] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, url, is_working, reason):
+        if self.ttl_seconds > 0:
+            now = self.clock()
+            self._entries[url] = (is_working, reason, now)
+            if now >= self._next_prune:
+                self.prune(now)
+
+    def prune(self, now=None):
+        """Drop expired entries, returning how many were dropped"""
+        now = self.clock() if now is None else now
+        expired = [url for url, entry in self._entries.items() if now - entry[2] > self.ttl_seconds]
+        for url in expired:
+            del self._entries[url]
+        self._next_prune = now + self.ttl_seconds
+        return len(expired)
+
+    def clear(self):
+        self._entries.clear()
+
+    def export(self):
+        """Entries as JSON-friendly lists, for checkpoints"""
+        return {url: list(entry) for url, entry in self._entries.items()}
+
+    def load(self, entries):
+        for url, (is_working, reason, checked_at) in entries.items():
+            self._entries[url] = (is_working, reason, checked_at)
+
+class RateLimiter:
+    """Blocking token bucket shared by every Sheets write, whichever target it is for"""
+
+    def __init__(self, per_minute, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 60 / per_minute if per_minute > 0 else 0
+        self.clock = clock
+        self.sleep = sleep
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until the next write is allowed"""
+        with self._lock:
+            now = self.clock()
+            wait = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        if wait > 0:
+            self.sleep(wait)
+
+class BrowserPool:
+    """
+    Chrome drivers shared by all targets, recycled after max_lifetime seconds.
+    Thread-safe: starting and quitting Chrome takes seconds, so the bot calls it from worker threads.
+    """
+
+    def __init__(self, factory, size=1, max_lifetime=1200, clock=time.time):
+        self.factory = factory
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.clock = clock
+        self._idle = []
+        self._started = {}
+        self._broken = set()
+        self._lock = threading.Lock()
+
+    def _expired(self, driver):
+        return id(driver) in self._broken or self.clock() - self._started.get(id(driver), 0) > self.max_lifetime
+
+    def mark_broken(self, driver):
+        """A driver whose tab crashed: quit instead of reused when it is released or refreshed"""
+        if driver is not None:
+            with self._lock:
+                self._broken.add(id(driver))
+
+    def acquire(self):
+        """An idle driver that has not outlived max_lifetime, or a new one"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                driver = self._idle.pop()
+                if not self._expired(driver):
+                    return driver
+            self.discard(driver)
+        driver = self.factory()
+        with self._lock:
+            self._started[id(driver)] = self.clock()
+        return driver
+
+    def refresh(self, driver):
+        """Swap a driver that has outlived max_lifetime for a new one"""
+        with self._lock:
+            if driver is not None and not self._expired(driver):
+                return driver
+        if driver is not None:
+            log.info("Browser lifetime exceeded %s minutes. Reinitializing...", self.max_lifetime // 60)
+            self.discard(driver)
+        return self.acquire()
+
+    def release(self, driver):
+        """Return a driver to the pool, quitting it when the pool is full or it is too old"""
+        if driver is None:
+            return
+        with self._lock:
+            if len(self._idle) < self.size and not self._expired(driver):
+                self._idle.append(driver)
+                return
+        self.discard(driver)
+
+    def discard(self, driver):
+        with self._lock:
+            self._started.pop(id(driver), None)
+            self._broken.discard(id(driver))
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return
+                driver = self._idle.pop()
+            self.discard(driver)
+
+def make_http_session(pool_size=10, user_agent=None):
+    """requests.Session with a connection pool sized for pool_size concurrent hosts"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+    return session
+
+class RunContext:
+    """Targets checked by this process plus the HTTP session, browser pool, verdict cache and Sheets limiter they share"""
+
+    def __init__(self, targets, http_session, browser_pool, verdict_cache, sheets_limiter):
+        self.states = [TargetState(target) for target in targets]
+        self.http_session = http_session
+        self.browser_pool = browser_pool
+        self.verdict_cache = verdict_cache
+        self.sheets_limiter = sheets_limiter
+        # Shared write-retry queue - each entry carries the sheet it belongs to
+        self.pending_formats = []
+        # Failure reasons waiting for the next bulk flush: (id(sheet), row, col) -> (sheet, row, col, text)
+        self.pending_reasons = {}
+        # Failed flushes per queued reason, so one the API keeps rejecting is eventually dropped
+        self.reason_failures = {}
+
+    def state_for(self, sheet):
+        """
+        Formatting state of the target a worksheet belongs to, or None for a worksheet no target covers.
+        Tasks keep the worksheet they were collected from after a failed refresh drops it from its
+        target, so worksheets are matched by id as well as by identity.
+        """
+        for state in self.states:
+            if state.sheet is sheet:
+                return state
+        key = worksheet_key(sheet)
+        if key[0] is not None and key[1] is not None:
+            for state in self.states:
+                if state.worksheet_key == key or (state.sheet is not None and worksheet_key(state.sheet) == key):
+                    return state
+            # Never bound: the target names the worksheet, or takes the only first-worksheet slot of the spreadsheet
+            for state in self.states:
+                if state.target.spreadsheet_id == key[0] and state.target.worksheet_id == key[1]:
+                    return state
+            first = [state for state in self.states
+                     if state.target.spreadsheet_id == key[0] and not state.target.worksheet_id]
+            if len(first) == 1:
+                return first[0]
+        log.error("❌ Worksheet %s/%s is not one of the checked targets - ignoring it", *key)
+        return None
+
+    def state_by_label(self, label):
+        for state in self.states:
+            if state.target.label == label:
+                return state
+        return None
+
+    def formatting_totals(self):
+        """(successfully formatted, failed) cell counts across all targets"""
+        return (sum(len(state.successfully_formatted_cells) for state in self.states),
+                sum(len(state.failed_formatted_cells) for state in self.states))
@@ -0,0 +1,70 @@
+"""End-of-run Slack digest: cells that broke or recovered since their last check, the top failing domains and run stats"""
+import time
+from collections import Counter
+
+from host_health import host_of
+
+class RunDigest:
+    """
+    Collects one run's cell verdicts next to each cell's previous verdict. tier_counts is the
+    url_checker_checks_total counter at the start of the run, so render() can report the run's share.
+    """
+
+    def __init__(self, tier_counts=None, clock=time.time):
+        self.clock = clock
+        self.started_at = clock()
+        self.tier_counts = dict(tier_counts or {})
+        self.newly_broken = []  # (cell, url)
+        self.recovered = []
+        self.cells = 0
+        self.broken = 0
+        self.failing_hosts = Counter()
+
+    def add_result(self, cell, url, is_working, previous=None):
+        """previous is the cell's verdict before this run, None when it had not been checked"""
+        self.cells += 1
+        if is_working:
+            if previous is False:
+                self.recovered.append((cell, url))
+            return
+        self.broken += 1
+        self.failing_hosts[host_of(url) or url] += 1
+        if previous is True:
+            self.newly_broken.append((cell, url))
+
+    @property
+    def changed(self):
+        return bool(self.newly_broken or self.recovered)
+
+    def render(self, title, urls_checked, tier_counts=None, max_cells=15, top_hosts=5, flapping=()):
+        """Slack mrkdwn text; flapping is (url, verdict changes) from the result history"""
+        seconds = max(self.clock() - self.started_at, 1e-3)
+        minutes, secs = divmod(int(seconds), 60)
+        lines = [f"*{title}*",
+                 f"{urls_checked} URLs in {minutes}m {secs:02d}s ({urls_checked / seconds:.2f} URLs/sec), "
+                 f"{self.broken} of {self.cells} cells broken"]
+        tiers = tier_breakdown(self.tier_counts, tier_counts or {})
+        if tiers:
+            lines.append("Decided by: " + ", ".join(f"{tier} {count}" for tier, count in tiers))
+        for label, cells in ((":red_circle: Newly broken", self.newly_broken),
+                             (":large_green_circle: Recovered", self.recovered)):
+            if cells:
+                lines.append(f"{label} ({len(cells)}):")
+                lines.extend(f"• {cell} {url}" for cell, url in cells[:max_cells])
+                if len(cells) > max_cells:
+                    lines.append(f"• … and {len(cells) - max_cells} more")
+        if self.failing_hosts:
+            lines.append("Top failing domains: " + ", ".join(
+                f"{host} ({count})" for host, count in self.failing_hosts.most_common(top_hosts)))
+        if flapping:
+            lines.append(f":warning: Flapping ({len(flapping)}):")
+            lines.extend(f"• {url} ({changes} changes)" for url, changes in flapping[:max_cells])
+        return "\n".join(lines)
+
+def tier_breakdown(before, after):
+    """(tier, checks) made between two snapshots of a counter labelled by tier, most first"""
+    counts = Counter()
+    for labels, value in after.items():
+        tier = dict(labels).get('tier', 'unknown')
+        counts[tier] += value - before.get(labels, 0)
+    return [(tier, int(count)) for tier, count in counts.most_common() if count > 0]
@@ -0,0 +1,119 @@
+"""Live progress of the current run, shared between the event loop and the health server thread"""
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+STARTING = 'starting'
+COLLECTING = 'collecting'
+CHECKING = 'checking'
+WRITING = 'writing'
+IDLE = 'idle'
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds') if timestamp else None
+
+class RunProgress:
+    """
+    The bot reports phases, finished URLs and writes; the health server reads status() and stalled().
+    Progress is any finished URL, successful write, phase change or sheet read. beat() is called by a
+    task on the event loop, so a loop blocked in time.sleep() stops beating even while idle.
+    """
+
+    def __init__(self, window=100, clock=time.time):
+        self.clock = clock
+        self.run_id = None
+        self.phase = STARTING
+        self.urls_done = 0
+        self.urls_total = 0
+        self.started_at = clock()
+        self.phase_since = self.started_at
+        self.last_progress = self.started_at
+        self.last_beat = self.started_at
+        self._completions = deque(maxlen=window)  # Finish times of the latest URLs, for throughput
+        self._lock = threading.Lock()
+
+    def start_run(self, total, done=0, run_id=None):
+        """A new sweep (or scheduler refresh window) of total URLs, done of them already checked"""
+        with self._lock:
+            now = self.clock()
+            self.run_id = run_id or uuid.uuid4().hex[:12]
+            self.urls_total = total
+            self.urls_done = done
+            self.started_at = now
+            self.last_progress = now
+            self._completions.clear()
+
+    def set_phase(self, phase):
+        with self._lock:
+            now = self.clock()
+            if phase != self.phase:
+                self.phase = phase
+                self.phase_since = now
+            self.last_progress = now
+
+    def advance(self, count=1):
+        """count more URLs finished"""
+        with self._lock:
+            now = self.clock()
+            self.urls_done += count
+            self.last_progress = now
+            self._completions.extend([now] * count)
+
+    def drop(self, count):
+        """count URLs left out of the run (deferred to the next one)"""
+        with self._lock:
+            self.urls_total = max(self.urls_done, self.urls_total - count)
+
+    def add(self, count):
+        """count more URLs joined the run (shards taken over from another worker)"""
+        with self._lock:
+            self.urls_total += count
+
+    def touch(self):
+        """Progress other than a finished URL: a write went through, a sheet was read"""
+        with self._lock:
+            self.last_progress = self.clock()
+
+    def beat(self):
+        with self._lock:
+            self.last_beat = self.clock()
+
+    def _urls_per_second(self, now):
+        if len(self._completions) < 2:
+            return 0.0
+        # Count the time since the last completion too, so the rate falls when checks stop finishing
+        return (len(self._completions) - 1) / max(now - self._completions[0], 1e-6)
+
+    def stalled(self, max_seconds):
+        """Why the run looks wedged, or None. Idle waits only count when the event loop stopped beating."""
+        if not max_seconds:
+            return None
+        with self._lock:
+            now = self.clock()
+            if now - self.last_beat > max_seconds:
+                return f"event loop blocked for {now - self.last_beat:.0f}s"
+            if self.phase != IDLE and now - self.last_progress > max_seconds:
+                return f"no progress for {now - self.last_progress:.0f}s while {self.phase}"
+            return None
+
+    def status(self, pending_writes=0):
+        with self._lock:
+            now = self.clock()
+            rate = self._urls_per_second(now)
+            remaining = max(0, self.urls_total - self.urls_done)
+            return {
+                'run_id': self.run_id,
+                'phase': self.phase,
+                'phase_seconds': round(now - self.phase_since, 1),
+                'urls_done': self.urls_done,
+                'urls_total': self.urls_total,
+                'urls_per_minute': round(rate * 60, 2),
+                'eta_seconds': round(remaining / rate) if rate and remaining else (0 if not remaining else None),
+                'pending_writes': pending_writes,
+                'run_started_at': _iso(self.started_at),
+                'last_progress_at': _iso(self.last_progress),
+                'seconds_since_progress': round(now - self.last_progress, 1),
+                'seconds_since_loop_beat': round(now - self.last_beat, 1),
+            }
@@ -0,0 +1,127 @@
+"""Row-range shard leases in a shared SQLite file, so several bot processes can split the sheets they check"""
+import math
+import os
+import socket
+import sqlite3
+import time
+from contextlib import closing
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class ShardLeaseStore:
+    """
+    Each shard is a fixed range of rows of one worksheet (the scope, e.g. the
+    target label), keyed "scope#index". A worker only checks and formats
+    rows of shards it holds an unexpired lease on. Workers heartbeat, claim
+    their fair share of shards (free or expired ones first) and hand back extras
+    when another worker joins, so a dead worker's shards are picked up once its
+    leases expire.
+    """
+
+    def __init__(self, path, worker_id=None, lease_seconds=300, shard_rows=500, clock=time.time):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.shard_rows = shard_rows
+        self.clock = clock
+        self.owned = {}  # shard_id -> lease expiry
+        self._create_tables()
+
+    def _connect(self):
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _create_tables(self):
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS shard_leases (
+                              shard_id TEXT PRIMARY KEY,
+                              owner TEXT,
+                              expires_at REAL NOT NULL DEFAULT 0,
+                              generation INTEGER NOT NULL DEFAULT 0)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS workers (
+                              worker_id TEXT PRIMARY KEY,
+                              heartbeat REAL NOT NULL)""")
+
+    def shard_for_row(self, row, scope=''):
+        """Shard id of a 1-based sheet row (row 1 is the header)"""
+        return f"{scope}#{max(row - 2, 0) // self.shard_rows}"
+
+    def shard_count(self, total_rows):
+        return max(1, math.ceil(max(total_rows - 1, 0) / self.shard_rows))
+
+    def sync(self, rows_by_scope):
+        """
+        Heartbeat, renew held leases, claim this worker's fair share and release extras.
+        rows_by_scope maps each scope to its worksheet's row count.
+        Returns (gained, lost) shard id sets since the previous sync.
+        """
+        now = self.clock()
+        expires_at = now + self.lease_seconds
+        shards = [f"{scope}#{index}" for scope, total_rows in rows_by_scope.items()
+                  for index in range(self.shard_count(total_rows))]
+        valid = set(shards)
+        before = set(self.owned)
+
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany("INSERT OR IGNORE INTO shard_leases (shard_id) VALUES (?)",
+                           [(shard_id,) for shard_id in shards])
+            db.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat) VALUES (?, ?)",
+                       (self.worker_id, now))
+            db.execute("DELETE FROM workers WHERE heartbeat < ?", (now - self.lease_seconds,))
+            live_workers = db.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+            fair_share = math.ceil(len(shards) / max(live_workers, 1))
+
+            # Renew what we still own - a shard taken over after our lease expired has another owner
+            held = [row[0] for row in db.execute(
+                "SELECT shard_id FROM shard_leases WHERE owner = ? ORDER BY shard_id", (self.worker_id,))]
+            keep = [shard_id for shard_id in held if shard_id in valid][:fair_share]
+            db.executemany("UPDATE shard_leases SET expires_at = ? WHERE shard_id = ?",
+                           [(expires_at, shard_id) for shard_id in keep])
+
+            # Hand back extras (or shards of shrunken or removed sheets) so other workers can pick them up
+            db.executemany("UPDATE shard_leases SET owner = NULL, expires_at = 0 WHERE shard_id = ?",
+                           [(shard_id,) for shard_id in held if shard_id not in keep])
+            held = keep
+
+            if len(held) < fair_share:
+                free = [row[0] for row in db.execute(
+                    """SELECT shard_id FROM shard_leases
+                       WHERE owner IS NULL OR expires_at <= ?
+                       ORDER BY expires_at, shard_id""", (now,))
+                        if row[0] in valid][:fair_share - len(held)]
+                for shard_id in free:
+                    db.execute("""UPDATE shard_leases SET owner = ?, expires_at = ?, generation = generation + 1
+                                  WHERE shard_id = ?""", (self.worker_id, expires_at, shard_id))
+                held.extend(free)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+        self.owned = {shard_id: expires_at for shard_id in held}
+        after = set(self.owned)
+        return after - before, before - after
+
+    def heartbeat(self):
+        """Register as a live worker without claiming anything, so others count us in their fair share"""
+        with closing(self._connect()) as db:
+            db.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat) VALUES (?, ?)",
+                       (self.worker_id, self.clock()))
+
+    def holds_row(self, row, scope=''):
+        """True while this worker's lease on the row's shard has not expired"""
+        expires_at = self.owned.get(self.shard_for_row(row, scope))
+        return expires_at is not None and expires_at > self.clock()
+
+    def release_all(self):
+        """Give up all leases, e.g. on shutdown, so other workers take over without waiting for expiry"""
+        with closing(self._connect()) as db:
+            db.execute("UPDATE shard_leases SET owner = NULL, expires_at = 0 WHERE owner = ?", (self.worker_id,))
+            db.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+        self.owned = {}
@@ -0,0 +1,134 @@
+"""Slack webhook notifications posted from a background task, batched and retried without blocking the event loop"""
+import asyncio
+import logging
+import random
+
+import requests
+
+log = logging.getLogger(__name__)
+
+MAX_MESSAGE_CHARS = 3500  # Slack truncates long webhook texts; batched messages are split below this
+CLOSE_TIMEOUT_SECONDS = 30  # How long aclose() waits for queued messages before dropping them
+
+class SlackNotifier:
+    """
+    notify() queues a message and returns at once. A task on the event loop waits batch_seconds for
+    more messages, joins them into as few posts as fit MAX_MESSAGE_CHARS and posts them from a worker
+    thread with one reused session. 429s wait for Retry-After, other failures back off exponentially.
+    """
+
+    def __init__(self, webhook_url, batch_seconds=5, max_retries=5, timeout=10, session=None):
+        self.webhook_url = webhook_url
+        self.batch_seconds = batch_seconds
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._batch = []  # Messages taken off the queue but not yet posted
+
+    def notify(self, text):
+        """Queue a message; the sender task starts on the running event loop with the first one"""
+        if not self.webhook_url:
+            log.info("Slack webhook URL not configured, skipping notification")
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._start(loop)
+        self._queue.put_nowait(text)
+
+    def _start(self, loop):
+        """(Re)start the sender on this loop, carrying over what the old loop's sender had not posted"""
+        pending, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        for text in pending:
+            self._queue.put_nowait(text)
+        self._task = loop.create_task(self._run())
+
+    async def flush(self):
+        """Wait until every queued message has been posted or given up on"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def aclose(self, timeout=CLOSE_TIMEOUT_SECONDS):
+        """Post what is still queued (up to timeout seconds), then stop the sender task"""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Dropping %s queued Slack message(s) on shutdown", len(self._batch) + self._queue.qsize())
+        self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self._batch = messages = [await self._queue.get()]
+            await asyncio.sleep(self.batch_seconds)
+            while not self._queue.empty():
+                messages.append(self._queue.get_nowait())
+            try:
+                for text in batch_texts(messages):
+                    try:
+                        posted = await self._post(text)
+                    except Exception:
+                        # One bad message must not stop the sender for the rest of the process
+                        log.exception("Unexpected error sending Slack message")
+                        posted = False
+                    if posted:
+                        self.sent += 1
+                    else:
+                        self.failed += 1
+            finally:
+                self._batch = []
+                for _ in messages:
+                    self._queue.task_done()
+
+    async def _post(self, text):
+        for attempt in range(self.max_retries + 1):
+            wait = min(2 ** attempt * random.uniform(0.5, 1.5), 60)
+            try:
+                response = await asyncio.to_thread(self.session.post, self.webhook_url,
+                                                   json={'text': text}, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                log.warning("Error sending Slack message (attempt %s/%s): %s", attempt + 1, self.max_retries + 1, e)
+            else:
+                if response.ok:
+                    log.info("Slack notification sent successfully")
+                    return True
+                if response.status_code == 429:
+                    wait = retry_after_seconds(response, wait)
+                    log.warning("Slack rate limited the webhook, retrying in %.0fs", wait)
+                elif response.status_code < 500:
+                    # Bad webhook or payload - retrying will not help
+                    log.warning("Slack rejected the message: %s %s", response.status_code, response.text[:200])
+                    return False
+                else:
+                    log.warning("Slack error %s (attempt %s/%s)", response.status_code, attempt + 1, self.max_retries + 1)
+            if attempt < self.max_retries:
+                await asyncio.sleep(wait)
+        log.warning("Giving up on a Slack message after %s attempts", self.max_retries + 1)
+        return False
+
+def retry_after_seconds(response, default):
+    try:
+        return max(1.0, float(response.headers.get('Retry-After', default)))
+    except ValueError:
+        return default
+
+def batch_texts(messages, limit=MAX_MESSAGE_CHARS):
+    """Join messages into as few texts as fit the limit; a single longer message is cut at the limit"""
+    texts = []
+    for message in messages:
+        message = message if len(message) <= limit else message[:limit - 1] + '…'
+        if texts and len(texts[-1]) + 2 + len(message) <= limit:
+            texts[-1] += '\n\n' + message
+        else:
+            texts.append(message)
+    return texts
@@ -0,0 +1,78 @@
+"""Checkpoints of an in-progress sweep, so a restarted process resumes where it stopped"""
+import json
+import os
+import time
+import uuid
+
+def task_key(label, col, row, url):
+    """Identity of one URL check; survives rows being added elsewhere in the sheet, unlike a list index"""
+    return f"{label}!{col}{row}|{url}"
+
+class SweepCheckpoint:
+    """
+    Progress of one sweep: the run id, which checks are done, formats not yet
+    written, formatting state and the verdict cache. Saved atomically as JSON.
+    """
+
+    def __init__(self, path, run_id=None, started_at=None, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = started_at or clock()
+        self.done = set()
+        self.pending_formats = []
+        self.formatted_cells = {}
+        self.verdict_cache = {}
+        self._last_save = clock()
+        self._unsaved = 0
+
+    @classmethod
+    def resume(cls, path, max_age_seconds, clock=time.time):
+        """Load the checkpoint at path if it belongs to a run started less than max_age_seconds ago"""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if clock() - data.get('started_at', 0) > max_age_seconds:
+            return None
+        checkpoint = cls(path, data['run_id'], data['started_at'], clock)
+        checkpoint.done = set(data.get('done', []))
+        checkpoint.pending_formats = data.get('pending_formats', [])
+        checkpoint.formatted_cells = data.get('formatted_cells', {})
+        checkpoint.verdict_cache = data.get('verdict_cache', {})
+        return checkpoint
+
+    def is_done(self, key):
+        return key in self.done
+
+    def mark_done(self, key):
+        self.done.add(key)
+        self._unsaved += 1
+
+    def save_due(self, every_checks, every_seconds):
+        """True when enough checks or time have passed since the last save"""
+        return self._unsaved > 0 and (self._unsaved >= every_checks or
+                                      self.clock() - self._last_save >= every_seconds)
+
+    def save(self, pending_formats, formatted_cells, verdict_cache):
+        data = {
+            'version': 1,
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'saved_at': self.clock(),
+            'done': sorted(self.done),
+            'pending_formats': pending_formats,
+            'formatted_cells': formatted_cells,
+            'verdict_cache': verdict_cache,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._last_save = self.clock()
+        self._unsaved = 0
+
+    def clear(self):
+        """The sweep finished, so the next one starts from scratch"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
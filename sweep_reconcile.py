@@ -0,0 +1,64 @@
+"""End-of-sweep reconciliation: the cells whose color never got written, found in one pass over an index built during the run"""
+
+RED = 'red'
+BLUE = 'blue'
+
+def cell_key(task):
+    """Cells are keyed by worksheet and cell id, since several targets can share cell names"""
+    return id(task.sheet), task.cell_id
+
+class SweepLedger:
+    """
+    Cell -> the task that decides its color -> the verdict that task got. Only a cell's last
+    URL decides its color, so the ledger holds one entry per cell however many URLs it has.
+    """
+
+    def __init__(self, tasks=()):
+        self._cells = {}  # cell key -> [task, is_working, or None until checked]
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self):
+        return len(self._cells)
+
+    def add(self, task):
+        if task.is_last_url:
+            self._cells[cell_key(task)] = [task, None]
+
+    def discard(self, task):
+        """Forget a cell whose deciding URL is not checked this run (deferred), so it keeps its color"""
+        if task.is_last_url:
+            self._cells.pop(cell_key(task), None)
+
+    def record(self, task, is_working):
+        entry = self._cells.get(cell_key(task))
+        if entry is not None and task.is_last_url:
+            entry[1] = is_working
+
+    def results(self):
+        """(task, is_working) for every cell that got a verdict this run"""
+        return [(task, is_working) for task, is_working in self._cells.values() if is_working is not None]
+
+    def verdict(self, task):
+        entry = self._cells.get(cell_key(task))
+        return entry[1] if entry else None
+
+    def unaccounted(self, accounted):
+        """
+        (task, color) for every cell whose key is not in accounted (formatted or queued for a write).
+        Cells without a verdict, checked before a restart or lost to an error, default to red.
+        """
+        return [(task, BLUE if is_working else RED)
+                for key, (task, is_working) in self._cells.items() if key not in accounted]
+
+    def expected_colors(self, written):
+        """
+        (task, color) for every cell: the color of its verdict or, for a cell without one (checked before
+        a restart), the color written for it as given by written[cell key]. Cells with neither are left out.
+        """
+        expected = []
+        for key, (task, is_working) in self._cells.items():
+            color = written.get(key) if is_working is None else (BLUE if is_working else RED)
+            if color:
+                expected.append((task, color))
+        return expected
@@ -1,80 +1,198 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import requests
 import time
+PROCESS_START = time.time()  # Time-to-first-check is measured from here
+
+import requests
 import asyncio
 import json
 from datetime import datetime, timedelta
 import pytz
 import os
+import sys
 from dotenv import load_dotenv
 import re
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from gspread_formatting import *
 import threading
+import signal
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import traceback
+import logging
 from urllib.parse import urlparse
 import random
 from time import sleep
+from page_signatures import SignatureMatcher, load_signatures
+from html_analysis import analyze_html_async, resolve_backend
+from page_classifier import (PageFeatures, Verdict, classify_page, classify_static, content_quality_score,
+                             has_real_static_content, is_template_url)
+from check_scheduler import CheckScheduler, SchedulePolicy
+from shard_leases import ShardLeaseStore
+from run_context import (BrowserPool, RateLimiter, RunContext, UrlTask, VerdictCache, load_targets,
+                         make_http_session, parse_reason_columns)
+from sweep_checkpoint import SweepCheckpoint, task_key
+from sweep_reconcile import SweepLedger, cell_key
+from slack_notifier import SlackNotifier
+from result_history import ResultHistoryStore
+from run_digest import RunDigest
+from run_budget import LatencyTracker, RunBudget, next_deadline
+from collections import deque
+from host_health import HostHealth, host_of
+from metrics import Metrics, process_rss_bytes
+from url_traces import TeeSink, TraceSink, add_stage_time, annotate_trace, trace_stage, tracing, url_trace
+import socket
+import sqlite3
+import uuid
+from profiling_hooks import ProfilingHooks
+from log_setup import configure_logging
+from run_progress import CHECKING, COLLECTING, IDLE, WRITING, RunProgress
+# gspread, gspread_formatting and selenium are imported where they are first used, to keep startup fast
 
 # Load environment variables
 load_dotenv()
 
-# Set up Google Sheets credentials
+log = logging.getLogger('url_checker')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # DEBUG adds per-URL detail: extracted URLs, tiers, formatting attempts
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # text, or json for one JSON object per line
+
+# Google Sheets scopes - the client is created on first use by get_gspread_client()
 scope = ['https://spreadsheets.google.com/feeds',
          'https://www.googleapis.com/auth/drive',
          'https://www.googleapis.com/auth/spreadsheets']
+gspread_client = None
 
-# Modify the credentials setup
-if os.getenv('GOOGLE_CREDENTIALS'):
-    # Use credentials from environment variable
-    import json
-    credentials_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-else:
-    # Use local file for development
-    credentials = ServiceAccountCredentials.from_json_keyfile_name('sheetscredentials.json', scope)
-
-gc = gspread.authorize(credentials)
-
-# After loading credentials
-print("Service Account Email:", credentials._service_account_email)
-try:
-    # Try to list all spreadsheets to verify credentials
-    all_sheets = gc.openall()
-    print(f"Successfully authenticated. Can access {len(all_sheets)} sheets.")
-except Exception as e:
-    print(f"Authentication error: {str(e)}")
+def get_gspread_client():
+    """Authorize the service account on first use and reuse the client afterwards"""
+    global gspread_client
+    if gspread_client is None and SHEETS_API_URL:
+        # Unauthenticated client for a local stand-in of the Sheets API
+        from fake_sheets import client_for
+        gspread_client = client_for(SHEETS_API_URL)
+        log.info("Using the Sheets API at %s", SHEETS_API_URL)
+    if gspread_client is None:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        
+        if os.getenv('GOOGLE_CREDENTIALS'):
+            # Use credentials from environment variable
+            credentials_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
+            credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
+        else:
+            # Use local file for development
+            credentials = ServiceAccountCredentials.from_json_keyfile_name('sheetscredentials.json', scope)
+        
+        gspread_client = gspread.authorize(credentials)
+        log.info("Service Account Email: %s", credentials._service_account_email)
+    return gspread_client
 
 # Set up Slack webhook - get from environment variable
 SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
+SLACK_BATCH_SECONDS = int(os.getenv('SLACK_BATCH_SECONDS', 5))  # Messages queued this close together go out as one post
+slack = None  # SlackNotifier, built by init()
 SHEET_URL = os.getenv('SHEET_URL', '14Yk8UnQviC29ascf4frQfAEDWzM2_bp1UloRcnW8ZCg')
 WORKSHEET_ID = os.getenv('WORKSHEET_ID', '1795345169')  # Default to the worksheet ID from the URL
 # Define columns to check for URLs - can be configured in .env or hard-coded
 URL_COLUMNS = os.getenv('URL_COLUMNS', 'N,O,P,Q,R,S,T,U,V,W,X,Y,Z,AA,AB,AC,AD,AE,AF,AG,AH,AI,AJ,AK,AL,AM,AN,AO,AP,AQ,AR,AS,AT,AU,AV,AW,AX,AY,AZ,BA,BB,BC,BD,BE,BF,BG,BH,BI,BJ,BK,BL').split(',')
+# Several (spreadsheet, worksheet, columns) targets in one process - a JSON list, or a path to a JSON file
+SHEET_TARGETS = os.getenv('SHEET_TARGETS')
+SHEETS_API_URL = os.getenv('SHEETS_API_URL')  # Send Sheets API calls here instead of Google, e.g. a local fake_sheets.py server
 CHECK_INTERVAL = 180  # 3 minutes in seconds for testing
+STARTUP_DELAY = int(os.getenv('STARTUP_DELAY', 0))  # Seconds to wait before the first check
+
+# HTML analysis - the stdlib streaming parser; 'lxml' (or 'auto') opts in to lxml, which is not in requirements.txt
+# and counts text slightly differently, so the classifier's text-length thresholds are tuned for html.parser
+HTML_PARSER_BACKEND = resolve_backend(os.getenv('HTML_PARSER_BACKEND', 'html.parser'))
+# Worker processes for HTML analysis (0 = analyze in a thread instead of a process pool)
+HTML_ANALYSIS_WORKERS = int(os.getenv('HTML_ANALYSIS_WORKERS', 2))
+
+# Error, parked, expired and registrar signatures - optionally replaced from a JSON file
+SIGNATURES_FILE = os.getenv('SIGNATURES_FILE')
+SIGNATURE_MATCHER = None  # Compiled by init()
 
 # Constants for batch processing
 BATCH_SIZE = 300  # Process URLs in batches of 300 (reduced from 500)
 MAX_BROWSER_LIFETIME = 20  # Restart browser every 20 minutes (reduced from 30)
 
+# Engines shared by all targets
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))  # Pooled connections in the shared HTTP session
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 1))  # Idle Chrome instances kept for reuse
+VERDICT_CACHE_SECONDS = int(os.getenv('VERDICT_CACHE_SECONDS', 3600))  # Reuse a URL's verdict across cells (0 = off)
+
 # Add rate limiting constants
-SHEETS_API_WRITES_PER_MINUTE = 60  # Google's quota limit
+SHEETS_API_WRITES_PER_MINUTE = int(os.getenv('SHEETS_API_WRITES_PER_MINUTE', 60))  # Google's quota limit
 RATE_LIMIT_PAUSE_MIN = 180  # Minimum seconds to pause after hitting a rate limit
 RATE_LIMIT_PAUSE_MAX = 300  # Maximum seconds to pause after hitting a rate limit
 RATE_LIMIT_RETRIES = 5      # Maximum retries for rate-limited operations
 MAX_PENDING_RETRIES = 10    # Maximum retries for processing pending formats
+FORMAT_FLUSH_CHUNK = 500    # Cells per batch_update request when formats are written in bulk
 BATCH_WRITE_SIZE = 5        # Process 5 pending formats at a time
 BATCH_WRITE_PAUSE = 180     # Pause 180 seconds between pending format batches
 INTER_URL_PAUSE = 0.5       # Pause 0.5 seconds between individual URL checks
+PLFRAME_WAIT_SECONDS = 3    # Max wait for plFrame content, only on pages that have a plFrame
 BATCH_COMPLETION_PAUSE = 60 # Pause 60 seconds between URL checking batches
 
+# Why a cell is red, written back with the colors' bulk flushes - 'note' on the URL cell, 'column' or empty = off
+WRITE_REASONS = os.getenv('WRITE_REASONS', '').lower()
+# URL column -> status column for WRITE_REASONS=column, e.g. N:BM,O:BN - parsed and checked at startup
+REASON_COLUMNS_SPEC = os.getenv('REASON_COLUMNS', '')
+REASON_COLUMNS = {}
+
+# Per-host timeouts and circuit breakers - hosts get shorter timeouts once their latency is known
+STATIC_TIMEOUT_SECONDS = int(os.getenv('STATIC_TIMEOUT_SECONDS', 30))  # HTTP request timeout, and the cap for derived ones
+RENDER_TIMEOUT_SECONDS = int(os.getenv('RENDER_TIMEOUT_SECONDS', 45))  # Selenium page load timeout, and the cap for derived ones
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 3))  # Consecutive unreachable checks that open a host's breaker
+BREAKER_COOLDOWN_SECONDS = int(os.getenv('BREAKER_COOLDOWN_SECONDS', 300))  # Then one probe is let through
+
+# Production scheduling - 'continuous' checks cells as they come due, 'sweep' checks everything every 24 hours
+SCHEDULE_MODE = os.getenv('SCHEDULE_MODE', 'continuous').lower()
+SCHEDULER_CHECKS_PER_HOUR = float(os.getenv('SCHEDULER_CHECKS_PER_HOUR', 0))  # 0 = spread each day's checks over the day
+SCHEDULER_REFRESH_MINUTES = int(os.getenv('SCHEDULER_REFRESH_MINUTES', 15))  # Re-read the sheet to pick up edits
+SCHEDULER_STATE_FILE = os.getenv('SCHEDULER_STATE_FILE', 'scheduler_state.json')
+WORKING_RECHECK_HOURS = float(os.getenv('WORKING_RECHECK_HOURS', 24))
+BROKEN_RECHECK_HOURS = float(os.getenv('BROKEN_RECHECK_HOURS', 6))
+FLAPPING_RECHECK_HOURS = float(os.getenv('FLAPPING_RECHECK_HOURS', 2))
+
+# Sweep checkpoints - a sweep restarted within SWEEP_RESUME_HOURS of its start resumes where it stopped
+SWEEP_CHECKPOINT_FILE = os.getenv('SWEEP_CHECKPOINT_FILE', 'sweep_checkpoint.json')  # Empty = no checkpoints
+SWEEP_RESUME_HOURS = float(os.getenv('SWEEP_RESUME_HOURS', 20))  # Older checkpoints belong to a previous day's sweep
+CHECKPOINT_EVERY_URLS = 25  # Save progress after this many checks ...
+CHECKPOINT_EVERY_SECONDS = 60  # ... or this often, whichever comes first
+
+# Sweep deadline - e.g. RUN_DEADLINE=10:00 finishes before the business day, checking up to MAX_SWEEP_CONCURRENCY URLs at once
+RUN_DEADLINE = os.getenv('RUN_DEADLINE', '')  # HH:MM, empty = no deadline (one URL at a time)
+RUN_DEADLINE_TIMEZONE = os.getenv('RUN_DEADLINE_TIMEZONE', 'America/New_York')
+MAX_SWEEP_CONCURRENCY = int(os.getenv('MAX_SWEEP_CONCURRENCY', 3))  # Each concurrent check holds its own Chrome
+
+# Per-URL stage timing traces - summarize with: python url_traces.py TRACE_FILE
+TRACE_FILE = os.getenv('TRACE_FILE', '')  # Empty = no traces
+trace_sink = None  # Opened by init() when TRACE_FILE is set
+
+# Result history - every check's verdict, reason, tier, latency and final URL - query with: python result_history.py HISTORY_DB
+HISTORY_DB = os.getenv('HISTORY_DB', '')  # SQLite file, empty = no history
+HISTORY_RAW_DAYS = int(os.getenv('HISTORY_RAW_DAYS', 14))  # Older checks are compacted to one row per URL and day
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', 180))  # Compacted days are dropped after this
+FLAP_DAYS = 7  # The Slack digest lists URLs whose verdict changed at least FLAP_CHANGES times in this many days
+FLAP_CHANGES = 3
+result_history = None  # Opened by init() when HISTORY_DB is set
+# Finished checks go to the trace file and the result history
+check_sink = None
+
+# Profiling - output goes to PROFILE_DIR; /debug/* endpoints on the health server need DEBUG_ENDPOINTS=true
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_NEXT_RUN = os.getenv('PROFILE_NEXT_RUN', 'false').lower() == 'true'  # CPU-profile the first check_links run or scheduler window
+PROFILE_WINDOW_CHECKS = 100  # The continuous scheduler has no runs, so it profiles this many checks ...
+PROFILE_WINDOW_SECONDS = 600  # ... or this long, whichever ends first
+TRACEMALLOC_SNAPSHOTS = os.getenv('TRACEMALLOC_SNAPSHOTS', 'false').lower() == 'true'  # Snapshot memory at batch boundaries
+DEBUG_ENDPOINTS = os.getenv('DEBUG_ENDPOINTS', 'false').lower() == 'true'
+profiling = ProfilingHooks(PROFILE_DIR)
+
+# Run progress for /status; /ready fails once it stalls so the platform restarts a wedged worker
+STALL_MINUTES = int(os.getenv('STALL_MINUTES', 30))  # Minutes without progress before /ready fails (0 = never)
+PROGRESS_BEAT_SECONDS = 10  # How often the event loop reports that it is still turning
+run_progress = RunProgress()
+
+# Sharded multi-worker mode - set SHARD_LEASE_DB to a SQLite file shared by all workers to enable
+SHARD_LEASE_DB = os.getenv('SHARD_LEASE_DB')
+SHARD_ROWS = int(os.getenv('SHARD_ROWS', 500))  # Sheet rows per shard
+SHARD_LEASE_SECONDS = int(os.getenv('SHARD_LEASE_SECONDS', 300))  # A dead worker's shards are reassigned after this
+shard_leases = None  # Opened by init() when SHARD_LEASE_DB is set
+last_lease_sync = 0
+
 # Browser management
 browser_restart_count = 0  # Track browser restarts
 
@@ -83,115 +201,184 @@ SECONDS_PER_MINUTE = 60
 SECONDS_PER_HOUR = 3600
 SECONDS_PER_DAY = 86400
 
-# Global tracking sets for cell formatting
-successfully_formatted_cells = set()
-failed_formatted_cells = set()
+# Targets with their formatting state, host health and telemetry - built by init()
+run_context = None
+host_health = None
+metrics = None
+
+def init():
+    """
+    Build the engines the bot shares between checks: signature matcher, trace and history sinks,
+    shard leases, run context (HTTP session, browser pool, ...), host health, metrics and Slack.
+    Not done at import: spawned HTML analysis workers import this module as __mp_main__ and
+    must not open databases or sessions of their own. main() calls it first; safe to call again.
+    """
+    global slack, SIGNATURE_MATCHER, trace_sink, result_history, check_sink, shard_leases
+    global run_context, host_health, metrics
+    if run_context is not None:
+        return
+    slack = SlackNotifier(SLACK_WEBHOOK_URL, SLACK_BATCH_SECONDS)
+    SIGNATURE_MATCHER = SignatureMatcher(load_signatures(SIGNATURES_FILE))
+    trace_sink = TraceSink(TRACE_FILE) if TRACE_FILE else None
+    result_history = ResultHistoryStore(HISTORY_DB, HISTORY_RAW_DAYS, HISTORY_RETENTION_DAYS) if HISTORY_DB else None
+    check_sink = TeeSink(trace_sink, result_history) if trace_sink or result_history else None
+    shard_leases = (ShardLeaseStore(SHARD_LEASE_DB, os.getenv('WORKER_ID'), SHARD_LEASE_SECONDS, SHARD_ROWS)
+                    if SHARD_LEASE_DB else None)
+    
+    run_context = RunContext(
+        load_targets(SHEET_TARGETS, SHEET_URL, WORKSHEET_ID, URL_COLUMNS),
+        http_session=make_http_session(HTTP_POOL_SIZE),
+        browser_pool=BrowserPool(lambda: setup_selenium(), max(BROWSER_POOL_SIZE, MAX_SWEEP_CONCURRENCY if RUN_DEADLINE else 1),
+                                 MAX_BROWSER_LIFETIME * 60),
+        verdict_cache=VerdictCache(VERDICT_CACHE_SECONDS),
+        sheets_limiter=RateLimiter(SHEETS_API_WRITES_PER_MINUTE),
+    )
 
-# List to track pending cell formats - made properly global
-pending_formats = []
+    # Per-host latency history and circuit breakers
+    host_health = HostHealth({'static': STATIC_TIMEOUT_SECONDS, 'render': RENDER_TIMEOUT_SECONDS},
+                             failure_threshold=BREAKER_FAILURES, cooldown_seconds=BREAKER_COOLDOWN_SECONDS)
 
-# Print important configuration for debugging
-print("\n===== CONFIGURATION =====")
-print(f"SHEET_URL: {SHEET_URL}")
-print(f"WORKSHEET_ID: {WORKSHEET_ID}")
-print(f"URL_COLUMNS: {','.join(URL_COLUMNS)}")
-print(f"TESTING_MODE: {os.getenv('TESTING_MODE', 'false')}")
-print("========================\n")
+    # Telemetry for the /metrics endpoint
+    metrics = Metrics()
+    metrics.describe('url_checker_checks_total', 'counter', 'URL checks by the tier that decided the verdict')
+    metrics.describe('url_checker_verdicts_total', 'counter', 'URL verdicts')
+    metrics.describe('url_checker_http_request_seconds', 'histogram', 'Static tier HTTP request latency')
+    metrics.describe('url_checker_render_seconds', 'histogram', 'Render tier Selenium page load latency')
+    metrics.describe('url_checker_sheets_api_calls_total', 'counter', 'Google Sheets API calls')
+    metrics.describe('url_checker_sheets_rate_limited_total', 'counter', 'Google Sheets API calls rejected with 429 / quota errors')
+    metrics.gauge_callback('url_checker_verdict_cache_hits_total', 'Verdict cache hits',
+                           lambda: run_context.verdict_cache.hits, kind='counter')
+    metrics.gauge_callback('url_checker_verdict_cache_misses_total', 'Verdict cache misses',
+                           lambda: run_context.verdict_cache.misses, kind='counter')
+    metrics.gauge_callback('url_checker_pending_formats', 'Cell formats waiting to be written',
+                           lambda: len(run_context.pending_formats))
+    metrics.gauge_callback('url_checker_browser_restarts_total', 'Browser restarts after tab crashes',
+                           lambda: browser_restart_count, kind='counter')
+    metrics.gauge_callback('url_checker_chrome_rss_bytes', 'Resident memory of all Chrome processes', process_rss_bytes)
+    metrics.gauge_callback('url_checker_open_circuits', 'Hosts whose circuit breaker is open or half-open',
+                           lambda: len(host_health.open_hosts()))
+    metrics.gauge_callback('url_checker_uptime_seconds', 'Seconds since the process started',
+                           lambda: time.time() - PROCESS_START)
+    metrics.gauge_callback('url_checker_seconds_since_progress', 'Seconds since a URL, write or phase change completed',
+                           lambda: run_progress.status()['seconds_since_progress'])
 
-def send_slack_message(message):
-    """Send notification to Slack channel"""
-    if not SLACK_WEBHOOK_URL:
-        print("Slack webhook URL not configured, skipping notification")
-        return
-        
-    payload = {'text': message}
+# Static and render tier latency, for estimating how long the rest of a sweep takes
+check_latency = LatencyTracker()
+
+# Readiness for the health endpoint: set once the client is authorized and a worksheet has been read
+bot_ready = threading.Event()
+ready_at = None
+first_check_at = None
+
+def configure_reason_columns():
+    """Parse REASON_COLUMNS, exiting with a clear error when it is malformed"""
+    global REASON_COLUMNS
+    try:
+        REASON_COLUMNS = parse_reason_columns(REASON_COLUMNS_SPEC)
+    except ValueError as e:
+        log.error("❌ Invalid configuration: %s", e)
+        sys.exit(1)
+
+def print_configuration():
+    """Print important configuration for debugging"""
+    log.info("===== CONFIGURATION =====")
+    log.info("SHEET_URL: %s", SHEET_URL)
+    log.info("WORKSHEET_ID: %s", WORKSHEET_ID)
+    log.info("URL_COLUMNS: %s", ','.join(URL_COLUMNS))
+    if SHEET_TARGETS:
+        for state in run_context.states:
+            log.info("TARGET: %s columns %s", state.target.label, ','.join(state.target.columns))
+    log.info("TESTING_MODE: %s", os.getenv('TESTING_MODE', 'false'))
+    log.info("SCHEDULE_MODE: %s", SCHEDULE_MODE)
+    if shard_leases:
+        log.info("SHARDING: worker %s, %s rows per shard, leases in %s",
+                 shard_leases.worker_id, SHARD_ROWS, SHARD_LEASE_DB)
+    if WRITE_REASONS == 'note':
+        log.info("WRITE_REASONS: notes on red cells")
+    elif WRITE_REASONS == 'column':
+        log.info("WRITE_REASONS: status columns %s", ','.join(f"{col}:{status}" for col, status in REASON_COLUMNS.items()))
+        if not REASON_COLUMNS:
+            log.warning("⚠️ WRITE_REASONS=column needs REASON_COLUMNS (e.g. N:BM) - no reasons will be written")
+    elif WRITE_REASONS:
+        log.warning("⚠️ Unknown WRITE_REASONS=%s (use note or column) - no reasons will be written", WRITE_REASONS)
+    log.info("========================")
+
+def mark_ready():
+    """Signal readiness to the health endpoint the first time a worksheet is read"""
+    global ready_at
+    if not bot_ready.is_set():
+        ready_at = time.time()
+        bot_ready.set()
+        log.info("✅ Ready %.1fs after process start", ready_at - PROCESS_START)
+
+def record_first_check():
+    """Log time-to-first-check once per process"""
+    global first_check_at
+    if first_check_at is None:
+        first_check_at = time.time()
+        log.info("⏱️ Time to first check: %.1fs after process start", first_check_at - PROCESS_START)
+
+def is_rate_limit_error(error):
+    error_str = str(error)
+    return "RESOURCE_EXHAUSTED" in error_str or "429" in error_str or "quota" in error_str.lower()
+
+def sheets_read(read, *args):
+    """Make one Sheets read, counted for /metrics"""
+    metrics.inc('url_checker_sheets_api_calls_total', kind='read')
     try:
-        response = requests.post(SLACK_WEBHOOK_URL, json=payload)
-        response.raise_for_status()
-        print("Slack notification sent successfully")
-    except requests.exceptions.RequestException as e:
-        print(f"Error sending Slack message: {e}")
-
-def is_valid_url(url):
-    """Check if a string is a valid URL format"""
+        return read(*args)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            metrics.inc('url_checker_sheets_rate_limited_total')
+        raise
+
+def sheets_write(write, *args):
+    """Make one Sheets write through the shared rate limiter, counted for /metrics"""
+    with trace_stage('sheets_wait'):
+        run_context.sheets_limiter.acquire()
+    metrics.inc('url_checker_sheets_api_calls_total', kind='write')
     try:
-        # Extract domain from URL
-        parsed = urlparse(url)
-        domain = parsed.netloc
-        
-        # URL must have a domain and scheme
-        if not domain:
-            # Some URLs might be domain-only
-            if '.' in url and not url.startswith(('http://', 'https://')):
-                # Try adding a protocol and checking again
-                return is_valid_url('http://' + url)
-            return False
-            
-        # Basic domain validation
-        if '.' not in domain:  # Must have at least one dot in domain
-            return False
-            
-        # URL seems valid
-        return True
-    except:
-        return False
+        with trace_stage('sheets_write'):
+            return write(*args)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            metrics.inc('url_checker_sheets_rate_limited_total')
+        raise
+
+def send_slack_message(message):
+    """Queue a notification for the Slack channel; it is posted in the background, batched and retried"""
+    slack.notify(message)
+
+# URLs with query parameters and fragments, compiled once for every cell of every sweep
+URL_PATTERN = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^/\s]*)*(?:\?[^\s]*)?(?:#[^\s]*)?')
+URL_HOST = re.compile(r'https?://([^/?#]*)')
+URL_TRAILING_PUNCTUATION = ('.', ',', ')', ']', '}', ':', ';')
+
+def valid_urls(urls):
+    """Keep the URLs whose host has a dot. Pattern matches start with a scheme, so no urlparse is needed"""
+    return [url for url in urls if '.' in URL_HOST.match(url).group(1)]
 
 def extract_urls_from_text(text):
     """Extract URLs from text (preserving full URL structure including query parameters)"""
-    if not text:
+    # Quick reject: every URL the pattern matches has a scheme separator
+    if not text or '://' not in text:
         return []
     
-    # Use a URL pattern that includes query parameters and fragments
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^/\s]*)*(?:\?[^\s]*)?(?:#[^\s]*)?'
-    matches = re.findall(url_pattern, text)
-    
-    # Filter out invalid URLs but preserve full structure
-    valid_urls = []
-    for url in matches:
-        # Clean the URL (remove trailing punctuation but keep query parameters)
-        url = url.strip()
-        # Remove trailing punctuation but preserve query parameters
-        if url.endswith(('.', ',', ')', ']', '}', ':', ';')):
-            url = url[:-1]
-        
-        if is_valid_url(url):
-            valid_urls.append(url)
+    # Remove trailing punctuation but preserve query parameters
+    matches = [url[:-1] if url.endswith(URL_TRAILING_PUNCTUATION) else url for url in URL_PATTERN.findall(text)]
+    urls = valid_urls(matches)
     
     # Log extracted URLs
-    if valid_urls:
-        print(f"Extracted {len(valid_urls)} valid URLs: {valid_urls}")
+    if urls:
+        log.debug("Extracted %s valid URLs: %s", len(urls), urls)
     
-    return valid_urls
-
-def get_domain_expiration_indicators():
-    """Get common patterns that indicate an expired domain"""
-    return {
-        # Exact patterns from common expired domain pages
-        'exact_patterns': [
-            'the domain has expired. is this your domain?',
-            'the domain has expired. is this your domain? renew now',
-            'domain has expired. renew now',
-            'the domain has expired.',
-        ],
-        # Common registrar expiration pages
-        'registrar_patterns': [
-            'godaddy.com/expired',
-            'expired.namecheap.com',
-            'expired.domain',
-            'domainexpired',
-            'domain-expired',
-        ],
-        # Link text patterns that often appear with expired domains
-        'link_patterns': [
-            'renew now',
-            'renew domain',
-            'restore domain',
-            'reactivate domain'
-        ]
-    }
+    return urls
 
 def setup_selenium():
     """Configure and start a headless Chrome browser"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
     chrome_options = Options()
     chrome_options.add_argument('--headless=new')  # New headless mode
     chrome_options.add_argument('--no-sandbox')
@@ -211,146 +398,242 @@ def setup_selenium():
     
     return webdriver.Chrome(options=chrome_options)
 
-def analyze_domain_status(content, domain, response_url, title, driver=None):
+def find_registrar_expiration_redirect(redirect_chain):
+    """Return the registrar pattern matched by any URL in a redirect chain, or None"""
+    for hop_url in redirect_chain:
+        if not hop_url:
+            continue
+        pattern = SIGNATURE_MATCHER.scan(hop_url.lower()).get('registrar')
+        if pattern:
+            return pattern
+    return None
+
+def analyze_domain_status(redirect_chain, rendered_text="", driver=None, rendered_matches=None):
     """
-    Analyze domain content to determine if it's truly expired.
-    Checks for various common expiration message patterns.
+    Analyze an already-loaded page to determine if its domain is truly expired.
+    Checks the redirect chain for registrar expiration pages first, then looks for
+    expiration notices in the visible body text and in the plFrame parking iframe.
+    Scripts and attributes are never matched, so a page that merely mentions
+    expired domains (a registrar's own site, an SEO blog) is not flagged.
+    Never re-navigates, so it only costs a few WebDriver round trips.
+    Pass rendered_matches when the rendered text has already been scanned.
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    
     try:
-        # If we have a Selenium driver, get the JavaScript-rendered content
+        # Registrar redirects (godaddy.com/expired, expired.namecheap.com, ...) are the cheapest signal
+        chain = list(redirect_chain or [])
         if driver:
             try:
-                print("\n=== Checking for domain expiration ===")
-                driver.get(domain)
-                
-                # Wait for body to load
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                
-                # Wait a moment for dynamic content
-                time.sleep(5)  # Increased wait time for iframe load
-                
-                try:
-                    # First make the target div visible
-                    driver.execute_script("""
-                        var target = document.getElementById('target');
-                        if (target) {
-                            target.style.opacity = '1';
-                            target.style.visibility = 'visible';
-                            target.style.display = 'block';
-                        }
-                    """)
-                    
-                    # Look specifically for plFrame
+                chain.append(driver.current_url)
+            except Exception as e:
+                log.debug("Error reading current URL: %s", e)
+        
+        registrar_pattern = find_registrar_expiration_redirect(chain)
+        if registrar_pattern:
+            log.debug("Found registrar expiration redirect: %s", registrar_pattern)
+            return True, f"Redirected to registrar expiration page: {registrar_pattern}"
+        
+        # Check for expiration notices in the visible text
+        if rendered_matches is None:
+            rendered_matches = SIGNATURE_MATCHER.scan((rendered_text or "").lower())
+        pattern = rendered_matches.get('expired')
+        if pattern:
+            log.debug("Found expiration message: %s", pattern)
+            return True, f"Found domain expiration message: {pattern}"
+        
+        # Parking pages render the expiration notice inside the plFrame iframe,
+        # which is not part of the parent page source
+        if driver:
+            try:
+                frames = driver.find_elements(By.ID, "plFrame")
+                if frames:
+                    log.debug("Found plFrame iframe")
+                    driver.switch_to.frame(frames[0])
                     try:
-                        iframe = WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.ID, "plFrame"))
-                        )
-                        print("Found plFrame iframe")
-                        
-                        # Switch to the iframe
-                        driver.switch_to.frame(iframe)
-                        
-                        # Wait for and get the content
-                        WebDriverWait(driver, 10).until(
+                        # Only pages that actually have plFrame pay for this short wait
+                        WebDriverWait(driver, PLFRAME_WAIT_SECONDS).until(
                             EC.presence_of_element_located((By.TAG_NAME, "span"))
                         )
-                        
-                        # Get all spans and their text
-                        spans = driver.find_elements(By.TAG_NAME, "span")
-                        for span in spans:
-                            try:
-                                text = span.text.strip().lower()
-                                print(f"Found text in plFrame: {text}")
-                                if "domain has expired" in text:
-                                    driver.switch_to.default_content()
-                                    return True, f"Found expired domain message: {text}"
-                            except Exception as e:
-                                print(f"Error reading span text: {e}")
-                                continue
-                        
-                        driver.switch_to.default_content()
+                        frame_text = driver.find_element(By.TAG_NAME, "body").text.strip().lower()
+                        if "domain has expired" in frame_text:
+                            return True, f"Found expired domain message: {frame_text[:200]}"
                     except Exception as e:
-                        print(f"Error with plFrame: {e}")
+                        log.debug("Error reading plFrame content: %s", e)
+                    finally:
                         driver.switch_to.default_content()
-                
-                except Exception as e:
-                    print(f"Error making target visible: {e}")
-                
-                # Keep all existing checks (they're working for other cases)
-                page_text = driver.page_source.lower()
-                
-                # Common expiration message patterns (keeping existing ones that work)
-                expiration_patterns = [
-                    # Exact matches from screenshot
-                    "the domain has expired. is this your domain?",
-                    "the domain has expired. is this your domain? renew now",
-                    "domain has expired. renew now",
-                    
-                    # Common variations that were working
-                    "this domain has expired",
-                    "domain name has expired",
-                    "domain registration has expired",
-                    "domain expired",
-                    "expired domain",
-                    "domain is expired",
-                    "domain has lapsed",
-                    "domain registration expired",
-                    "this domain is expired",
-                    "this domain name has expired",
-                    "domain has been expired",
-                    "domain registration has lapsed",
-                    "domain has expired and is pending renewal",
-                    "expired domain name",
-                    "domain expiration notice"
-                ]
-                
-                # Check for patterns in the page source
-                for pattern in expiration_patterns:
-                    if pattern in page_text:
-                        print(f"Found expiration message: {pattern}")
-                        return True, f"Found domain expiration message: {pattern}"
-                
-                # Keep existing span checks that were working
-                span_selectors = [
-                    "span[style*='font-family:Arial']",
-                    "span[style*='font-size']",
-                    "span.expired-domain",
-                    "span.domain-expired",
-                    "div.expired-notice"
-                ]
-                
-                for selector in span_selectors:
-                    spans = driver.find_elements(By.CSS_SELECTOR, selector)
-                    for span in spans:
-                        text = span.text.strip().lower()
-                        for pattern in expiration_patterns:
-                            if pattern in text:
-                                print(f"Found expiration message in styled element: {text}")
-                                return True, f"Found domain expiration message: {text}"
-                
             except Exception as e:
-                print(f"Error checking JavaScript content: {e}")
+                log.debug("Error with plFrame: %s", e)
         
         return False, None
         
     except Exception as e:
-        print(f"Error in analyze_domain_status: {str(e)}")
+        log.debug("Error in analyze_domain_status: %s", e)
         return False, None
 
+def target_label(sheet):
+    """Label of the target a worksheet belongs to, 'unknown' for a worksheet no target covers"""
+    state = run_context.state_for(sheet)
+    return state.target.label if state is not None else 'unknown'
+
+def owns_row(sheet, row):
+    """True unless sharding is enabled and this worker does not hold the row's shard lease"""
+    if shard_leases is None:
+        return True
+    state = run_context.state_for(sheet)
+    return state is not None and shard_leases.holds_row(row, state.target.label)
+
+def take_over_shard_tasks(tasks, scheduled_keys):
+    """
+    Tasks of rows this worker holds now but the sweep has not scheduled, e.g. shards taken over
+    from a dead worker mid-sweep. Their keys are added to scheduled_keys.
+    """
+    taken = [url_data for url_data in tasks
+             if url_task_key(url_data) not in scheduled_keys and owns_row(url_data.sheet, url_data.row)]
+    scheduled_keys.update(url_task_key(url_data) for url_data in taken)
+    return taken
+
+def sync_shard_leases(rows_by_target, force=False):
+    """
+    Heartbeat and renew/claim shard leases, rows_by_target maps target labels to row counts.
+    Returns True when the owned shards changed.
+    """
+    global last_lease_sync
+    if shard_leases is None:
+        return False
+    if not force and time.time() - last_lease_sync < SHARD_LEASE_SECONDS / 3:
+        return False
+    try:
+        gained, lost = shard_leases.sync(rows_by_target)
+    except Exception as e:
+        # Held leases stay valid until they expire, owns_row() stops writes after that
+        log.warning("❌ Error syncing shard leases: %s", e)
+        return False
+    last_lease_sync = time.time()
+    if gained or lost:
+        log.info("🔀 Worker %s now holds shards %s (gained %s, lost %s)",
+                 shard_leases.worker_id, sorted(shard_leases.owned), sorted(gained), sorted(lost))
+    return bool(gained or lost)
+
+# Text colors the bot writes, as Sheets API colors
+TEXT_COLORS = {
+    'red': {'red': 0.95, 'green': 0.2, 'blue': 0.1},
+    'blue': {'red': 0, 'green': 0, 'blue': 238/255},  # #0000EE
+}
+
+def text_color_request(sheet, row, col, color):
+    """batch_update request that sets one cell's text color"""
+    return {
+        "repeatCell": {
+            "range": {
+                "sheetId": sheet.id,
+                "startRowIndex": row - 1,  # 0-indexed
+                "endRowIndex": row,
+                "startColumnIndex": column_to_index(col),
+                "endColumnIndex": column_to_index(col) + 1
+            },
+            "cell": {"userEnteredFormat": {"textFormat": {"foregroundColor": TEXT_COLORS[color]}}},
+            "fields": "userEnteredFormat.textFormat.foregroundColor"
+        }
+    }
+
+def reason_cell(col, sheet=None):
+    """Column a URL column's failure reasons go to, or None when they are not written"""
+    if WRITE_REASONS == 'note':
+        return col
+    if WRITE_REASONS == 'column':
+        status_col = REASON_COLUMNS.get(col)
+        # Never overwrite a column of URLs with status text, nor write past the worksheet's last column
+        if status_col and all(status_col not in state.target.columns for state in run_context.states) \
+                and fits_grid(sheet, status_col):
+            return status_col
+    return None
+
+def fits_grid(sheet, col):
+    """False when col is beyond the worksheet's columns - the API rejects those writes"""
+    col_count = getattr(sheet, 'col_count', None)
+    return not isinstance(col_count, int) or column_to_index(col) < col_count
+
+def check_reason_columns(sheet, target):
+    """Log the status columns of a target that its worksheet is too narrow for; their reasons are not written"""
+    if WRITE_REASONS != 'column':
+        return
+    outside = sorted({status_col for url_col, status_col in REASON_COLUMNS.items()
+                      if url_col in target.columns and not fits_grid(sheet, status_col)})
+    if outside:
+        log.error("❌ REASON_COLUMNS status columns %s are beyond the last column of %s (%s columns) - "
+                  "their reasons are not written. Add columns to the sheet or pick other ones.",
+                  ','.join(outside), target.label, sheet.col_count)
+
+def cell_reason_request(sheet, row, col, text):
+    """batch_update request that writes a failure reason (empty text clears it) as a note or status cell"""
+    value = {"note": text} if WRITE_REASONS == 'note' else {"userEnteredValue": {"stringValue": text}}
+    return {
+        "updateCells": {
+            "range": {
+                "sheetId": sheet.id,
+                "startRowIndex": row - 1,  # 0-indexed
+                "endRowIndex": row,
+                "startColumnIndex": column_to_index(col),
+                "endColumnIndex": column_to_index(col) + 1
+            },
+            "rows": [{"values": [value]}],
+            "fields": "note" if WRITE_REASONS == 'note' else "userEnteredValue"
+        }
+    }
+
+def queue_cell_reason(sheet, row, col, is_working, reason, previous=None):
+    """
+    Queue a red cell's failure reason for the next bulk flush. A working cell's status column is
+    always cleared; its note only when the previous verdict was broken, so notes people wrote stay.
+    """
+    target_col = reason_cell(col, sheet)
+    if target_col is None or (is_working and WRITE_REASONS == 'note' and previous is not False):
+        return
+    text = '' if is_working else f"{reason or 'Not working'} (checked {datetime.now().strftime('%Y-%m-%d %H:%M')})"
+    run_context.pending_reasons[(id(sheet), row, target_col)] = (sheet, row, target_col, text)
+
+def take_pending_reasons():
+    reasons = list(run_context.pending_reasons.values())
+    run_context.pending_reasons = {}
+    return reasons
+
+def note_cell_color(sheet, cell_id, color):
+    """Track a color that was written, in the worksheet's formatting state"""
+    state = run_context.state_for(sheet)
+    if state is None:
+        return
+    if color == 'red':
+        state.failed_formatted_cells.add(cell_id)
+        state.successfully_formatted_cells.discard(cell_id)
+    else:
+        state.successfully_formatted_cells.add(cell_id)
+        state.failed_formatted_cells.discard(cell_id)
+
 def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
     """Mark cell text as red for failed URLs"""
-    global pending_formats, successfully_formatted_cells, failed_formatted_cells
+    from gspread_formatting import CellFormat, Color, TextFormat, format_cell_range
+    
+    # Formatting state is tracked per worksheet
+    state = run_context.state_for(sheet)
+    if state is None:
+        return True  # Not a checked worksheet - nothing to write, state_for logged it
     
     # Get the unique cell identifier
     cell_id = f"{col}{row}"
     
+    # In sharded mode only the worker holding the row's lease may write its formatting
+    if not owns_row(sheet, row):
+        log.debug("Skipping formatting of cell %s - its shard is leased to another worker", cell_id)
+        return True
+    
     # For marking RED, we'll still skip if already marked red to avoid unnecessary API calls.
     # But if a cell is currently blue (in successfully_formatted_cells), we SHOULD mark it red
     # if a bad URL is found after a good one.
-    if cell_id in failed_formatted_cells and cell_id not in successfully_formatted_cells:
-        print(f"Cell {cell_id} was already marked red - skipping")
+    if cell_id in state.failed_formatted_cells and cell_id not in state.successfully_formatted_cells:
+        log.debug("Cell %s was already marked red - skipping", cell_id)
         return True
     
     try:
@@ -365,27 +648,27 @@ def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
             )
             
             # Debug output
-            print(f"Applying red format to cell {cell_range}, format type: {type(fmt)}")
+            log.debug("Applying red format to cell %s, format type: %s", cell_range, type(fmt))
             
             # Apply the formatting
-            format_cell_range(sheet, cell_range, fmt)
+            sheets_write(format_cell_range, sheet, cell_range, fmt)
             
             # ADDED: Explicit sleep after formatting to let it take effect
             time.sleep(0.5)
             
-            print(f"Marked cell {cell_range} as red (failed URL)")
+            log.debug("Marked cell %s as red (failed URL)", cell_range)
             
             # Track this successful formatting
-            failed_formatted_cells.add(cell_id)
+            state.failed_formatted_cells.add(cell_id)
             
             # If this was in the successfully formatted set, remove it as it's now failed
-            if cell_id in successfully_formatted_cells:
-                successfully_formatted_cells.remove(cell_id)
+            if cell_id in state.successfully_formatted_cells:
+                state.successfully_formatted_cells.remove(cell_id)
                 
             return True
             
         except Exception as format_err:
-            print(f"First formatting method failed: {str(format_err)}")
+            log.debug("First formatting method failed: %s", format_err)
             
             # Try an even more direct approach - batch update API
             try:
@@ -426,26 +709,26 @@ def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
                 }
                 
                 # Execute the batch update
-                sheet.spreadsheet.batch_update(batch_request)
+                sheets_write(sheet.spreadsheet.batch_update, batch_request)
                 time.sleep(0.5)  # Sleep to let it take effect
                 
-                print(f"Marked cell {cell_range} as red using batch update API")
+                log.debug("Marked cell %s as red using batch update API", cell_range)
                 
                 # Track this successful formatting
-                failed_formatted_cells.add(cell_id)
-                if cell_id in successfully_formatted_cells:
-                    successfully_formatted_cells.remove(cell_id)
+                state.failed_formatted_cells.add(cell_id)
+                if cell_id in state.successfully_formatted_cells:
+                    state.successfully_formatted_cells.remove(cell_id)
                     
                 return True
                 
             except Exception as batch_err:
-                print(f"Batch update also failed: {str(batch_err)}")
+                log.debug("Batch update also failed: %s", batch_err)
                 
                 # Try the 'to_props' workaround as a last resort
                 if "'dict' object has no attribute 'to_props'" in str(format_err):
                     try:
                         worksheet = sheet
-                        worksheet.format(cell_range, {
+                        sheets_write(worksheet.format, cell_range, {
                             "textFormat": {
                                 "foregroundColor": {
                                     "red": 0.95,
@@ -455,31 +738,33 @@ def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
                             }
                         })
                         time.sleep(0.5)  # Sleep to let it take effect
-                        print(f"Marked cell {cell_range} as red using alternative method")
+                        log.debug("Marked cell %s as red using alternative method", cell_range)
                         
                         # Track successful formatting
-                        failed_formatted_cells.add(cell_id)
-                        if cell_id in successfully_formatted_cells:
-                            successfully_formatted_cells.remove(cell_id)
+                        state.failed_formatted_cells.add(cell_id)
+                        if cell_id in state.successfully_formatted_cells:
+                            state.successfully_formatted_cells.remove(cell_id)
                             
                         return True
                     except Exception as inner_e:
-                        print(f"❌ Alternative formatting method also failed: {str(inner_e)}")
+                        log.warning("❌ Alternative formatting method also failed: %s", inner_e)
                 
                 # At this point, all methods have failed
-                print(f"❌ All formatting methods failed for cell {cell_range}")
+                log.warning("❌ All formatting methods failed for cell %s", cell_range)
                 
                 # Check for rate limit and retry
                 if retry_count < RATE_LIMIT_RETRIES:
                     jitter = random.uniform(0.5, 1.5)
                     retry_seconds = min(backoff_seconds * (2 ** retry_count) * jitter, RATE_LIMIT_PAUSE_MAX)
-                    print(f"Retrying cell {cell_id} in {retry_seconds:.1f} seconds (retry {retry_count+1}/{RATE_LIMIT_RETRIES})")
+                    log.warning("Retrying cell %s in %.1f seconds (retry %s/%s)",
+                                cell_id, retry_seconds, retry_count + 1, RATE_LIMIT_RETRIES)
                     time.sleep(retry_seconds)
                     return mark_cell_text_red(sheet, row, col, retry_count + 1, backoff_seconds)
                 
                 # Add to pending formats with high priority
-                print(f"Maximum retries reached for cell {cell_range}. Adding to high-priority pending formats queue.")
-                pending_formats.append({
+                log.warning("Maximum retries reached for cell %s. Adding to high-priority pending formats queue.",
+                            cell_range)
+                run_context.pending_formats.append({
                     'sheet': sheet,
                     'row': row,
                     'col': col,
@@ -487,25 +772,26 @@ def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
                     'format_key': f"{col}{row}:red",
                     'retry_count': MAX_PENDING_RETRIES - 5  # High priority
                 })
-                failed_formatted_cells.add(cell_id)
+                state.failed_formatted_cells.add(cell_id)
                 return False
     
     except Exception as e:
         error_str = str(e)
-        print(f"❌ Error marking cell {cell_range} as red: {error_str}")
+        log.warning("❌ Error marking cell %s as red: %s", cell_range, error_str)
         
         # Check for rate limits one more time
-        if "RESOURCE_EXHAUSTED" in error_str or "429" in error_str or "quota" in error_str.lower():
+        if is_rate_limit_error(e):
             if retry_count < RATE_LIMIT_RETRIES:
                 # Calculate exponential backoff with jitter
                 jitter = random.uniform(0.5, 1.5)
                 retry_seconds = min(backoff_seconds * (2 ** retry_count) * jitter, RATE_LIMIT_PAUSE_MAX)
-                print(f"Retrying in {retry_seconds:.1f} seconds (retry {retry_count+1}/{RATE_LIMIT_RETRIES})")
+                log.warning("Retrying in %.1f seconds (retry %s/%s)",
+                            retry_seconds, retry_count + 1, RATE_LIMIT_RETRIES)
                 time.sleep(retry_seconds)
                 return mark_cell_text_red(sheet, row, col, retry_count + 1, backoff_seconds)
         
         # Add to pending formats with high priority
-        pending_formats.append({
+        run_context.pending_formats.append({
             'sheet': sheet,
             'row': row,
             'col': col,
@@ -515,16 +801,26 @@ def mark_cell_text_red(sheet, row, col, retry_count=0, backoff_seconds=1):
         })
         
         # Track this failed formatting
-        failed_formatted_cells.add(cell_id)
+        state.failed_formatted_cells.add(cell_id)
         return False
 
 def reset_cell_formatting(sheet, row, col, retry_count=0, backoff_seconds=1):
     """Reset cell formatting to bright blue (#0000EE) for working URLs"""
-    global pending_formats, successfully_formatted_cells, failed_formatted_cells
+    from gspread_formatting import CellFormat, Color, TextFormat, format_cell_range
+    
+    # Formatting state is tracked per worksheet
+    state = run_context.state_for(sheet)
+    if state is None:
+        return True  # Not a checked worksheet - nothing to write, state_for logged it
     
     # Get the unique cell identifier
     cell_id = f"{col}{row}"
     
+    # In sharded mode only the worker holding the row's lease may write its formatting
+    if not owns_row(sheet, row):
+        log.debug("Skipping formatting of cell %s - its shard is leased to another worker", cell_id)
+        return True
+    
     # COMMENTED OUT: We'll always reformat, ignoring previous blue
     # if cell_id in successfully_formatted_cells and cell_id not in failed_formatted_cells:
     #     print(f"Cell {cell_id} was already marked blue - skipping")
@@ -572,20 +868,20 @@ def reset_cell_formatting(sheet, row, col, retry_count=0, backoff_seconds=1):
             }
             
             # Execute the batch update
-            sheet.spreadsheet.batch_update(batch_request)
+            sheets_write(sheet.spreadsheet.batch_update, batch_request)
             time.sleep(0.5)  # Sleep to let it take effect
             
-            print(f"Marked cell {cell_range} as blue #0000EE using batch update API")
+            log.debug("Marked cell %s as blue #0000EE using batch update API", cell_range)
             
             # Track this successful formatting
-            successfully_formatted_cells.add(cell_id)
-            if cell_id in failed_formatted_cells:
-                failed_formatted_cells.remove(cell_id)
+            state.successfully_formatted_cells.add(cell_id)
+            if cell_id in state.failed_formatted_cells:
+                state.failed_formatted_cells.remove(cell_id)
                 
             return True
             
         except Exception as batch_err:
-            print(f"Batch update failed: {str(batch_err)}")
+            log.debug("Batch update failed: %s", batch_err)
             
             # Fall back to original method
             fmt = CellFormat(
@@ -593,33 +889,33 @@ def reset_cell_formatting(sheet, row, col, retry_count=0, backoff_seconds=1):
             )
             
             # Debug output
-            print(f"Applying blue #0000EE format to cell {cell_range}, format type: {type(fmt)}")
+            log.debug("Applying blue #0000EE format to cell %s, format type: %s", cell_range, type(fmt))
             
             # Apply the formatting
-            format_cell_range(sheet, cell_range, fmt)
+            sheets_write(format_cell_range, sheet, cell_range, fmt)
             
             # ADDED: Explicit sleep after formatting to let it take effect
             time.sleep(0.5)
             
             # REMOVED: verification code that might use undefined functions
             
-            print(f"Marked cell {cell_range} as blue #0000EE")
+            log.debug("Marked cell %s as blue #0000EE", cell_range)
             
             # Track this successful formatting
-            successfully_formatted_cells.add(cell_id)
-            if cell_id in failed_formatted_cells:
-                failed_formatted_cells.remove(cell_id)
+            state.successfully_formatted_cells.add(cell_id)
+            if cell_id in state.failed_formatted_cells:
+                state.failed_formatted_cells.remove(cell_id)
                 
             return True
             
     except Exception as e:
         error_str = str(e)
-        print(f"❌ Error marking cell {cell_range} as blue #0000EE: {error_str}")
+        log.warning("❌ Error marking cell %s as blue #0000EE: %s", cell_range, error_str)
         
         # Try one more alternative method if possible
         try:
             worksheet = sheet
-            worksheet.format(cell_range, {
+            sheets_write(worksheet.format, cell_range, {
                 "textFormat": {
                     "foregroundColor": {
                         "red": 0,
@@ -629,29 +925,30 @@ def reset_cell_formatting(sheet, row, col, retry_count=0, backoff_seconds=1):
                 }
             })
             time.sleep(0.5)  # Sleep to let it take effect
-            print(f"Marked cell {cell_range} as blue using alternative method")
+            log.debug("Marked cell %s as blue using alternative method", cell_range)
             
             # Track successful formatting
-            successfully_formatted_cells.add(cell_id)
-            if cell_id in failed_formatted_cells:
-                failed_formatted_cells.remove(cell_id)
+            state.successfully_formatted_cells.add(cell_id)
+            if cell_id in state.failed_formatted_cells:
+                state.failed_formatted_cells.remove(cell_id)
                 
             return True
         except Exception as alt_err:
-            print(f"Alternative method also failed: {str(alt_err)}")
+            log.debug("Alternative method also failed: %s", alt_err)
         
         # Check for rate limits
-        if "RESOURCE_EXHAUSTED" in error_str or "429" in error_str or "quota" in error_str.lower():
+        if is_rate_limit_error(e):
             if retry_count < RATE_LIMIT_RETRIES:
                 # Calculate exponential backoff with jitter
                 jitter = random.uniform(0.5, 1.5)
                 retry_seconds = min(backoff_seconds * (2 ** retry_count) * jitter, RATE_LIMIT_PAUSE_MAX)
-                print(f"Retrying in {retry_seconds:.1f} seconds (retry {retry_count+1}/{RATE_LIMIT_RETRIES})")
+                log.warning("Retrying in %.1f seconds (retry %s/%s)",
+                            retry_seconds, retry_count + 1, RATE_LIMIT_RETRIES)
                 time.sleep(retry_seconds)
                 return reset_cell_formatting(sheet, row, col, retry_count + 1, backoff_seconds)
         
         # Add to pending formats
-        pending_formats.append({
+        run_context.pending_formats.append({
             'sheet': sheet,
             'row': row,
             'col': col,
@@ -688,417 +985,418 @@ def get_text_color_from_format(cell_format):
     except:
         return None
 
-async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=False):
-    """Check if a URL is working and mark it in the spreadsheet"""
-    global browser_restart_count, pending_formats
+async def fetch_static_features(url):
+    """Static tier: HTTP request, signature scan and HTML analysis (no rendering)"""
+    features = PageFeatures(url=url)
+    timeout = host_health.timeout(url, 'static')  # STATIC_TIMEOUT_SECONDS until the host's latency is known
     
-    print(f"=== Checking URL: {url} at cell {col}{row} {'(FINAL URL in cell)' if is_last_url else ''} ===")
+    # Use proper headers to simulate a real browser
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
     
-    # Track whether the URL is working
-    is_working = False
-    error_message = ""
-    cell_marked = False  # Flag to track if we've marked the cell
-    original_url = url  # Store the original URL for reference
+    # Print the full URL we're checking (including query parameters)
+    log.debug("Checking full URL: %s", url)
+    
+    try:
+        if tracing():
+            # Resolve separately so the trace can tell DNS from the rest of the request
+            parsed = urlparse(url)
+            with trace_stage('dns'):
+                await asyncio.to_thread(socket.getaddrinfo, parsed.hostname,
+                                        parsed.port or (443 if parsed.scheme == 'https' else 80))
+        
+        # In a worker thread, so concurrent sweep checks do not wait on each other's requests
+        started = time.monotonic()
+        response = await asyncio.to_thread(run_context.http_session.get, url, timeout=timeout,
+                                           allow_redirects=True, headers=headers)
+        request_seconds = time.monotonic() - started
+        host_health.observe(url, 'static', request_seconds)
+        metrics.observe('url_checker_http_request_seconds', request_seconds)
+        # elapsed runs from sending the request to parsing the headers, per hop
+        ttfb_seconds = sum(hop.elapsed.total_seconds() for hop in response.history + [response])
+        add_stage_time('ttfb', ttfb_seconds)
+        add_stage_time('download', max(0.0, request_seconds - ttfb_seconds))
+        annotate_trace(status=response.status_code, redirects=len(response.history), final_url=response.url)
+    except requests.exceptions.RequestException as req_error:
+        # Connection errors are handled via Selenium fallback
+        features.request_error = str(req_error)
+        log.debug("❌ Connection Error with requests: %s - %s", url, features.request_error)
+        return features
+    except socket.gaierror as dns_error:
+        # Only the traced DNS lookup raises this, requests wraps its own
+        features.request_error = f"DNS lookup failed: {dns_error}"
+        log.debug("❌ Connection Error with requests: %s - %s", url, features.request_error)
+        return features
+    
+    features.status_code = response.status_code
+    features.redirect_chain = [hop.url for hop in response.history] + [response.url]
+    log.debug("Response status code: %s", response.status_code)
+    log.debug("Final URL after redirects: %s", response.url)
     
-    # Initialize has_error_indicators at the beginning to prevent UnboundLocalError
-    has_error_indicators = False
+    # Check HTTP status code first - quickest determination
+    if response.status_code >= 400:
+        log.debug("❌ HTTP Error: %s - HTTP Status %s", url, response.status_code)
+        return features
     
+    # A redirect to a registrar expiration page settles it without rendering
+    features.registrar_redirect = find_registrar_expiration_redirect(features.redirect_chain)
+    if features.registrar_redirect:
+        log.debug("❌ Expired domain: %s - redirected to %s", url, features.registrar_redirect)
+        return features
+    
+    # One pass over the body finds error, parked and template signatures
+    with trace_stage('parse'):
+        static_matches = SIGNATURE_MATCHER.scan(response.text.lower())
+    
+    # Check for template variables
+    template_match = static_matches.get('template')
+    if template_match == '{{}}':
+        log.debug("ℹ️ Found handlebars template variables ({var}) in content")
+        features.has_template_vars = True
+    elif template_match:
+        log.debug("ℹ️ Found curly brace placeholder parameters ({var}) in content")
+        features.has_template_vars = True
+    
+    # Analyze the HTML in one streaming pass, off the event loop
     try:
-        # Make the actual web request to check the URL
-        try:
-            timeout = 30  # Increased timeout to 30 seconds
-            
-            # Use proper headers to simulate a real browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            # Print the full URL we're checking (including query parameters)
-            print(f"Checking full URL: {url}")
-            
-            # Handle potential request errors gracefully
+        with trace_stage('parse'):
+            page_stats = await analyze_html_async(response.text, HTML_PARSER_BACKEND, HTML_ANALYSIS_WORKERS)
+        
+        # Extract important page elements
+        title_text = page_stats['title'] if page_stats['title'] is not None else "No Title"
+        log.debug("Page title: %s", title_text)
+        
+        features.static_parsed = True
+        features.static_paragraphs = page_stats['paragraphs']
+        features.static_headings = page_stats['headings']
+        features.static_forms = page_stats['forms']
+        features.static_images = page_stats['images']
+        features.static_text_length = page_stats['text_length']
+        
+        # Calculate content density metrics
+        content_elements = (features.static_paragraphs + features.static_headings +
+                            features.static_forms * 3 + features.static_images)
+        log.debug("Content elements: %s (paragraphs: %s, headings: %s, forms: %s, images: %s)", content_elements,
+                  features.static_paragraphs, features.static_headings, features.static_forms, features.static_images)
+        log.debug("Text content length: %s characters", features.static_text_length)
+        
+        if has_real_static_content(features):
+            log.debug("✅ Page has substantial content elements and text")
+        elif content_elements < 3 and features.static_text_length < 200 and not features.has_template_vars:
+            log.debug("⚠️ Page has very minimal content")
+        
+        # Check for specific error phrases - focus on actual error messages
+        features.static_error_phrase = static_matches.get('error')
+        if features.static_error_phrase:
+            log.debug("❌ Found specific error phrase: '%s'", features.static_error_phrase)
+        
+        # Check for parked domain indicators
+        features.static_parked_phrase = static_matches.get('parked')
+        if features.static_parked_phrase:
+            log.debug("⚠️ Found parked domain indicator: '%s'", features.static_parked_phrase)
+    except Exception as parse_error:
+        log.debug("Warning: Error during HTML analysis (non-critical): %s", parse_error)
+        # If we can't parse but HTTP status is good, we'll still check with Selenium
+        log.debug("✅ HTTP status is good, continuing with Selenium check despite parsing error")
+    
+    return features
+
+def load_rendered_page(driver, url, timeout=RENDER_TIMEOUT_SECONDS):
+    """Load a page in Selenium and return its body text, lowercased"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    
+    driver.set_page_load_timeout(timeout)
+    started = time.monotonic()
+    with trace_stage('navigation'):
+        driver.get(url)
+    if tracing():
+        annotate_trace(final_url=driver.current_url)
+    host_health.observe(url, 'render', time.monotonic() - started)
+    metrics.observe('url_checker_render_seconds', time.monotonic() - started)
+    
+    with trace_stage('dom_probe'):
+        # Wait for page to load with longer timeout (15 seconds)
+        WebDriverWait(driver, min(15, timeout)).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+        
+        # Analyze the rendered page
+        return driver.find_element(By.TAG_NAME, "body").text.lower()
+
+async def render_page_features(driver, url, features, max_attempts=2):
+    """
+    Render tier: load the page in Selenium and fill in the rendered features. A tab crash marks the
+    caller's driver broken, so the pool quits it when it is released, and the remaining attempt runs
+    in a replacement released here. Returns the driver used last.
+    """
+    global browser_restart_count
+    from selenium.webdriver.common.by import By
+    
+    # After a failed HTTP request only the load itself, its text and expiration matter
+    is_fallback = features.request_error is not None
+    selenium_attempt = 0
+    replacement = None  # Started after a tab crash; the caller only knows its own driver
+    
+    try:
+        while selenium_attempt < max_attempts:
             try:
-                response = requests.get(url, timeout=timeout, allow_redirects=True, headers=headers)
-                print(f"Response status code: {response.status_code}")
-                print(f"Final URL after redirects: {response.url}")
-                
-                # Check HTTP status code first - quickest determination
-                if response.status_code >= 400:
-                    error_message = f"HTTP Status {response.status_code}"
-                    print(f"❌ HTTP Error: {url} - {error_message}")
-                    if is_last_url:
-                        cell_marked = mark_cell_text_red(sheet, row, col)
-                    else:
-                        print(f"Not marking cell red yet since this is not the last URL in cell {col}{row}")
-                    return False, error_message
-                
-                # For redirects, capture the final URL
-                final_url = response.url
-                response_text_lower = response.text.lower()
-                
-                # Track various indicators for better decision making
-                has_template_vars = False
-                has_parked_domain_indicators = False
-                has_minimal_content = False
-                has_real_content = False
-                
-                # Check for template variables - safe check without errors
+                # Use the FULL original URL with all parameters
+                log.debug("Loading URL in Selenium (attempt %s): %s", selenium_attempt + 1, url)
+                # Loading blocks until the page is up, so it runs in a worker thread
+                rendered_body_text = await asyncio.to_thread(
+                    load_rendered_page, driver, url, host_health.timeout(url, 'render'))
+                features.rendered = True
+                features.rendered_text_length = len(rendered_body_text.strip())
+                log.debug("Rendered text length: %s characters", features.rendered_text_length)
+            
+                rendered_matches = SIGNATURE_MATCHER.scan(rendered_body_text)
+            
+                # Check for an expired domain on the page that is already loaded
+                with trace_stage('dom_probe'):
+                    domain_expired, expiration_reason = await asyncio.to_thread(
+                        analyze_domain_status, features.redirect_chain, rendered_body_text, driver, rendered_matches
+                    )
+                if domain_expired:
+                    features.expired_reason = expiration_reason
+                    log.debug("❌ Expired domain: %s", expiration_reason)
+                    return driver
+                if is_fallback:
+                    return driver
+            
+                # Check for error indicators in the rendered content
+                features.rendered_error_phrase = rendered_matches.get('error')
+                if features.rendered_error_phrase:
+                    log.debug("❌ Found error phrase in rendered content: '%s'", features.rendered_error_phrase)
+            
+                # Check for parked domain indicators in the rendered content
+                features.rendered_parked_phrase = rendered_matches.get('parked')
+                if features.rendered_parked_phrase:
+                    log.debug("⚠️ Found parked domain indicator in rendered content: '%s'", features.rendered_parked_phrase)
+            
+                # Clear errors settle it, no need to count elements
+                if features.rendered_error_phrase or features.rendered_parked_phrase:
+                    return driver
+            
+                # Analyze interactive elements in rendered page
                 try:
-                    if '{{' in response_text_lower and '}}' in response_text_lower:
-                        print(f"ℹ️ Found handlebars template variables ({{var}}) in content")
-                        has_template_vars = True
-                    elif '{' in response_text_lower and '}' in response_text_lower and re.search(r'\{[a-zA-Z0-9_]+\}', response_text_lower):
-                        print(f"ℹ️ Found curly brace placeholder parameters ({{var}}) in content")
-                        has_template_vars = True
-                except Exception as var_error:
-                    print(f"Warning: Error checking for template variables (non-critical): {str(var_error)}")
+                    with trace_stage('dom_probe'):
+                        features.rendered_paragraphs = len(driver.find_elements(By.TAG_NAME, "p"))
+                        features.rendered_headings = len(driver.find_elements(By.CSS_SELECTOR, "h1, h2, h3, h4, h5, h6"))
+                        features.rendered_forms = len(driver.find_elements(By.TAG_NAME, "form"))
+                        features.rendered_buttons = len(driver.find_elements(By.TAG_NAME, "button"))
+                        features.rendered_inputs = len(driver.find_elements(By.TAG_NAME, "input"))
+                        features.rendered_images = len(driver.find_elements(By.TAG_NAME, "img"))
+                    features.elements_counted = True
                 
-                # Parse content with BeautifulSoup for deeper analysis
-                try:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Extract important page elements
-                    title = soup.find('title')
-                    title_text = title.text.strip() if title else "No Title"
-                    print(f"Page title: {title_text}")
-                    
-                    # Get counts of various content elements
-                    paragraphs = soup.find_all('p')
-                    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                    links = soup.find_all('a')
-                    forms = soup.find_all('form')
-                    images = soup.find_all('img')
-                    
-                    # Calculate content density metrics
-                    content_elements = len(paragraphs) + len(headings) + len(forms) * 3 + len(images)
-                    print(f"Content elements: {content_elements} (paragraphs: {len(paragraphs)}, " +
-                          f"headings: {len(headings)}, forms: {len(forms)}, images: {len(images)})")
-                    
-                    # Check text content length
-                    text_content = soup.get_text()
-                    content_length = len(text_content.strip())
-                    print(f"Text content length: {content_length} characters")
-                    
-                    # Analyze content quality
-                    if content_elements >= 10 and content_length > 500:
-                        print("✅ Page has substantial content elements and text")
-                        has_real_content = True
-                    elif content_elements < 3 and content_length < 200 and not has_template_vars:
-                        print("⚠️ Page has very minimal content")
-                        has_minimal_content = True
-
-                    # Check for specific error phrases - focus on actual error messages
-                    error_phrases = [
-                        "404 not found", "403 forbidden", "500 server error", "502 bad gateway",
-                        "dns_probe_finished_nxdomain", "page not found", "site can't be reached",
-                        "connection refused", "site not found", "this page isn't working",
-                        "this site can't be reached", "server not found", "website is unavailable"
-                    ]
-                    
-                    for phrase in error_phrases:
-                        if phrase in response_text_lower:
-                            print(f"❌ Found specific error phrase: '{phrase}'")
-                            has_error_indicators = True
-                            error_message = f"Error content: {phrase}"
-                            break
-                    
-                    # Check for parked domain indicators
-                    parked_domain_phrases = [
-                        "domain is for sale", "buy this domain", "purchase this domain", 
-                        "domain expired", "renew your domain", "this domain may be for sale",
-                        "domain parking", "parked domain", "this web page is parked"
-                    ]
-                    
-                    for phrase in parked_domain_phrases:
-                        if phrase in response_text_lower:
-                            print(f"⚠️ Found parked domain indicator: '{phrase}'")
-                            has_parked_domain_indicators = True
-                            error_message = f"Parked domain: {phrase}"
-                            break
-                except Exception as soup_error:
-                    print(f"Warning: Error during BeautifulSoup parsing (non-critical): {str(soup_error)}")
-                    # If we can't parse but HTTP status is good, we'll still check with Selenium
-                    if response.status_code < 400:
-                        print("✅ HTTP status is good, continuing with Selenium check despite parsing error")
+                    log.debug("Rendered content: %s paragraphs, %s headings, %s forms, %s buttons, %s inputs, %s images",
+                              features.rendered_paragraphs, features.rendered_headings, features.rendered_forms,
+                              features.rendered_buttons, features.rendered_inputs, features.rendered_images)
+                    log.debug("Content quality score: %s", content_quality_score(features))
+                except Exception as element_error:
+                    log.debug("Warning: Error analyzing page elements (non-critical): %s", element_error)
+            
+                # Success - break out of retry loop
+                return driver
                 
-                # Always check with Selenium for a more accurate assessment
-                # Especially important for JS-heavy sites and landing pages
-                print("Performing thorough rendering check with Selenium")
-                try:
-                    # Add error handling for tab crashes
-                    max_selenium_retries = 2
-                    selenium_attempt = 0
-                    
-                    while selenium_attempt < max_selenium_retries:
+            except Exception as selenium_error:
+                selenium_attempt += 1
+                error_str = str(selenium_error)
+            
+                log.debug("Selenium error on attempt %s: %s", selenium_attempt, error_str)
+            
+                # A page that timed out would only time out again
+                if 'timed out' in error_str.lower() or 'timeout' in type(selenium_error).__name__.lower():
+                    log.debug("Page load timed out - not retrying")
+                    features.render_failed = True
+                    break
+            
+                # If it's a tab crash, retry in a fresh browser
+                if "tab crashed" in error_str:
+                    log.debug("Tab crashed - attempting to restart browser")
+                    run_context.browser_pool.mark_broken(driver)
+                    browser_restart_count += 1
+                    if selenium_attempt < max_attempts:
                         try:
-                            # Use the FULL original URL with all parameters
-                            print(f"Loading URL in Selenium (attempt {selenium_attempt+1}): {original_url}")
-                            driver.get(original_url)
-                            
-                            # Wait for page to load with longer timeout (15 seconds)
-                            WebDriverWait(driver, 15).until(
-                                EC.presence_of_element_located((By.TAG_NAME, "body"))
-                            )
-                            
-                            # Analyze the rendered page
-                            page_source = driver.page_source.lower()
-                            rendered_body_text = driver.find_element(By.TAG_NAME, "body").text.lower()
-                            
-                            # Check for error indicators in the rendered content
-                            selenium_error_found = False
-                            for phrase in error_phrases:
-                                if phrase in rendered_body_text:
-                                    print(f"❌ Found error phrase in rendered content: '{phrase}'")
-                                    selenium_error_found = True
-                                    error_message = f"Rendered error: {phrase}"
-                                    break
-                                    
-                            # Check for parked domain indicators in the rendered content
-                            selenium_parked_found = False
-                            for phrase in parked_domain_phrases:
-                                if phrase in rendered_body_text:
-                                    print(f"⚠️ Found parked domain indicator in rendered content: '{phrase}'")
-                                    selenium_parked_found = True
-                                    error_message = f"Rendered parked domain: {phrase}"
-                                    break
-                                    
-                            # If Selenium found clear errors, mark the page as not working
-                            if selenium_error_found or selenium_parked_found:
-                                has_error_indicators = selenium_error_found
-                                has_parked_domain_indicators = selenium_parked_found
-                                if is_last_url:
-                                    cell_marked = mark_cell_text_red(sheet, row, col)
-                                else:
-                                    print(f"Not marking cell red yet since this is not the last URL in cell {col}{row}")
-                                return False, error_message
-                            
-                            # Analyze interactive elements in rendered page
-                            try:
-                                rendered_paragraphs = len(driver.find_elements(By.TAG_NAME, "p"))
-                                rendered_headings = len(driver.find_elements(By.CSS_SELECTOR, "h1, h2, h3, h4, h5, h6"))
-                                rendered_forms = len(driver.find_elements(By.TAG_NAME, "form"))
-                                rendered_buttons = len(driver.find_elements(By.TAG_NAME, "button"))
-                                rendered_inputs = len(driver.find_elements(By.TAG_NAME, "input"))
-                                rendered_images = len(driver.find_elements(By.TAG_NAME, "img"))
-                                
-                                print(f"Rendered content: {rendered_paragraphs} paragraphs, " +
-                                      f"{rendered_headings} headings, {rendered_forms} forms, " + 
-                                      f"{rendered_buttons} buttons, {rendered_inputs} inputs, " +
-                                      f"{rendered_images} images")
-                                
-                                # Evaluate content quality
-                                rendered_text_length = len(rendered_body_text.strip())
-                                print(f"Rendered text length: {rendered_text_length} characters")
-                                
-                                has_interactive_elements = rendered_forms > 0 or rendered_buttons > 0 or rendered_inputs > 0
-                                
-                                # Calculate a content quality score
-                                content_quality = (
-                                    rendered_paragraphs + 
-                                    (rendered_headings * 2) + 
-                                    (rendered_forms * 3) + 
-                                    rendered_buttons + 
-                                    rendered_inputs + 
-                                    (rendered_images * 0.5)
-                                )
-                                
-                                print(f"Content quality score: {content_quality}")
-                                
-                                # Make landing page specific assessments
-                                is_landing_page = has_interactive_elements and ("{" in url or "{{" in url)
-                                is_working_landing_page = False
-                                
-                                # Special case for landing pages with template variables
-                                if is_landing_page:
-                                    print("This appears to be a landing page with template variables")
-                                    # Landing pages with forms are typically functional despite template vars
-                                    if rendered_forms > 0 or (rendered_buttons > 0 and rendered_inputs > 0):
-                                        print("✅ Landing page has functional form elements")
-                                        is_working_landing_page = True
-                                    # Landing pages often have minimal text content due to their nature
-                                    if content_quality >= 5:
-                                        print("✅ Landing page has sufficient quality score")
-                                        is_working_landing_page = True
-                                
-                                # Regular page assessment
-                                if content_quality >= 8 or has_real_content:
-                                    print("✅ Page has high quality content")
-                                    is_working = True
-                                elif is_working_landing_page:
-                                    print("✅ Working landing page detected")
-                                    is_working = True
-                                elif rendered_text_length < 50 and content_quality < 3 and not has_interactive_elements:
-                                    print("⚠️ Page has extremely minimal content and no interactive elements")
-                                    has_minimal_content = True
-                                    if not is_landing_page:
-                                        # Empty pages without interactive elements are probably errors
-                                        error_message = "Empty or minimal content page"
-                                else:
-                                    # Default to working if we passed all error checks and the HTTP status was 200
-                                    print("ℹ️ Page passed basic content checks with HTTP 200")
-                                    is_working = True
-                            except Exception as element_error:
-                                print(f"Warning: Error analyzing page elements (non-critical): {str(element_error)}")
-                                # Since we got to this point with a 200 status, the page is likely working
-                                print("✅ HTTP status is good, considering page working despite element analysis error")
-                                is_working = True
-                                
-                            # Success - break out of retry loop
-                            break
-                                
-                        except Exception as selenium_error:
-                            selenium_attempt += 1
-                            error_str = str(selenium_error)
-                            
-                            print(f"Selenium error on attempt {selenium_attempt}: {error_str}")
-                            
-                            # If it's a tab crash, try to reset the driver
-                            if "tab crashed" in error_str:
-                                print("Tab crashed - attempting to restart browser")
-                                try:
-                                    driver.quit()
-                                    browser_restart_count += 1
-                                    driver = setup_selenium()
-                                    await asyncio.sleep(3)  # Give browser a moment to start up
-                                    
-                                    # If this is our last retry and it failed, use request success as fallback
-                                    if selenium_attempt >= max_selenium_retries - 1:
-                                        print("Max Selenium retries reached after tab crash. Falling back to request analysis.")
-                                        # Fall back to request-based analysis - if HTTP status was good, consider it working
-                                        print("✅ HTTP status was good, considering page working despite Selenium issues")
-                                        is_working = True
-                                        break
-                                except Exception as restart_error:
-                                    print(f"Error restarting browser: {restart_error}")
-                            
-                            # If this is our last retry with Selenium, use HTTP request result as fallback
-                            if selenium_attempt >= max_selenium_retries:
-                                print("Max Selenium retries reached. Falling back to request analysis.")
-                                # Since HTTP status was good, consider it working
-                                print("✅ HTTP status was good, considering page working despite Selenium issues")
-                                is_working = True
-                            else:
-                                # Pause before next attempt
-                                await asyncio.sleep(3)
-
-                except Exception as outer_selenium_error:
-                    print(f"❌ Outer Selenium check failed: {str(outer_selenium_error)}")
-                    # If HTTP status was good and there are no clear error indicators, consider it working
-                    if response.status_code < 400 and not has_error_indicators and not has_parked_domain_indicators:
-                        print("✅ HTTP status was good, considering page working despite Selenium issues")
-                        is_working = True
-
-            except requests.exceptions.RequestException as req_error:
-                # Connection errors are handled via Selenium fallback
-                error_message = str(req_error)
-                print(f"❌ Connection Error with requests: {url} - {error_message}")
+                            # A crashed replacement is quit on release, since it is marked broken too
+                            await asyncio.to_thread(run_context.browser_pool.release, replacement)
+                            replacement = None
+                            replacement = driver = await asyncio.to_thread(run_context.browser_pool.acquire)
+                        except Exception as restart_error:
+                            log.warning("Error restarting browser: %s", restart_error)
                 
-                # Try a fallback with Selenium for connectivity issues
-                try:
-                    print(f"Attempting fallback check with Selenium for {url}")
-                    driver.get(original_url)  # Use original full URL
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
-                    
-                    # If we got here, the page loaded in Selenium despite the request error
-                    print(f"✅ Selenium fallback succeeded for {url} despite request error")
-                    
-                    # Do a quick content check
-                    rendered_text = driver.find_element(By.TAG_NAME, "body").text
-                    if len(rendered_text.strip()) > 100:
-                        print("✅ Selenium found reasonable content despite request error")
-                        is_working = True
-                    else:
-                        print("⚠️ Page loaded in Selenium but has minimal content")
-                        # For landing pages, minimal content might be valid
-                        if "{" in url or "{{" in url:
-                            print("ℹ️ Minimal content might be valid for landing page with template variables")
-                            is_working = True
-                        else:
-                            is_working = False
-                            error_message = "Minimal content despite successful load"
-                    
-                    if is_working and is_last_url:
-                        cell_marked = reset_cell_formatting(sheet, row, col)
-                    elif not is_working and is_last_url:
-                        cell_marked = mark_cell_text_red(sheet, row, col)
-                    else:
-                        print(f"Not marking cell yet since this is not the last URL in cell {col}{row}")
-                except Exception as selenium_error:
-                    # If both requests and Selenium fail, the URL is definitely not working
-                    print(f"❌ Both requests and Selenium failed for {url}")
-                    # Only mark the cell if this is the last URL in the cell
-                    if is_last_url:
-                        cell_marked = mark_cell_text_red(sheet, row, col)
-                    else:
-                        print(f"Not marking cell red yet since this is not the last URL in cell {col}{row}")
+                # If this is our last retry with Selenium, use HTTP request result as fallback
+                if selenium_attempt >= max_attempts:
+                    log.debug("Max Selenium retries reached. Falling back to request analysis.")
+                    features.render_failed = True
+                else:
+                    # Pause before next attempt
+                    await asyncio.sleep(3)
+    
+        return driver
+    finally:
+        await asyncio.to_thread(run_context.browser_pool.release, replacement)
+
+async def evaluate_url(driver, url):
+    """
+    Verdict for a URL without touching the sheet: verdict cache, circuit breaker,
+    static tier, then the render tier when needed (skipped when driver is None).
+    """
+    cached = run_context.verdict_cache.get(url)
+    if cached is not None:
+        # Same URL was already checked for another cell or sheet
+        log.debug("Using cached verdict for %s", url)
+        return Verdict(cached[0], cached[1], 'cache')
+    if not host_health.allow(url):
+        # The host kept failing - fail fast instead of waiting out its timeouts again
+        verdict = Verdict(False, f"Host {host_of(url)} unreachable (circuit open after "
+                                 f"{host_health.consecutive_failures(url)} failed checks)", 'breaker')
+        log.debug("⚡ Skipping %s: %s", url, verdict.reason)
+        return verdict
+    
+    started = time.monotonic()
+    features = await fetch_static_features(url)
+    check_latency.observe('static', time.monotonic() - started)
+    verdict = classify_static(features)
+    check_latency.observe_check(rendered=verdict is None)
+    
+    if verdict is None:
+        started = time.monotonic()
+        if driver is None:
+            log.debug("No browser available - classifying %s from the static tier only", url)
+        elif features.request_error is not None:
+            # Try a fallback with Selenium for connectivity issues
+            log.debug("Attempting fallback check with Selenium for %s", url)
+            driver = await render_page_features(driver, url, features, max_attempts=1)
+            if not features.rendered:
+                log.debug("❌ Both requests and Selenium failed for %s", url)
+        else:
+            # Always check with Selenium for a more accurate assessment
+            # Especially important for JS-heavy sites and landing pages
+            log.debug("Performing thorough rendering check with Selenium")
+            driver = await render_page_features(driver, url, features)
+        if driver is not None:
+            check_latency.observe('render', time.monotonic() - started)
+        verdict = classify_page(features)
+    run_context.verdict_cache.put(url, verdict.is_working, verdict.reason)
+    
+    # The host answered if either tier got a response
+    if features.status_code is not None or features.rendered:
+        host_health.record_success(url)
+    elif host_health.record_failure(url):
+        log.info("⚡ Circuit opened for %s - its URLs fail fast for %ss", host_of(url), BREAKER_COOLDOWN_SECONDS)
+    return verdict
+
+def record_check_metrics(tier, is_working):
+    metrics.inc('url_checker_checks_total', tier=tier)
+    metrics.inc('url_checker_verdicts_total', verdict='working' if is_working else 'broken')
+    annotate_trace(tier=tier)
+
+async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=False):
+    """Check if a URL is working and mark it in the spreadsheet, traced to TRACE_FILE and HISTORY_DB when enabled"""
+    if check_sink is None or retry_count > 0:
+        return await check_and_mark_url(driver, url, sheet, row, col, retry_count, is_last_url)
+    
+    target = target_label(sheet) if sheet is not None else None
+    with url_trace(check_sink, url, cell=f"{col}{row}", target=target, is_last_url=is_last_url) as trace:
+        is_working, error_message = await check_and_mark_url(driver, url, sheet, row, col, retry_count, is_last_url)
+        trace.fields.update(is_working=is_working, reason=error_message)
+        return is_working, error_message
+
+async def check_and_mark_url(driver, url, sheet, row, col, retry_count=0, is_last_url=False):
+    """
+    Check if a URL is working and mark it in the spreadsheet.
+    is_working is None when the host's breaker is open: nothing was checked and the cell keeps its color.
+    """
+    
+    log.debug("=== Checking URL: %s at cell %s%s %s ===", url, col, row, '(FINAL URL in cell)' if is_last_url else '')
+    
+    # Track whether the URL is working
+    is_working = False
+    error_message = ""
+    cell_marked = False  # Flag to track if we've marked the cell
+    
+    try:
+        # Gather page features from the static tier, and the render tier when needed
+        try:
+            verdict = await evaluate_url(driver, url)
         
         except Exception as general_check_error:
             # Handle general errors in the checking process
-            print(f"Warning: Error during URL checking process: {str(general_check_error)}")
+            log.debug("Warning: Error during URL checking process: %s", general_check_error)
             # For landing pages with template variables, be lenient
-            if "{" in url or "{{" in url:
-                print("⚠️ Error processing URL with template variables, but these are typically valid landing pages")
+            if is_template_url(url):
+                log.debug("⚠️ Error processing URL with template variables, but these are typically valid landing pages")
                 is_working = True
             else:
                 is_working = False
                 error_message = f"Error checking URL: {str(general_check_error)}"
             
+            record_check_metrics('error', is_working)
+            
             # Mark the cell if this is the last URL
             if is_last_url:
                 if is_working:
-                    cell_marked = reset_cell_formatting(sheet, row, col)
+                    cell_marked = await asyncio.to_thread(reset_cell_formatting, sheet, row, col)
                 else:
-                    cell_marked = mark_cell_text_red(sheet, row, col)
+                    cell_marked = await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
             
             # Return result
             return is_working, error_message
-                
-        # Final decision based on all collected evidence
-        if has_error_indicators or has_parked_domain_indicators:
-            is_working = False
-            
-        # Mark the cell based on our decision
+        
+        if verdict.tier == 'breaker':
+            # No request was made, so there is nothing to judge the cell by - leave its color alone
+            metrics.inc('url_checker_checks_total', tier='breaker')
+            annotate_trace(tier='breaker')
+            log.debug("⚡ Leaving cell %s%s as it is: %s", col, row, verdict.reason)
+            return None, verdict.reason
+        
+        # Mark the cell based on the classifier's verdict
+        is_working = verdict.is_working
+        record_check_metrics(verdict.tier, is_working)
         if is_working:
-            print(f"✅ URL is working: {url}")
+            log.debug("✅ URL is working: %s (%s)", url, verdict.reason)
             if is_last_url:
-                cell_marked = reset_cell_formatting(sheet, row, col)
+                cell_marked = await asyncio.to_thread(reset_cell_formatting, sheet, row, col)
             else:
-                print(f"Not marking cell blue yet since this is not the last URL in cell {col}{row}")
+                log.debug("Not marking cell blue yet since this is not the last URL in cell %s%s", col, row)
         else:
-            error_message = error_message or "Failed content quality checks"
-            print(f"❌ URL is not working properly: {url} - {error_message}")
+            error_message = verdict.reason or "Failed content quality checks"
+            log.info("❌ URL is not working properly: %s - %s (decided by %s check)", url, error_message, verdict.tier)
             if is_last_url:
-                cell_marked = mark_cell_text_red(sheet, row, col)
+                cell_marked = await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
             else:
-                print(f"Not marking cell red yet since this is not the last URL in cell {col}{row}")
+                log.debug("Not marking cell red yet since this is not the last URL in cell %s%s", col, row)
             
     except Exception as e:
         # ANY other exception at the top level
         error_message = str(e)
-        print(f"❌ Top-level error checking URL: {url} - {error_message}")
+        log.warning("❌ Top-level error checking URL: %s - %s", url, error_message)
         
         # For landing pages with template variables, be more lenient
-        if "{" in url or "{{" in url:
-            print("Special handling for URL with template variables - this is likely a landing page")
-            print("Checking if HTTP request would succeed...")
+        if is_template_url(url):
+            log.debug("Special handling for URL with template variables - this is likely a landing page")
+            log.debug("Checking if HTTP request would succeed...")
             
             try:
                 # Try a basic request to see if the URL is accessible
-                test_response = requests.get(url, timeout=10, allow_redirects=True)
+                test_response = await asyncio.to_thread(run_context.http_session.get, url,
+                                                        timeout=10, allow_redirects=True)
                 if test_response.status_code < 400:
-                    print(f"✅ HTTP request succeeded with status {test_response.status_code} - considering landing page working")
+                    log.debug("✅ HTTP request succeeded with status %s - considering landing page working",
+                              test_response.status_code)
                     is_working = True
                 else:
-                    print(f"❌ HTTP request failed with status {test_response.status_code}")
+                    log.debug("❌ HTTP request failed with status %s", test_response.status_code)
                     is_working = False
             except:
-                print("❌ HTTP request also failed")
+                log.debug("❌ HTTP request also failed")
                 is_working = False
                 
         if retry_count < 1:  # Try one more time if there's an unexpected error
-            print(f"Retrying URL: {url}")
+            log.debug("Retrying URL: %s", url)
             await asyncio.sleep(2)  # Wait 2 seconds before retry
             return await check_url(driver, url, sheet, row, col, retry_count + 1, is_last_url)
         else:
@@ -1107,16 +1405,16 @@ async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=Fal
                 # Only mark the cell if this is the last URL in the cell
                 if is_last_url:
                     if is_working:
-                        cell_marked = reset_cell_formatting(sheet, row, col)
-                        print(f"Marked cell {col}{row} as blue (#0000EE) for working URL")
+                        cell_marked = await asyncio.to_thread(reset_cell_formatting, sheet, row, col)
+                        log.debug("Marked cell %s%s as blue (#0000EE) for working URL", col, row)
                     else:
-                        cell_marked = mark_cell_text_red(sheet, row, col)
-                        print(f"Marked cell {col}{row} as red after retry failure")
+                        cell_marked = await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
+                        log.debug("Marked cell %s%s as red after retry failure", col, row)
                     
                     if not cell_marked:
-                        print(f"Failed to mark cell {col}{row} (likely rate limited)")
+                        log.warning("Failed to mark cell %s%s (likely rate limited)", col, row)
                         # Add to pending formats to ensure it gets marked eventually
-                        pending_formats.append({
+                        run_context.pending_formats.append({
                             'sheet': sheet,
                             'row': row,
                             'col': col,
@@ -1126,12 +1424,12 @@ async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=Fal
                             'format_key': f"{col}{row}:{'blue' if is_working else 'red'}"
                         })
                 else:
-                    print(f"Not marking cell yet since this is not the last URL in cell {col}{row}")
+                    log.debug("Not marking cell yet since this is not the last URL in cell %s%s", col, row)
             except Exception as mark_err:
-                print(f"❌ Failed to mark cell {col}{row}: {str(mark_err)}")
+                log.warning("❌ Failed to mark cell %s%s: %s", col, row, mark_err)
                 # Even if marking fails, still add to pending formats if this is the last URL
                 if is_last_url:
-                    pending_formats.append({
+                    run_context.pending_formats.append({
                         'sheet': sheet,
                         'row': row,
                         'col': col,
@@ -1144,11 +1442,12 @@ async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=Fal
     # Final safety check - ensure the cell was marked one way or the other but ONLY for the final URL
     if is_last_url and not cell_marked:
         try:
-            print(f"⚠️ Cell {col}{row} was not marked during processing - added to pending formats queue with high priority")
+            log.warning("⚠️ Cell %s%s was not marked during processing - added to pending formats queue with high priority",
+                        col, row)
             # Default to blue if we're ABSOLUTELY SURE the URL is working
             cell_type = 'blue' if is_working else 'red'
             # Add with higher priority to ensure it gets processed soon
-            pending_formats.append({
+            run_context.pending_formats.append({
                 'sheet': sheet,
                 'row': row,
                 'col': col,
@@ -1159,9 +1458,9 @@ async def check_url(driver, url, sheet, row, col, retry_count=0, is_last_url=Fal
             })
             
         except Exception as e:
-            print(f"❌ Failed to add cell {col}{row} to pending formats: {str(e)}")
+            log.error("❌ Failed to add cell %s%s to pending formats: %s", col, row, e)
             
-    return is_working
+    return is_working, error_message
 
 def column_to_index(column_name):
     """Convert column name (A, B, C, ..., AA, AB, etc.) to 0-based index"""
@@ -1182,18 +1481,17 @@ def index_to_column(index):
 
 async def process_pending_formats(final_attempt=False):
     """Process any cell formats that couldn't be applied due to rate limits"""
-    global pending_formats, successfully_formatted_cells, failed_formatted_cells
     
-    if not pending_formats:
-        print("No pending cell formats to process")
+    if not run_context.pending_formats:
+        log.info("No pending cell formats to process")
         return
         
-    total_to_process = len(pending_formats)
-    print(f"\n===== Processing {total_to_process} pending cell formats =====")
+    total_to_process = len(run_context.pending_formats)
+    log.info("===== Processing %s pending cell formats =====", total_to_process)
     
     # Make a copy of the pending formats and clear the global list
-    formats_to_process = pending_formats.copy()
-    pending_formats = []
+    formats_to_process = run_context.pending_formats.copy()
+    run_context.pending_formats = []
     
     successfully_processed = 0
     still_pending = 0
@@ -1205,7 +1503,8 @@ async def process_pending_formats(final_attempt=False):
     # Use a batching approach to be more aggressive about rate limits
     for batch_idx in range(0, len(formats_to_process), BATCH_WRITE_SIZE):
         batch = formats_to_process[batch_idx:batch_idx + BATCH_WRITE_SIZE]
-        print(f"\nProcessing batch {batch_idx//BATCH_WRITE_SIZE + 1}/{(len(formats_to_process) + BATCH_WRITE_SIZE - 1)//BATCH_WRITE_SIZE}")
+        log.debug("Processing batch %s/%s",
+                  batch_idx // BATCH_WRITE_SIZE + 1, (len(formats_to_process) + BATCH_WRITE_SIZE - 1) // BATCH_WRITE_SIZE)
         
         for idx, format_data in enumerate(batch):
             sheet = format_data['sheet']
@@ -1218,483 +1517,998 @@ async def process_pending_formats(final_attempt=False):
             
             # Skip if this cell was already successfully formatted
             cell_id = f"{col}{row}"
-            if cell_id in successfully_formatted_cells:
-                print(f"Skipping pending format for cell {cell_id} - already successfully formatted")
+            state = run_context.state_for(sheet)
+            if state is None:
+                continue  # Not a checked worksheet - dropped, state_for logged it
+            if cell_id in state.successfully_formatted_cells:
+                log.debug("Skipping pending format for cell %s - already successfully formatted", cell_id)
                 successfully_processed += 1
                 continue
                 
             # Check if we've exceeded retries for this cell, but if this is a final attempt, try anyway
             if retry_count >= MAX_PENDING_RETRIES and not final_attempt:
-                print(f"⚠️ Max retries exceeded for cell {cell_id}. Will not attempt further formatting.")
-                failed_formatted_cells.add(cell_id)
+                log.warning("⚠️ Max retries exceeded for cell %s. Will not attempt further formatting.", cell_id)
+                state.failed_formatted_cells.add(cell_id)
                 continue
             
-            print(f"Processing format for cell {col}{row}: {format_type} (URL: {url}, retry: {retry_count+1}/{MAX_PENDING_RETRIES})")
+            log.debug("Processing format for cell %s%s: %s (URL: %s, retry: %s/%s)",
+                      col, row, format_type, url, retry_count + 1, MAX_PENDING_RETRIES)
             
             try:
                 success = False
                 if format_type == 'red':
-                    success = mark_cell_text_red(sheet, row, col)
+                    success = await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
                 else:  # blue
-                    success = reset_cell_formatting(sheet, row, col)
+                    success = await asyncio.to_thread(reset_cell_formatting, sheet, row, col)
                     
                 if success:
                     successfully_processed += 1
-                    print(f"✅ Successfully processed pending format for cell {col}{row}")
+                    run_progress.touch()
+                    log.debug("✅ Successfully processed pending format for cell %s%s", col, row)
                 else:
                     # Add back to the pending list if still failed, with incremented retry count
                     format_data['retry_count'] = retry_count + 1
-                    pending_formats.append(format_data)
+                    run_context.pending_formats.append(format_data)
                     still_pending += 1
-                    print(f"⚠️ Failed to process pending format for cell {col}{row} - will retry later")
+                    log.warning("⚠️ Failed to process pending format for cell %s%s - will retry later", col, row)
                     
                 # Pause between each format to avoid hitting rate limits - much longer pauses
                 sleep_time = 60 / SHEETS_API_WRITES_PER_MINUTE * 3  # 3x safety factor (greatly increased)
-                print(f"Pausing for {sleep_time:.1f} seconds to avoid rate limits...")
+                log.debug("Pausing for %.1f seconds to avoid rate limits...", sleep_time)
                 await asyncio.sleep(sleep_time)
                 
             except Exception as e:
-                print(f"❌ Error processing pending format for cell {col}{row}: {str(e)}")
+                log.warning("❌ Error processing pending format for cell %s%s: %s", col, row, e)
                 format_data['retry_count'] = retry_count + 1
-                pending_formats.append(format_data)
+                run_context.pending_formats.append(format_data)
                 still_pending += 1
         
         # Pause between batches with a longer pause (increased duration)
         if batch_idx + BATCH_WRITE_SIZE < len(formats_to_process):
-            print(f"\nCompleted batch {batch_idx//BATCH_WRITE_SIZE + 1}. Taking a longer pause ({BATCH_WRITE_PAUSE} seconds) before next batch...")
+            log.info("Completed batch %s. Taking a longer pause (%s seconds) before next batch...",
+                     batch_idx // BATCH_WRITE_SIZE + 1, BATCH_WRITE_PAUSE)
             await asyncio.sleep(BATCH_WRITE_PAUSE)
     
-    print(f"\n===== Pending Formats Processing Summary =====")
-    print(f"✅ Successfully processed: {successfully_processed}/{total_to_process}")
-    print(f"⚠️ Still pending: {still_pending}/{total_to_process}")
-    print(f"Total successfully formatted cells: {len(successfully_formatted_cells)}")
-    print(f"Total failed formatted cells: {len(failed_formatted_cells)}")
+    log.info("===== Pending Formats Processing Summary =====")
+    log.info("✅ Successfully processed: %s/%s", successfully_processed, total_to_process)
+    log.info("⚠️ Still pending: %s/%s", still_pending, total_to_process)
+    formatted_total, failed_total = run_context.formatting_totals()
+    log.info("Total successfully formatted cells: %s", formatted_total)
+    log.info("Total failed formatted cells: %s", failed_total)
     
-    remaining = len(pending_formats)
+    remaining = len(run_context.pending_formats)
     if remaining > 0:
-        print(f"⚠️ {remaining} cell formats still pending after processing")
+        log.warning("⚠️ %s cell formats still pending after processing", remaining)
     else:
-        print("✅ All pending cell formats processed successfully")
+        log.info("✅ All pending cell formats processed successfully")
+
+async def flush_formats(cells, reasons=()):
+    """
+    Write (sheet, row, col, color) text colors and (sheet, row, col, text) failure reasons in bulk:
+    one batch_update per spreadsheet and FORMAT_FLUSH_CHUNK cells, so many cells cost one rate-limited
+    write instead of one each. Colors and reasons never share a batch_update, so a reason the API
+    rejects cannot hold up colors. Chunks that still fail after the rate-limit retries go back to the
+    pending queues; a reason is dropped after RATE_LIMIT_RETRIES failed flushes. Returns the colored cells written.
+    """
+    by_spreadsheet = {}
+    for kind, group in (('color', cells), ('reason', reasons)):
+        for sheet, row, col, value in group:
+            # In sharded mode only the worker holding the row's lease may write its formatting
+            if owns_row(sheet, row):
+                by_spreadsheet.setdefault((id(sheet.spreadsheet), kind), []).append((kind, sheet, row, col, value))
+    
+    written = 0
+    for group in by_spreadsheet.values():
+        spreadsheet = group[0][1].spreadsheet
+        for start in range(0, len(group), FORMAT_FLUSH_CHUNK):
+            chunk = group[start:start + FORMAT_FLUSH_CHUNK]
+            batch_request = {"requests": [text_color_request(*cell) if kind == 'color' else cell_reason_request(*cell)
+                                          for kind, *cell in chunk]}
+            error = None
+            for retry_count in range(RATE_LIMIT_RETRIES + 1):
+                try:
+                    await asyncio.to_thread(sheets_write, spreadsheet.batch_update, batch_request)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    if not is_rate_limit_error(e) or retry_count == RATE_LIMIT_RETRIES:
+                        break
+                    retry_seconds = min(2 ** retry_count * random.uniform(0.5, 1.5), RATE_LIMIT_PAUSE_MAX)
+                    log.warning("Rate limited writing %s cells, retrying in %.1f seconds (retry %s/%s)",
+                                len(chunk), retry_seconds, retry_count + 1, RATE_LIMIT_RETRIES)
+                    await asyncio.sleep(retry_seconds)
+            
+            if error:
+                log.warning("❌ Bulk formatting of %s cells failed, queueing them: %s", len(chunk), error)
+                for kind, sheet, row, col, value in chunk:
+                    if kind == 'reason':
+                        key = (id(sheet), row, col)
+                        failures = run_context.reason_failures[key] = run_context.reason_failures.get(key, 0) + 1
+                        if failures > RATE_LIMIT_RETRIES:
+                            log.warning("⚠️ Dropping the failure reason for %s%s after %s failed writes",
+                                        col, row, failures)
+                            del run_context.reason_failures[key]
+                            continue
+                        # A newer reason queued meanwhile wins
+                        run_context.pending_reasons.setdefault(key, (sheet, row, col, value))
+                        continue
+                    run_context.pending_formats.append({
+                        'sheet': sheet,
+                        'row': row,
+                        'col': col,
+                        'type': value,
+                        'format_key': f"{col}{row}:{value}",
+                        'retry_count': 0
+                    })
+                continue
+            
+            colored = 0
+            for kind, sheet, row, col, value in chunk:
+                if kind == 'color':
+                    note_cell_color(sheet, f"{col}{row}", value)
+                    colored += 1
+                else:
+                    run_context.reason_failures.pop((id(sheet), row, col), None)
+            written += colored
+            run_progress.touch()
+            log.debug("Wrote %s colors and %s reasons with one batch update", colored, len(chunk) - colored)
+    return written
+
+async def flush_reasons():
+    """Write the queued failure reasons in bulk"""
+    reasons = take_pending_reasons()
+    if reasons:
+        log.info("Writing %s failure reasons in bulk...", len(reasons))
+        await flush_formats([], reasons)
+
+def text_color_name(color):
+    """'red' or 'blue' when a Sheets API color is one the bot writes, else None"""
+    for name, target in TEXT_COLORS.items():
+        if color and all(abs(color.get(channel, 0) - value) < 0.01 for channel, value in target.items()):
+            return name
+    return None
+
+def read_text_colors(cells):
+    """
+    Text colors of (sheet, row, col) cells, read with one grid-data request per spreadsheet covering
+    each touched column from its first to its last touched row. Returns {(id(sheet), row, col): color name or None}.
+    """
+    spans = {}  # spreadsheet id -> (worksheet id, col) -> [sheet, first row, last row]
+    for sheet, row, col in cells:
+        span = spans.setdefault(id(sheet.spreadsheet), {}).setdefault((sheet.id, col), [sheet, row, row])
+        span[1], span[2] = min(span[1], row), max(span[2], row)
+    
+    colors = {}
+    for columns in spans.values():
+        sheets_by_id = {sheet.id: sheet for sheet, _, _ in columns.values()}
+        spreadsheet = next(iter(sheets_by_id.values())).spreadsheet
+        ranges = ["'{}'!{}{}:{}{}".format(sheet.title.replace("'", "''"), col, first, col, last)
+                  for (_, col), (sheet, first, last) in columns.items()]
+        metadata = sheets_read(spreadsheet.fetch_sheet_metadata, {
+            'includeGridData': 'true',
+            'ranges': ranges,
+            'fields': 'sheets(properties.sheetId,data(startRow,startColumn,'
+                      'rowData.values.userEnteredFormat.textFormat.foregroundColor))',
+        })
+        for sheet_data in metadata.get('sheets', []):
+            sheet = sheets_by_id.get(sheet_data.get('properties', {}).get('sheetId'))
+            if sheet is None:
+                continue
+            for grid in sheet_data.get('data', []):
+                start_row, start_col = grid.get('startRow', 0), grid.get('startColumn', 0)
+                for row_offset, row_data in enumerate(grid.get('rowData', [])):
+                    for col_offset, cell in enumerate(row_data.get('values', [])):
+                        color = cell.get('userEnteredFormat', {}).get('textFormat', {}).get('foregroundColor')
+                        colors[(id(sheet), start_row + row_offset + 1,
+                                index_to_column(start_col + col_offset))] = text_color_name(color)
+    return colors
+
+async def verify_formats(cells):
+    """
+    Read back the text colors of (sheet, row, col, color) cells and rewrite only the ones that
+    differ, in one bulk flush. The verified cells leave the pending queue. Returns the mismatches,
+    or None when the colors could not be read.
+    """
+    cells = [cell for cell in cells if owns_row(cell[0], cell[1])]
+    if not cells:
+        return []
+    try:
+        actual = await asyncio.to_thread(read_text_colors, [(sheet, row, col) for sheet, row, col, _ in cells])
+    except Exception as e:
+        log.warning("❌ Could not read back the colors of %s cells: %s", len(cells), e)
+        return None
+    
+    verified = {(id(sheet), row, col) for sheet, row, col, _ in cells}
+    run_context.pending_formats = [fmt for fmt in run_context.pending_formats
+                                   if (id(fmt['sheet']), fmt['row'], fmt['col']) not in verified]
+    mismatched = [cell for cell in cells if actual.get((id(cell[0]), cell[1], cell[2])) != cell[3]]
+    if mismatched:
+        await flush_formats(mismatched)
+    return mismatched
+
+def open_target_worksheet(state):
+    """Open a target's spreadsheet and return the worksheet to check, remembering it on the target state"""
+    # The worksheet lookup costs two API calls, so it is cached until a read on it fails
+    if state.sheet is not None:
+        return state.sheet
+    
+    target = state.target
+    log.info("Attempting to connect to Google Sheet with ID: %s", target.spreadsheet_id)
+    # Open the spreadsheet
+    spreadsheet = get_gspread_client().open_by_key(target.spreadsheet_id)
+    log.info("Successfully opened spreadsheet: %s", spreadsheet.title)
+    
+    # Get the specific worksheet by ID if possible, otherwise fall back to the first worksheet
+    try:
+        sheet = None
+    
+        # Try to get the worksheet by ID first
+        if target.worksheet_id:
+            try:
+                # Try to get worksheet by gid 
+                worksheets = spreadsheet.worksheets()
+                for ws in worksheets:
+                    if str(ws.id) == target.worksheet_id:
+                        sheet = ws
+                        log.info("Found worksheet by ID %s: %s", target.worksheet_id, sheet.title)
+                        break
+            except Exception as e:
+                log.warning("Error finding worksheet by ID %s: %s", target.worksheet_id, e)
+    
+        # Fall back to first worksheet if needed
+        if sheet is None:
+            sheet = spreadsheet.get_worksheet(0)
+            log.info("Using first worksheet: %s", sheet.title)
+    except Exception as e:
+        log.warning("Error getting worksheet, falling back to first worksheet: %s", e)
+        sheet = spreadsheet.get_worksheet(0)
+        log.info("Using first worksheet: %s", sheet.title)
+    
+    check_reason_columns(sheet, target)
+    state.bind(sheet)
+    return sheet
+
+def collect_urls_to_check(sheet, all_values, columns=URL_COLUMNS):
+    """Collect the URLs to check from the configured columns, last URL of each cell first"""
+    rows = all_values[1:]  # Row 1 holds the headers
+    
+    # Column-major pass: the non-empty cells of each column, as (row, column position, text)
+    cells = []
+    for position, col in enumerate(columns):
+        col_idx = column_to_index(col)
+        column = [row_data[col_idx] if col_idx < len(row_data) else "" for row_data in rows]
+        cells.extend((row_idx, position, text) for row_idx, text in enumerate(column, start=2)
+                     if text and not text.isspace())
+    # Tasks stay in row order, so the check order does not depend on the column count
+    cells.sort(key=lambda cell: (cell[0], cell[1]))
+    
+    # URLs are extracted once per distinct cell text - the same landing page often fills many cells
+    extracted = {}
+    for text in {text for _, _, text in cells}:
+        try:
+            extracted[text] = extract_urls_from_text(text)
+        except Exception as e:
+            # If URL extraction fails, the cell is still checked as a possible URL
+            log.warning("❌ Error extracting URLs from %r: %s", text[:100], e)
+            extracted[text] = []
+    
+    # Column letters are shared by every task of the column, and URLs are interned
+    col_names = [sys.intern(col) for col in columns]
+    urls_to_check = []
+    for row, position, cell_content in cells:
+        col_name = col_names[position]
+        urls = extracted[cell_content]
+        if not urls:
+            # No valid URL found but the cell has content: check it anyway as a possible URL
+            possible_url = cell_content
+            if not possible_url.startswith(('http://', 'https://')):
+                possible_url = 'http://' + possible_url
+            urls_to_check.append(UrlTask(sys.intern(possible_url), sheet, row, col_name, cell_content,
+                                         is_potential_url=True))
+            continue
+        
+        # Process the URLs in reverse order (IMPORTANT: to prioritize the last URL)
+        # This helps when multiple URLs are in a cell - we want the most recent/updated one
+        seen = set()  # URLs already taken from this cell
+        for url in reversed(urls):
+            if url in seen:
+                log.debug("Skipping duplicate URL %s in cell %s%s", url, col_name, row)
+                continue
+            seen.add(url)
+            urls_to_check.append(UrlTask(sys.intern(url), sheet, row, col_name, cell_content,
+                                         is_last_url=(url == urls[-1])))
+    
+    return urls_to_check
 
 async def check_links():
     """Check all URLs in the specified columns of the spreadsheet"""
-    global pending_formats, successfully_formatted_cells, failed_formatted_cells
     
     # ADDED: Clear the successful formatting tracking to force reformatting of all cells
-    successfully_formatted_cells = set()
-    failed_formatted_cells = set()
+    for state in run_context.states:
+        state.reset_formatting()
+    # Each sweep re-checks every URL once, however many cells or sheets it appears in
+    run_context.verdict_cache.clear()
+    run_progress.set_phase(COLLECTING)
     
     try:
-        print("Setting up Selenium...")
-        driver = None  # Will initialize per batch
+        log.info("Setting up Selenium...")
         
-        print(f"Attempting to connect to Google Sheet with ID: {SHEET_URL}")
         try:
-            # Open the spreadsheet
-            spreadsheet = gc.open_by_key(SHEET_URL)
-            print(f"Successfully opened spreadsheet: {spreadsheet.title}")
-            
-            # Get the specific worksheet by ID if possible, otherwise fall back to the first worksheet
-            try:
-                sheet = None
-                
-                # Try to get the worksheet by ID first
-                if WORKSHEET_ID:
-                    try:
-                        # Try to get worksheet by gid 
-                        worksheets = spreadsheet.worksheets()
-                        for ws in worksheets:
-                            if str(ws.id) == WORKSHEET_ID:
-                                sheet = ws
-                                print(f"Found worksheet by ID {WORKSHEET_ID}: {sheet.title}")
-                                break
-                    except Exception as e:
-                        print(f"Error finding worksheet by ID {WORKSHEET_ID}: {str(e)}")
-                
-                # Fall back to first worksheet if needed
-                if sheet is None:
-                    sheet = spreadsheet.get_worksheet(0)
-                    print(f"Using first worksheet: {sheet.title}")
-            except Exception as e:
-                print(f"Error getting worksheet, falling back to first worksheet: {str(e)}")
-                sheet = spreadsheet.get_worksheet(0)
-                print(f"Using first worksheet: {sheet.title}")
-            
-            # Get all values from the spreadsheet
-            all_values = sheet.get_all_values()
-            
-            print(f"Retrieved {len(all_values)} rows from the spreadsheet")
-            print(f"Using columns: {', '.join(URL_COLUMNS)}")
-            
-            # Collect all URLs to check
             urls_to_check = []
-            
-            # Track URLs already processed per cell to handle multiple URLs in a cell
-            processed_cell_urls = {}
-            
-            # Convert column letters to indices
-            column_indices = [column_to_index(col) for col in URL_COLUMNS]
-            
-            # Loop through all rows to collect URLs
-            for row_idx in range(1, len(all_values)):  # Start from index 1 (row 2)
-                row_data = all_values[row_idx]
-                
-                for col_idx in column_indices:
-                    # Make sure the row has enough columns
-                    cell_content = ""
-                    if col_idx < len(row_data):
-                        cell_content = row_data[col_idx]
+            rows_by_target = {}
+            for state in run_context.states:
+                try:
+                    sheet = open_target_worksheet(state)
                     
-                    if cell_content.strip():  # If cell is not empty
-                        # Extract URLs from the cell
-                        try:
-                            # Get the cell identifier for tracking
-                            col_name = index_to_column(col_idx)
-                            cell_id = f"{col_name}{row_idx + 1}"
-                            
-                            # Extract all URLs from the cell
-                            urls = extract_urls_from_text(cell_content)
-                            
-                            # Initialize tracking for this cell if needed
-                            if cell_id not in processed_cell_urls:
-                                processed_cell_urls[cell_id] = []
-                            
-                            if urls:
-                                # Process the URLs in reverse order (IMPORTANT: to prioritize the last URL)
-                                # This helps when multiple URLs are in a cell - we want the most recent/updated one
-                                for url in reversed(urls):
-                                    # Skip if we've already processed this exact URL for this cell
-                                    if url in processed_cell_urls[cell_id]:
-                                        print(f"Skipping duplicate URL {url} in cell {cell_id}")
-                                        continue
-                                        
-                                    # Add to the list of URLs to check
-                                    urls_to_check.append({
-                                        'url': url,
-                                        'row': row_idx + 1,  # +1 because we're 0-indexed but sheets are 1-indexed
-                                        'col': col_name,
-                                        'original_content': cell_content,
-                                        'is_last_url': (url == urls[-1])  # Flag if this is the last URL in the cell
-                                    })
-                                    
-                                    # Track that we've processed this URL for this cell
-                                    processed_cell_urls[cell_id].append(url)
-                            else:
-                                # If no valid URLs found but cell has content, mark it for checking anyway
-                                possible_url = cell_content
-                                if not possible_url.startswith(('http://', 'https://')):
-                                    possible_url = 'http://' + possible_url
-                                
-                                # Skip if we've already processed this exact URL for this cell
-                                if possible_url in processed_cell_urls[cell_id]:
-                                    print(f"Skipping duplicate URL {possible_url} in cell {cell_id}")
-                                    continue
-                                    
-                                urls_to_check.append({
-                                    'url': possible_url,
-                                    'row': row_idx + 1,
-                                    'col': col_name,
-                                    'original_content': cell_content,
-                                    'is_potential_url': True,
-                                    'is_last_url': True  # This is the only URL for this cell
-                                })
-                                
-                                # Track that we've processed this URL for this cell
-                                processed_cell_urls[cell_id].append(possible_url)
-                        except Exception as e:
-                            # If URL extraction fails, still try to check it
-                            print(f"❌ Error extracting URLs from cell {index_to_column(col_idx)}{row_idx+1}: {str(e)}")
-                            try:
-                                # Try to make a checkable URL from the content
-                                possible_url = cell_content
-                                if not possible_url.startswith(('http://', 'https://')):
-                                    possible_url = 'http://' + possible_url
-                                
-                                # Get the cell identifier for tracking
-                                col_name = index_to_column(col_idx)
-                                cell_id = f"{col_name}{row_idx + 1}"
-                                
-                                # Initialize tracking for this cell if needed
-                                if cell_id not in processed_cell_urls:
-                                    processed_cell_urls[cell_id] = []
-                                
-                                # Skip if we've already processed this exact URL for this cell    
-                                if possible_url in processed_cell_urls[cell_id]:
-                                    print(f"Skipping duplicate URL {possible_url} in cell {cell_id}")
-                                    continue
-                                
-                                urls_to_check.append({
-                                    'url': possible_url,
-                                    'row': row_idx + 1,
-                                    'col': col_name,
-                                    'original_content': cell_content,
-                                    'is_potential_url': True,
-                                    'is_last_url': True  # This is the only URL for this cell
-                                })
-                                
-                                # Track that we've processed this URL for this cell
-                                processed_cell_urls[cell_id].append(possible_url)
-                            except Exception as inner_e:
-                                print(f"❌ Could not process cell {index_to_column(col_idx)}{row_idx+1}: {str(inner_e)}")
-                                try:
-                                    # Mark as red by default since we can't process it
-                                    mark_cell_text_red(sheet, row_idx + 1, index_to_column(col_idx))
-                                    print(f"Marked problematic cell {index_to_column(col_idx)}{row_idx+1} as red by default")
-                                except Exception as mark_err:
-                                    print(f"❌ Failed to mark problematic cell: {str(mark_err)}")
-                                    # Add to pending formats with high priority
-                                    pending_formats.append({
-                                        'sheet': sheet,
-                                        'row': row_idx + 1,
-                                        'col': index_to_column(col_idx),
-                                        'type': 'red',
-                                        'format_key': f"{index_to_column(col_idx)}{row_idx+1}:red",
-                                        'retry_count': MAX_PENDING_RETRIES - 3,  # High priority
-                                        'url': cell_content
-                                    })
-            
-            print(f"Found {len(urls_to_check)} URLs to check")
+                    # Get all values from the spreadsheet
+                    all_values = sheets_read(sheet.get_all_values)
+                except Exception as e:
+                    log.error("❌ Error reading target %s: %s", state.target.label, e, exc_info=True)
+                    state.sheet = None  # Look the worksheet up again next time
+                    continue
+                mark_ready()
+                
+                log.info("Retrieved %s rows from %s", len(all_values), state.target.label)
+                log.info("Using columns: %s", ', '.join(state.target.columns))
+                
+                rows_by_target[state.target.label] = len(all_values)
+                urls_to_check.extend(collect_urls_to_check(sheet, all_values, state.target.columns))
+            
+            # In sharded mode, only check the rows of shards this worker holds
+            if shard_leases:
+                # Let workers started at the same time register before the shards are split
+                shard_leases.heartbeat()
+                await asyncio.sleep(SHARD_LEASE_SECONDS / 10)
+                sync_shard_leases(rows_by_target, force=True)
+                # Every collected URL is kept, so shards taken over mid-sweep can still be checked
+                collected_urls = urls_to_check
+                urls_to_check = [url_data for url_data in urls_to_check if owns_row(url_data.sheet, url_data.row)]
+                scheduled_keys = {url_task_key(url_data) for url_data in urls_to_check}
+                owned_shards = set(shard_leases.owned)
+                log.info("Worker %s holds shards %s", shard_leases.worker_id, sorted(shard_leases.owned))
+            
+            log.info("Found %s URLs to check", len(urls_to_check))
             
             # Prevent empty run
             if not urls_to_check:
-                print("⚠️ Warning: No URLs found to check. Please verify spreadsheet content and column selection.")
+                log.warning("⚠️ Warning: No URLs found to check. Please verify spreadsheet content and column selection.")
                 return
+            
+            # Resume a sweep that a restart interrupted, or start a fresh checkpoint
+            checkpoint_file = worker_state_file(SWEEP_CHECKPOINT_FILE)
+            checkpoint = None
+            urls_remaining = list(urls_to_check)
+            if checkpoint_file:
+                try:
+                    checkpoint = SweepCheckpoint.resume(checkpoint_file, SWEEP_RESUME_HOURS * SECONDS_PER_HOUR)
+                except Exception as e:
+                    log.warning("⚠️ Could not load sweep checkpoint from %s: %s", checkpoint_file, e)
+                if checkpoint:
+                    restore_sweep_checkpoint(checkpoint)
+                    urls_remaining = [url_data for url_data in urls_to_check if not checkpoint.is_done(url_task_key(url_data))]
+                    log.info("♻️ Resuming sweep %s: %s of %s URLs already checked, %s formats pending",
+                             checkpoint.run_id, len(urls_to_check) - len(urls_remaining), len(urls_to_check),
+                             len(run_context.pending_formats))
+                else:
+                    checkpoint = SweepCheckpoint(checkpoint_file)
+                    log.info("Starting sweep %s", checkpoint.run_id)
                 
+            # Remembered verdicts and content hashes decide what to check first when the deadline is tight
+            history = CheckScheduler(SchedulePolicy(
+                working_interval_hours=WORKING_RECHECK_HOURS,
+                broken_interval_hours=BROKEN_RECHECK_HOURS,
+                flapping_interval_hours=FLAPPING_RECHECK_HOURS,
+            ))
+            history_file = worker_state_file(SCHEDULER_STATE_FILE)
+            history_cells = {sweep_cell_key(url_data): (url_data.content, url_data)
+                             for url_data in urls_to_check if url_data.is_last_url}
+            try:
+                history.load(history_file, history_cells)
+            except Exception as e:
+                log.warning("⚠️ Could not load cell history from %s: %s", history_file, e)
+                history.sync_cells(history_cells)
+            
+            budget = None
+            if RUN_DEADLINE:
+                budget = RunBudget(next_deadline(RUN_DEADLINE, RUN_DEADLINE_TIMEZONE), check_latency, MAX_SWEEP_CONCURRENCY)
+                # Red cells first, then new and edited ones, so those are never the ones deferred
+                urls_remaining = sorted(urls_remaining, key=lambda url_data: history.priority(sweep_cell_key(url_data)))
+                log.info("⏰ Deadline %s %s: %.0f minutes for %s URLs, up to %s at once", RUN_DEADLINE,
+                         RUN_DEADLINE_TIMEZONE, budget.seconds_left() / 60, len(urls_remaining), MAX_SWEEP_CONCURRENCY)
+            
+            # Cell -> deciding task -> verdict, for the safety check at the end
+            ledger = SweepLedger(urls_to_check)
+            # Verdicts before this sweep and the tier counter at its start, for the Slack digest
+            previous_verdicts = {sweep_cell_key(url_data): history.last_verdict(sweep_cell_key(url_data))
+                                 for url_data in urls_to_check if url_data.is_last_url}
+            digest = RunDigest(metrics.counts('url_checker_checks_total'))
+            
+            run_progress.start_run(len(urls_to_check), len(urls_to_check) - len(urls_remaining),
+                                   checkpoint.run_id if checkpoint else None)
+            run_progress.set_phase(CHECKING)
+            
             # Process URLs in batches
             batch_count = 0
-            start_time = time.time()
             total_cells_processed = 0
+            failed_checks = 0
+            checks_started = len(urls_to_check) - len(urls_remaining)
+            queue = deque(urls_remaining)
+            deferred = []
             
-            for i in range(0, len(urls_to_check), BATCH_SIZE):
+            while queue:
                 batch_count += 1
-                batch = urls_to_check[i:i+BATCH_SIZE]
-                
-                print(f"\n===== Processing Batch {batch_count} ({len(batch)} URLs) =====")
-                
-                # Close previous driver if it exists
-                if driver:
-                    try:
-                        print("Closing previous Selenium browser...")
-                        driver.quit()
-                    except Exception as e:
-                        print(f"Error closing browser: {str(e)}")
+                batch = deque(queue.popleft() for _ in range(min(BATCH_SIZE, len(queue))))
+                batch_size, batch_started = len(batch), time.monotonic()
                 
-                # Initialize a new driver for this batch
-                print("Initializing a new Selenium browser...")
-                driver = setup_selenium()
+                log.info("===== Processing Batch %s (%s URLs) =====", batch_count, len(batch))
                 
-                # Process the batch
-                for idx, url_data in enumerate(batch):
-                    if time.time() - start_time > MAX_BROWSER_LIFETIME * 60:
-                        print(f"Browser lifetime exceeded {MAX_BROWSER_LIFETIME} minutes. Reinitializing...")
-                        try:
-                            driver.quit()
-                        except:
-                            pass
-                        driver = setup_selenium()
-                        start_time = time.time()
-                        
-                    url = url_data['url']
-                    row = url_data['row']
-                    col = url_data['col']
-                    is_last_url = url_data.get('is_last_url', False)  # Get the flag that indicates if this is the last URL in the cell
+                # Checks run as tasks, as many at once as the deadline needs
+                in_flight = set()
+                while batch or in_flight:
+                    concurrency = 1
+                    if budget:
+                        to_defer = budget.checks_to_defer(len(queue) + len(batch))
+                        if to_defer:
+                            # The lowest-priority URLs are at the end of the queue, then of the batch
+                            for _ in range(to_defer):
+                                deferred.append(queue.pop() if queue else batch.pop())
+                                ledger.discard(deferred[-1])  # The cell keeps its color until it is checked
+                            log.info("⏰ Deferring %s lowest-priority URLs to meet the %s deadline",
+                                     to_defer, RUN_DEADLINE)
+                            run_progress.drop(to_defer)
+                        concurrency = budget.concurrency_for(len(queue) + len(batch) + len(in_flight))
                     
-                    overall_index = i + idx + 1
-                    print(f"Checking URL {overall_index}/{len(urls_to_check)} [{total_cells_processed + 1}]: {url} in cell {col}{row}")
+                    while batch and len(in_flight) < concurrency:
+                        checks_started += 1
+                        url_data = batch.popleft()
+                        in_flight.add(asyncio.create_task(
+                            check_sweep_url(url_data, checks_started, len(urls_to_check),
+                                            rows_by_target, checkpoint, history, ledger), name=url_data.url))
+                    if in_flight:
+                        done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            # One failed check must not abort the sweep; its cell has no verdict and is
+                            # settled by the safety check at the end
+                            if task.exception() is not None:
+                                failed_checks += 1
+                                log.error("❌ Check of %s failed: %s", task.get_name(), task.exception(),
+                                          exc_info=task.exception())
+                            elif task.result():
+                                total_cells_processed += 1
+                        run_progress.advance(len(done))
                     
-                    try:
-                        # Pass is_last_url parameter to check_url
-                        await check_url(driver, url, sheet, row, col, is_last_url=is_last_url)
-                        total_cells_processed += 1
-                        
-                        # Add a small pause between individual URL checks to reduce system strain
-                        if INTER_URL_PAUSE > 0:
-                            await asyncio.sleep(INTER_URL_PAUSE)
-                            
-                    except Exception as e:
-                        print(f"❌ Error checking URL {url}: {str(e)}")
-                        traceback.print_exc()
-                        try:
-                            # Only mark cell red if this is the last URL in the cell
-                            if is_last_url:
-                                mark_cell_text_red(sheet, row, col)
-                            else:
-                                print(f"Not marking cell red yet since this is not the last URL in cell {col}{row}")
-                        except Exception as mark_err:
-                            print(f"Error marking cell: {str(mark_err)}")
-                            # Add to pending formats with high priority but only if this is the last URL
-                            if is_last_url:
-                                pending_formats.append({
-                                    'sheet': sheet,
-                                    'row': row,
-                                    'col': col,
-                                    'type': 'red',
-                                    'format_key': f"{col}{row}:red",
-                                    'retry_count': MAX_PENDING_RETRIES - 3,  # High priority
-                                    'url': url
-                                })
-                        total_cells_processed += 1
-                        
-                        # Add a small pause after errors to let the system recover
-                        await asyncio.sleep(INTER_URL_PAUSE * 2)
+                    # The heartbeats in check_sweep_url may have handed us a dead worker's shards
+                    if shard_leases and set(shard_leases.owned) != owned_shards:
+                        owned_shards = set(shard_leases.owned)
+                        taken_over = take_over_shard_tasks(collected_urls, scheduled_keys)
+                        if taken_over:
+                            log.info("🔀 Adding %s URLs from shards taken over mid-sweep", len(taken_over))
+                            queue.extend(taken_over)
+                            urls_to_check.extend(taken_over)
+                            urls_remaining.extend(taken_over)
+                            for url_data in taken_over:
+                                ledger.add(url_data)
+                                if url_data.is_last_url:
+                                    history_cells[sweep_cell_key(url_data)] = (url_data.content, url_data)
+                            history.sync_cells(history_cells)
+                            run_progress.add(len(taken_over))
+                
+                batch_seconds = time.monotonic() - batch_started
+                log.info("Batch %s done: %s URLs in %.0fs (%.1f URLs/min), %s/%s checked, %s batches left",
+                         batch_count, batch_size, batch_seconds, batch_size * 60 / max(batch_seconds, 1e-3),
+                         checks_started, len(urls_to_check), -(-len(queue) // BATCH_SIZE),
+                         extra={'batch': batch_count, 'batch_urls': batch_size, 'checked': checks_started,
+                                'total': len(urls_to_check), 'deferred': len(deferred)})
+                
+                # Fresh browsers for every batch
+                await asyncio.to_thread(run_context.browser_pool.close)
                 
                 # Process any pending cell formats between batches
-                if pending_formats:
-                    print(f"Processing {len(pending_formats)} pending cell formats between batches...")
+                if run_context.pending_formats:
+                    log.info("Processing %s pending cell formats between batches...", len(run_context.pending_formats))
+                    run_progress.set_phase(WRITING)
                     await process_pending_formats()
+                    run_progress.set_phase(CHECKING)
+                await flush_reasons()
+                if checkpoint:
+                    save_sweep_checkpoint(checkpoint)
+                save_cell_history(history, history_file)
+                await save_result_history()
+                profiling.snapshot(f"batch{batch_count}")
                 
+                if not queue:
+                    break
+                if budget and budget.concurrency_for(len(queue)) >= MAX_SWEEP_CONCURRENCY:
+                    log.info("Completed batch %s. Behind the deadline, continuing without a pause...", batch_count)
+                    continue
                 # Give Google's API a break between batches - use the new BATCH_COMPLETION_PAUSE constant
-                print(f"Completed batch {batch_count}. Pausing for {BATCH_COMPLETION_PAUSE} seconds before next batch...")
+                log.info("Completed batch %s. Pausing for %s seconds before next batch...",
+                         batch_count, BATCH_COMPLETION_PAUSE)
                 await asyncio.sleep(BATCH_COMPLETION_PAUSE)
             
             # Final summary
-            print(f"\n===== URL CHECKING SUMMARY =====")
-            print(f"Total cells processed: {total_cells_processed}")
-            print(f"Total URLs checked: {len(urls_to_check)}")
-            print(f"URLs per batch: {BATCH_SIZE}")
-            print(f"Total batches: {batch_count}")
-            print("=================================")
-            
-            # Final processing of any remaining pending formats
-            if pending_formats:
-                print(f"Final processing of {len(pending_formats)} pending cell formats...")
-                await process_pending_formats()
-                
-                # If we still have pending formats, try multiple times with long pauses between attempts
-                retry_attempts = 3
-                for attempt in range(retry_attempts):
-                    if not pending_formats:
-                        break
-                        
-                    pause_time = 240 + (attempt * 120)  # 4 minutes, 6 minutes, 8 minutes
-                    print(f"Taking a long pause ({pause_time} seconds) before attempt {attempt+1}/{retry_attempts} to process {len(pending_formats)} remaining pending formats...")
-                    await asyncio.sleep(pause_time)
-                    print(f"Attempt {attempt+1}/{retry_attempts} to process {len(pending_formats)} stubborn pending formats...")
-                    await process_pending_formats(final_attempt=(attempt == retry_attempts-1))
-                    
-                # After all retries, try one final desperate attempt for any remaining cells
-                if pending_formats:
-                    print(f"⚠️ Still have {len(pending_formats)} pending formats after all retries")
-                    print("Making one final ultra-conservative attempt with maximum pauses")
-                    
-                    # Make a copy and clear the pending formats
-                    final_formats = pending_formats.copy()
-                    pending_formats = []
-                    
-                    # Try each one individually with very long pauses
-                    for idx, format_data in enumerate(final_formats):
-                        sheet = format_data['sheet']
-                        row = format_data['row']
-                        col = format_data['col']
-                        format_type = format_data['type']
-                        
-                        print(f"Final attempt {idx+1}/{len(final_formats)} for cell {col}{row}")
-                        try:
-                            if format_type == 'red':
-                                mark_cell_text_red(sheet, row, col)
-                            else:
-                                reset_cell_formatting(sheet, row, col)
-                            
-                            # Ultra-long pause between each cell
-                            await asyncio.sleep(120)
-                        except Exception as e:
-                            print(f"❌ Final attempt failed for cell {col}{row}: {str(e)}")
-                            # At this point, we've tried everything, so just move on
+            log.info("===== URL CHECKING SUMMARY =====")
+            log.info("Total cells processed: %s", total_cells_processed)
+            if failed_checks:
+                log.info("Checks that failed with an error: %s", failed_checks)
+            log.info("Total URLs checked: %s", len(urls_remaining) - len(deferred))
+            if len(urls_remaining) < len(urls_to_check):
+                log.info("URLs checked before the restart: %s", len(urls_to_check) - len(urls_remaining))
+            log.info("URLs per batch: %s", BATCH_SIZE)
+            log.info("Total batches: %s", batch_count)
+            log.info("=================================")
+            
+            # Report what the deadline pushed to the next sweep
+            deferred_cells = {cell_key(url_data) for url_data in deferred}
+            if deferred:
+                log.info("⏰ Deferred %s URLs in %s cells to meet the %s deadline:",
+                         len(deferred), len(deferred_cells), RUN_DEADLINE)
+                for url_data in deferred[:20]:
+                    log.info("- %s%s (URL: %s)", url_data.col, url_data.row, url_data.url)
+                if len(deferred) > 20:
+                    log.info("- ... and %s more", len(deferred) - 20)
+                send_slack_message(f"URL checker sweep deferred {len(deferred)} URLs in {len(deferred_cells)} cells "
+                                   f"to finish by {RUN_DEADLINE} {RUN_DEADLINE_TIMEZONE}. They are checked first next time.")
+            
+            # Final processing of any remaining pending formats: the latest format of each cell, in bulk
+            # with the failure reasons still queued
+            reasons = take_pending_reasons()
+            if run_context.pending_formats or reasons:
+                log.info("Final processing of %s pending cell formats and %s failure reasons in bulk...",
+                         len(run_context.pending_formats), len(reasons))
+                run_progress.set_phase(WRITING)
+                final_formats = {}
+                for format_data in run_context.pending_formats:
+                    final_formats[(id(format_data['sheet']), format_data['row'], format_data['col'])] = format_data
+                run_context.pending_formats = []
+                written = await flush_formats([(format_data['sheet'], format_data['row'], format_data['col'],
+                                                format_data['type']) for format_data in final_formats.values()], reasons)
+                log.info("Wrote %s of %s pending cell formats", written, len(final_formats))
             
             # Print final formatting statistics
-            print("\n===== FINAL FORMATTING STATISTICS =====")
-            print(f"Successfully formatted cells: {len(successfully_formatted_cells)}")
-            print(f"Failed to format cells: {len(failed_formatted_cells)}")
-            print(f"Cells still pending formatting: {len(pending_formats)}")
-            
-            if failed_formatted_cells:
-                print("\nThe following cells could not be formatted after all retries:")
-                for cell_id in sorted(list(failed_formatted_cells)):
-                    print(f"- {cell_id}")
+            formatted_total, failed_total = run_context.formatting_totals()
+            log.info("===== FINAL FORMATTING STATISTICS =====")
+            log.info("Successfully formatted cells: %s", formatted_total)
+            log.info("Failed to format cells: %s", failed_total)
+            log.info("Cells still pending formatting: %s", len(run_context.pending_formats))
+            
+            if failed_total:
+                log.warning("The following cells could not be formatted after all retries:")
+                for state in run_context.states:
+                    for cell_id in sorted(list(state.failed_formatted_cells)):
+                        log.warning("- %s", cell_id if len(run_context.states) == 1 else f"{state.target.label} {cell_id}")
                     
-            if pending_formats:
-                print("\nThe following cells are still pending formatting:")
-                for format_data in pending_formats:
+            if run_context.pending_formats:
+                log.warning("The following cells are still pending formatting:")
+                for format_data in run_context.pending_formats:
                     col = format_data['col']
                     row = format_data['row']
                     url = format_data.get('url', 'unknown')
-                    print(f"- {col}{row} (URL: {url})")
+                    log.warning("- %s%s (URL: %s)", col, row, url)
                     
-            # SAFETY CHECK: Verify all URLs were processed and colored
-            # This adds one final verification to make sure nothing was missed
-            print("\n===== FINAL SAFETY CHECK =====")
-            all_checked_cells = {f"{url_data['col']}{url_data['row']}" for url_data in urls_to_check}
-            all_formatted_cells = successfully_formatted_cells.union(failed_formatted_cells)
-            all_pending_cells = {f"{fmt['col']}{fmt['row']}" for fmt in pending_formats}
-            
-            missed_cells = all_checked_cells - all_formatted_cells - all_pending_cells
+            # SAFETY CHECK: every checked cell is formatted or queued; the rest are written in one bulk flush
+            log.info("===== FINAL SAFETY CHECK =====")
+            accounted = {(id(state.sheet), cell_id) for state in run_context.states
+                         for cell_id in state.successfully_formatted_cells.union(state.failed_formatted_cells)}
+            accounted.update((id(fmt['sheet']), f"{fmt['col']}{fmt['row']}") for fmt in run_context.pending_formats)
+            missed_cells = ledger.unaccounted(accounted)
             
             if missed_cells:
-                print(f"⚠️ WARNING: Found {len(missed_cells)} cells that were checked but not formatted!")
-                print("Attempting emergency formatting for these cells:")
-                
-                for cell_id in missed_cells:
-                    # Extract column and row from cell_id
-                    col = ''.join(c for c in cell_id if c.isalpha())
-                    row = int(''.join(c for c in cell_id if c.isdigit()))
-                    
-                    # Find original URL for this cell
-                    original_url = "unknown"
-                    for url_data in urls_to_check:
-                        if url_data['col'] == col and url_data['row'] == row:
-                            original_url = url_data['url']
-                            break
-                    
-                    print(f"Emergency formatting for missed cell {cell_id} (URL: {original_url})")
-                    
-                    # Default to marking as red since we don't know the status
-                    try:
-                        print(f"Applying emergency red formatting to cell {cell_id}")
-                        mark_cell_text_red(sheet, row, col)
-                    except Exception as e:
-                        print(f"❌ Emergency formatting failed for cell {cell_id}: {str(e)}")
-                
-                print(f"Emergency formatting attempted for {len(missed_cells)} missed cells")
+                log.warning("⚠️ WARNING: Found %s cells that were checked but not formatted!", len(missed_cells))
+                for url_data, color in missed_cells[:20]:
+                    log.warning("- %s -> %s (URL: %s)", url_data.cell_id, color, url_data.url)
+                run_progress.set_phase(WRITING)
+                written = await flush_formats([(url_data.sheet, url_data.row, url_data.col, color)
+                                               for url_data, color in missed_cells])
+                log.info("Emergency formatting wrote %s of %s missed cells in bulk", written, len(missed_cells))
             else:
-                print("✅ All checked URLs were either successfully formatted or are in the pending queue")
-                print(f"Total cells checked: {len(all_checked_cells)}")
-                print(f"Total cells formatted: {len(all_formatted_cells)}")
-                print(f"Total cells pending: {len(all_pending_cells)}")
+                log.info("✅ All checked URLs were either successfully formatted or are in the pending queue")
+                log.info("Total cells checked: %s", len(ledger))
+                log.info("Total cells formatted or pending: %s", len(accounted))
                 
             # End safety check
             
-            # Report end time and overall success ratio
-            success_rate = (len(successfully_formatted_cells) / (len(successfully_formatted_cells) + len(failed_formatted_cells) + len(pending_formats))) * 100 if (len(successfully_formatted_cells) + len(failed_formatted_cells) + len(pending_formats)) > 0 else 0
-            print(f"\nSuccess rate: {success_rate:.2f}%")
-            print("====================================")
-            
-            # Close the last driver
-            if driver:
-                try:
-                    print("Closing Selenium browser...")
-                    driver.quit()
-                except Exception as e:
-                    print(f"Error closing browser: {str(e)}")
+            # VERIFICATION: read back what the sheet shows and rewrite only the cells that differ
+            written_colors = {}
+            for state in run_context.states:
+                written_colors.update(((id(state.sheet), cell_id), 'red') for cell_id in state.failed_formatted_cells)
+                written_colors.update(((id(state.sheet), cell_id), 'blue') for cell_id in state.successfully_formatted_cells)
+            expected = [(url_data.sheet, url_data.row, url_data.col, color)
+                        for url_data, color in ledger.expected_colors(written_colors)]
+            run_progress.set_phase(WRITING)
+            mismatched = await verify_formats(expected)
+            if mismatched is None:
+                log.warning("⚠️ Formats were not verified this run")
+            elif mismatched:
+                log.warning("⚠️ %s of %s cells did not show their verdict's color and were rewritten in bulk:",
+                            len(mismatched), len(expected))
+                for sheet, row, col, color in mismatched[:20]:
+                    log.warning("- %s%s -> %s", col, row, color)
+            else:
+                log.info("✅ Read back %s cells, all show their verdict's color", len(expected))
             
-            print("\nFinished checking all URLs!")
+            # Report end time and overall success ratio
+            formatted_total, failed_total = run_context.formatting_totals()
+            success_rate = (formatted_total / (formatted_total + failed_total + len(run_context.pending_formats))) * 100 if (formatted_total + failed_total + len(run_context.pending_formats)) > 0 else 0
+            log.info("Success rate: %.2f%%", success_rate)
+            log.info("====================================")
+            
+            # One Slack digest: what broke or recovered since the last sweep, failing domains and run stats
+            for url_data, is_working in ledger.results():
+                key = sweep_cell_key(url_data)
+                digest.add_result(key, url_data.url, is_working, previous_verdicts.get(key))
+            title = f"URL checker sweep {checkpoint.run_id} finished" if checkpoint else "URL checker sweep finished"
+            await save_result_history(compact=True)
+            send_slack_message(digest.render(title, len(urls_remaining) - len(deferred),
+                                             metrics.counts('url_checker_checks_total'), flapping=await flapping_urls()))
+            
+            # Close the browsers
+            log.info("Closing Selenium browsers...")
+            await asyncio.to_thread(run_context.browser_pool.close)
+            
+            # The sweep is complete, so the next one starts from the top
+            if checkpoint:
+                checkpoint.clear()
+            
+            log.info("Finished checking all URLs!")
             
         except Exception as e:
-            print(f"❌ Critical error processing spreadsheet: {str(e)}")
-            traceback.print_exc()
+            log.error("❌ Critical error processing spreadsheet: %s", e, exc_info=True)
+    except Exception as e:
+        log.error("⚠️ Critical error: %s", e, exc_info=True)
+    finally:
+        # Ensure the browsers are closed
+        await asyncio.to_thread(run_context.browser_pool.close)
+        await save_result_history()
+        run_progress.set_phase(IDLE)
+
+def worker_state_file(path):
+    """Each sharded worker checks different rows, so each keeps its own state files"""
+    if not shard_leases or not path:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{shard_leases.worker_id}{ext}"
+
+def save_sweep_checkpoint(checkpoint):
+    """Write sweep progress, with worksheets replaced by their target labels"""
+    try:
+        pending = [{**{key: value for key, value in fmt.items() if key != 'sheet'},
+                    'target': target_label(fmt['sheet'])}
+                   for fmt in run_context.pending_formats if run_context.state_for(fmt['sheet']) is not None]
+        formatted = {state.target.label: {'ok': sorted(state.successfully_formatted_cells),
+                                          'failed': sorted(state.failed_formatted_cells)}
+                     for state in run_context.states}
+        checkpoint.save(pending, formatted, run_context.verdict_cache.export())
+    except Exception as e:
+        log.warning("⚠️ Could not save sweep checkpoint: %s", e)
+
+def restore_sweep_checkpoint(checkpoint):
+    """Put a resumed sweep's formatting state, unwritten formats and verdicts back in place"""
+    for label, cells in checkpoint.formatted_cells.items():
+        state = run_context.state_by_label(label)
+        if state:
+            state.successfully_formatted_cells.update(cells.get('ok', []))
+            state.failed_formatted_cells.update(cells.get('failed', []))
+    for fmt in checkpoint.pending_formats:
+        state = run_context.state_by_label(fmt.pop('target', None))
+        if state and state.sheet is not None:
+            run_context.pending_formats.append({**fmt, 'sheet': state.sheet})
+    run_context.verdict_cache.load(checkpoint.verdict_cache)
+
+def sweep_cell_key(url_data):
+    """Cell key in the scheduler state, prefixed with the target label when several targets are checked"""
+    prefix = f"{target_label(url_data.sheet)}!" if len(run_context.states) > 1 else ''
+    return f"{prefix}{url_data.col}{url_data.row}"
+
+async def save_result_history(compact=False):
+    """Write the buffered checks to HISTORY_DB and, with compact, roll up and expire old ones, in a worker thread"""
+    if result_history is None:
+        return
+    try:
+        await asyncio.to_thread(result_history.flush)
+        if compact:
+            compacted, dropped = await asyncio.to_thread(result_history.compact)
+            if compacted or dropped:
+                log.info("🗄️ Result history: compacted %s checks, dropped %s expired days", compacted, dropped)
+    except sqlite3.Error as e:
+        log.warning("⚠️ Could not write the result history to %s: %s", HISTORY_DB, e)
+
+async def flapping_urls():
+    """(url, verdict changes) of the URLs whose verdict keeps changing, from the result history"""
+    if result_history is None:
+        return []
+    try:
+        return await asyncio.to_thread(result_history.flapping, time.time() - FLAP_DAYS * SECONDS_PER_DAY, FLAP_CHANGES)
+    except sqlite3.Error as e:
+        log.warning("⚠️ Could not read the result history from %s: %s", HISTORY_DB, e)
+        return []
+
+def save_cell_history(history, path):
+    try:
+        history.save(path)
+    except Exception as e:
+        log.warning("⚠️ Could not save cell history to %s: %s", path, e)
+
+async def check_sweep_url(url_data, index, total, rows_by_target, checkpoint, history, ledger):
+    """Check one URL of a sweep with a browser from the pool; False when its row's shard lease was lost"""
+    url = url_data.url
+    sheet = url_data.sheet
+    row = url_data.row
+    col = url_data.col
+    is_last_url = url_data.is_last_url  # Get the flag that indicates if this is the last URL in the cell
+    
+    # Keep our leases alive, and leave rows to whoever took over a lost shard
+    sync_shard_leases(rows_by_target)
+    if not owns_row(sheet, row):
+        log.debug("Skipping %s in cell %s%s - shard lease lost", url, col, row)
+        return False
+    
+    log.debug("Checking URL %s/%s: %s in cell %s%s", index, total, url, col, row)
+    
+    # The pool swaps browsers once they outlive MAX_BROWSER_LIFETIME
+    driver = await asyncio.to_thread(run_context.browser_pool.acquire)
+    try:
+        # Pass is_last_url parameter to check_url
+        is_working, reason = await check_url(driver, url, sheet, row, col, is_last_url=is_last_url)
+        record_first_check()
+        if is_working is None:
+            # Host's breaker is open - the cell keeps its color until the next sweep checks it
+            ledger.discard(url_data)
+            return True
+        ledger.record(url_data, is_working)
+        if is_last_url:
+            queue_cell_reason(sheet, row, col, is_working, reason, history.last_verdict(sweep_cell_key(url_data)))
+            history.record_result(sweep_cell_key(url_data), is_working)
+        
+        # Add a small pause between individual URL checks to reduce system strain
+        if INTER_URL_PAUSE > 0:
+            await asyncio.sleep(INTER_URL_PAUSE)
+            
     except Exception as e:
-        print(f"⚠️ Critical error: {str(e)}")
-        traceback.print_exc()
+        log.error("❌ Error checking URL %s: %s", url, e, exc_info=True)
+        ledger.record(url_data, False)
+        if is_last_url:
+            queue_cell_reason(sheet, row, col, False, f"Error checking URL: {e}")
+        try:
+            # Only mark cell red if this is the last URL in the cell
+            if is_last_url:
+                await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
+            else:
+                log.debug("Not marking cell red yet since this is not the last URL in cell %s%s", col, row)
+        except Exception as mark_err:
+            log.warning("Error marking cell: %s", mark_err)
+            # Add to pending formats with high priority but only if this is the last URL
+            if is_last_url:
+                run_context.pending_formats.append({
+                    'sheet': sheet,
+                    'row': row,
+                    'col': col,
+                    'type': 'red',
+                    'format_key': f"{col}{row}:red",
+                    'retry_count': MAX_PENDING_RETRIES - 3,  # High priority
+                    'url': url
+                })
+        
+        # Add a small pause after errors to let the system recover
+        await asyncio.sleep(INTER_URL_PAUSE * 2)
     finally:
-        # Ensure the driver is closed
+        await asyncio.to_thread(run_context.browser_pool.release, driver)
+    
+    if checkpoint:
+        checkpoint.mark_done(url_task_key(url_data))
+        if checkpoint.save_due(CHECKPOINT_EVERY_URLS, CHECKPOINT_EVERY_SECONDS):
+            save_sweep_checkpoint(checkpoint)
+    return True
+
+def url_task_key(url_data):
+    return task_key(target_label(url_data.sheet), url_data.col, url_data.row, url_data.url)
+
+def build_schedule_cells(urls_to_check, prefix=''):
+    """Group collected URLs by cell: prefix + cell id -> (cell content, the URL entry that decides the cell's color)"""
+    cells = {}
+    for url_data in urls_to_check:
+        # Earlier URLs in a cell never change its color, so only the last one is scheduled
+        if url_data.is_last_url:
+            cells[f"{prefix}{url_data.col}{url_data.row}"] = (url_data.content, url_data)
+    return cells
+
+async def run_continuous_scheduler():
+    """Check cells as they come due instead of sweeping the whole sheet once a day"""
+
+    scheduler = CheckScheduler(SchedulePolicy(
+        working_interval_hours=WORKING_RECHECK_HOURS,
+        broken_interval_hours=BROKEN_RECHECK_HOURS,
+        flapping_interval_hours=FLAPPING_RECHECK_HOURS,
+        checks_per_hour=SCHEDULER_CHECKS_PER_HOUR,
+    ))
+    driver = None
+    state_loaded = False
+    last_refresh = 0
+    last_save = time.time()
+    checked_since_refresh = broken_since_refresh = 0
+    digest = RunDigest(metrics.counts('url_checker_checks_total'))
+    refresh_seconds = SCHEDULER_REFRESH_MINUTES * SECONDS_PER_MINUTE
+    rows_by_target = {}
+    cells_by_target = {}  # Last successfully read cells of each target
+    multi_target = len(run_context.states) > 1
+    state_file = worker_state_file(SCHEDULER_STATE_FILE)
+    run_id = uuid.uuid4().hex[:12]  # One id for the scheduler's lifetime; progress restarts at every refresh
+    profiled_checks = 0
+
+    try:
+        while True:
+            # A requested profile covers the next PROFILE_WINDOW_CHECKS checks or PROFILE_WINDOW_SECONDS
+            if profiling.start('scheduler'):
+                profiled_checks = 0
+                log.info("🔬 Profiling the next %s checks (at most %ss)", PROFILE_WINDOW_CHECKS, PROFILE_WINDOW_SECONDS)
+            elif profiling.active_seconds is not None and (profiled_checks >= PROFILE_WINDOW_CHECKS or
+                                                           profiling.active_seconds >= PROFILE_WINDOW_SECONDS):
+                profiling.stop()
+            
+            # Re-read the sheets periodically so new and edited cells get scheduled
+            if time.time() - last_refresh >= refresh_seconds:
+                profiling.snapshot('refresh')
+                run_progress.set_phase(COLLECTING)
+                if checked_since_refresh:
+                    log.info("📅 %s checks since the last refresh, %s broken", checked_since_refresh, broken_since_refresh)
+                    # Continuous mode has no run end, so a digest goes out when a refresh window changed a cell
+                    await save_result_history(compact=True)
+                    if digest.changed:
+                        send_slack_message(digest.render("URL checker: changes since the last refresh",
+                                                         checked_since_refresh, metrics.counts('url_checker_checks_total'),
+                                                         flapping=await flapping_urls()))
+                    digest = RunDigest(metrics.counts('url_checker_checks_total'))
+                    checked_since_refresh = broken_since_refresh = 0
+                for state in run_context.states:
+                    label = state.target.label
+                    try:
+                        sheet = open_target_worksheet(state)
+                        all_values = sheets_read(sheet.get_all_values)
+                    except Exception as e:
+                        # Keep the target's previous cells scheduled rather than dropping their history
+                        log.error("❌ Error refreshing %s: %s", label, e, exc_info=True)
+                        state.sheet = None  # Look the worksheet up again next time
+                        continue
+                    mark_ready()
+                    rows_by_target[label] = len(all_values)
+                    # Cell ids are only unique within a worksheet, so qualify them when there are several targets
+                    cells_by_target[label] = build_schedule_cells(
+                        collect_urls_to_check(sheet, all_values, state.target.columns),
+                        f"{label}!" if multi_target else '')
+                
+                try:
+                    cells = {}
+                    for target_cells in cells_by_target.values():
+                        cells.update(target_cells)
+                    if shard_leases:
+                        sync_shard_leases(rows_by_target, force=True)
+                        cells = {key: cell for key, cell in cells.items()
+                                 if owns_row(cell[1].sheet, cell[1].row)}
+
+                    if not state_loaded:
+                        try:
+                            restored = scheduler.load(state_file, cells)
+                        except Exception as e:
+                            log.warning("⚠️ Could not load scheduler state from %s: %s", state_file, e)
+                            restored = 0
+                            scheduler.sync_cells(cells)
+                        state_loaded = True
+                        log.info("📅 Scheduling %s cells (%s restored from saved state)", len(scheduler), restored)
+                    else:
+                        added, edited, removed = scheduler.sync_cells(cells)
+                        log.info("📅 Sheet refreshed: %s cells, %s new, %s edited, %s removed",
+                                 len(scheduler), added, edited, removed)
+                    log.info("Budget: %.0f checks/hour, %s cells due now",
+                             scheduler.checks_per_hour(), scheduler.overdue_count())
+                    run_progress.start_run(scheduler.overdue_count(), run_id=run_id)
+                except Exception as e:
+                    log.error("❌ Error scheduling cells: %s", e, exc_info=True)
+                last_refresh = time.time()
+
+                if run_context.pending_formats:
+                    log.info("Processing %s pending cell formats...", len(run_context.pending_formats))
+                    run_progress.set_phase(WRITING)
+                    await process_pending_formats()
+                await flush_reasons()
+
+            # Renew leases; when shards move between workers, re-read the sheet to pick up our new rows
+            if sync_shard_leases(rows_by_target):
+                last_refresh = 0
+                continue
+
+            cell, wait_seconds = scheduler.next_check()
+            if cell is None:
+                # Nothing due yet - write the queued failure reasons, and release the browser during long idle periods
+                await flush_reasons()
+                if driver and wait_seconds > 5 * SECONDS_PER_MINUTE:
+                    await asyncio.to_thread(run_context.browser_pool.release, driver)
+                    await asyncio.to_thread(run_context.browser_pool.close)
+                    driver = None
+                run_progress.set_phase(IDLE)
+                until_refresh = last_refresh + refresh_seconds - time.time()
+                if shard_leases:
+                    until_refresh = min(until_refresh, SHARD_LEASE_SECONDS / 3)
+                await asyncio.sleep(max(0.1, min(wait_seconds, until_refresh)))
+                continue
+
+            # The pool swaps the browser once it outlives MAX_BROWSER_LIFETIME
+            driver = await asyncio.to_thread(run_context.browser_pool.refresh, driver)
+
+            url_data = cell.payload
+            url, sheet, row, col = url_data.url, url_data.sheet, url_data.row, url_data.col
+            if not owns_row(sheet, row):
+                # Lease lost since the last refresh - the next refresh drops or reclaims the cell
+                scheduler.defer(cell.key, refresh_seconds)
+                continue
+            log.debug("Checking %s in cell %s", url, cell.key)
+            run_progress.set_phase(CHECKING)
+            try:
+                is_working, reason = await check_url(driver, url, sheet, row, col, is_last_url=True)
+                record_first_check()
+                if is_working is None:
+                    # Host's breaker is open - keep the cell's color and check it after the cooldown
+                    scheduler.defer(cell.key, BREAKER_COOLDOWN_SECONDS)
+                    continue
+            except Exception as e:
+                log.error("❌ Error checking URL %s: %s", url, e, exc_info=True)
+                is_working, reason = False, f"Error checking URL: {e}"
+                try:
+                    await asyncio.to_thread(mark_cell_text_red, sheet, row, col)
+                except Exception as mark_err:
+                    log.warning("Error marking cell: %s", mark_err)
+                    run_context.pending_formats.append({
+                        'sheet': sheet,
+                        'row': row,
+                        'col': col,
+                        'type': 'red',
+                        'format_key': f"{col}{row}:red",
+                        'retry_count': MAX_PENDING_RETRIES - 3,  # High priority
+                        'url': url
+                    })
+
+            digest.add_result(cell.key, url, is_working, scheduler.last_verdict(cell.key))
+            queue_cell_reason(sheet, row, col, is_working, reason, scheduler.last_verdict(cell.key))
+            if len(run_context.pending_reasons) >= FORMAT_FLUSH_CHUNK:
+                await flush_reasons()
+            next_due = scheduler.record_result(cell.key, is_working)
+            run_progress.advance()
+            checked_since_refresh += 1
+            broken_since_refresh += not is_working
+            profiled_checks += 1
+            if next_due:
+                log.debug("Next check of %s: %s", cell.key, datetime.fromtimestamp(next_due).strftime('%Y-%m-%d %H:%M'))
+
+            if time.time() - last_save > SECONDS_PER_MINUTE:
+                try:
+                    scheduler.save(state_file)
+                except Exception as e:
+                    log.warning("⚠️ Could not save scheduler state: %s", e)
+                last_save = time.time()
+    finally:
+        profiling.stop()
         if driver:
+            await asyncio.to_thread(run_context.browser_pool.discard, driver)
+        await asyncio.to_thread(run_context.browser_pool.close)
+        try:
+            await flush_reasons()
+        except Exception as e:
+            log.warning("⚠️ Could not write failure reasons: %s", e)
+        if state_loaded:
             try:
-                driver.quit()
-            except:
-                pass
+                scheduler.save(state_file)
+            except Exception as e:
+                log.warning("⚠️ Could not save scheduler state: %s", e)
+        await save_result_history()
+        if shard_leases:
+            try:
+                shard_leases.release_all()
+            except Exception as e:
+                log.warning("⚠️ Could not release shard leases: %s", e)
 
 async def wait_until_next_interval(interval_seconds):
     """Wait until the next scheduled check time"""
-    print(f"\nWaiting {interval_seconds} seconds until next check...")
+    log.info("Waiting %s seconds until next check...", interval_seconds)
     await asyncio.sleep(interval_seconds)
 
 async def wait_for_next_run(hours=24):
@@ -1705,91 +2519,162 @@ async def wait_for_next_run(hours=24):
     now = datetime.now()
     next_run = now + timedelta(hours=hours)
     
-    print(f"\nCurrent time: {now.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Next run scheduled for: {next_run.strftime('%Y-%m-%d %H:%M:%S')} (in {hours} hours)")
-    print(f"Waiting {wait_seconds} seconds...")
+    log.info("Current time: %s", now.strftime('%Y-%m-%d %H:%M:%S'))
+    log.info("Next run scheduled for: %s (in %s hours)", next_run.strftime('%Y-%m-%d %H:%M:%S'), hours)
+    log.info("Waiting %s seconds...", wait_seconds)
     
     await asyncio.sleep(wait_seconds)
 
 # Define a simple HTTP server for Render.com health checks
 class HealthCheckHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
+        if self.path == '/metrics':
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith('/debug/') and DEBUG_ENDPOINTS:
+            status, body = self.handle_debug(self.path)
+            self.send_response(status)
+            self.send_header('Content-type', 'text/plain')
+            self.end_headers()
+            self.wfile.write(body.encode('utf-8'))
+            return
+        if self.path == '/status':
+            body = json.dumps(run_progress.status(len(run_context.pending_formats))).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == '/ready':
+            # Readiness: 503 until the client is authorized and a worksheet has been read,
+            # and again once the run stops making progress so the platform restarts the worker
+            stalled = run_progress.stalled(STALL_MINUTES * SECONDS_PER_MINUTE)
+            if not bot_ready.is_set():
+                status, body = 503, b'starting'
+            elif stalled:
+                status, body = 503, f"stalled: {stalled}".encode('utf-8')
+            else:
+                status, body = 200, b'ready'
+        else:
+            # Liveness: the process is up
+            status, body = 200, b'URL Checker Bot is running'
+        self.send_response(status)
         self.send_header('Content-type', 'text/html')
         self.end_headers()
-        self.wfile.write(b'URL Checker Bot is running')
+        self.wfile.write(body)
+    
+    def handle_debug(self, path):
+        """Profiling controls - only served with DEBUG_ENDPOINTS=true"""
+        if path == '/debug/profile':
+            profiling.arm()
+            if continuous_mode():
+                return 202, (f"The next {PROFILE_WINDOW_CHECKS} scheduler checks (at most {PROFILE_WINDOW_SECONDS}s) "
+                             f"will be CPU-profiled into {PROFILE_DIR}\n")
+            return 202, f"The next check_links run will be CPU-profiled into {PROFILE_DIR}\n"
+        if path == '/debug/tracemalloc':
+            profiling.start_memory_tracing()
+            snapshot_path = profiling.snapshot('on-demand')
+            return 200, f"Memory tracing on, snapshots at batch boundaries. Snapshot: {snapshot_path}\n"
+        if path == '/debug/tasks':
+            _, text = profiling.dump_stacks()
+            return 200, text
+        return 404, "Unknown debug endpoint: /debug/profile, /debug/tracemalloc or /debug/tasks\n"
     
     def log_message(self, format, *args):
         # Silence the default logging to keep our console clean
         return
 
+def continuous_mode():
+    """True when main() runs the continuous scheduler rather than check_links sweeps"""
+    return os.getenv('TESTING_MODE', 'false').lower() != 'true' and SCHEDULE_MODE == 'continuous'
+
+async def beat_progress():
+    """Tell the health server the event loop is still turning, even while the bot waits"""
+    while True:
+        run_progress.beat()
+        await asyncio.sleep(PROGRESS_BEAT_SECONDS)
+
 def start_health_check_server():
     """Start a simple HTTP server for health checks"""
     port = int(os.getenv('PORT', 10000))
     server_address = ('', port)
     httpd = HTTPServer(server_address, HealthCheckHandler)
-    print(f"Starting health check server on port {port}")
+    log.info("Starting health check server on port %s", port)
     httpd.serve_forever()
 
 async def main():
     """Main execution function"""
-    print("Starting URL checker service...")
+    configure_logging(LOG_LEVEL, LOG_FORMAT)
+    log.info("Starting URL checker service...")
+    init()
     
     # Start the health check server in a separate thread
     health_check_thread = threading.Thread(target=start_health_check_server, daemon=True)
     health_check_thread.start()
-    print("Health check server started")
+    log.info("Health check server started")
+    configure_reason_columns()
+    print_configuration()
     
-    # Give deployment time to stabilize - significantly increased
-    startup_delay = 120  # 2 minutes to ensure full deployment
-    print(f"Waiting {startup_delay} seconds for deployment to fully complete...")
-    await asyncio.sleep(startup_delay)
+    # Profiling hooks: task dumps need the loop, the env options apply from the start
+    profiling.loop = asyncio.get_running_loop()
+    beat_task = asyncio.create_task(beat_progress())  # Keep a reference so the task is not collected
+    if PROFILE_NEXT_RUN:
+        profiling.arm()
+    if TRACEMALLOC_SNAPSHOTS:
+        profiling.start_memory_tracing()
     
-    print("Service started successfully!")
-    print("🚀 URL checker service started - Running initial check...")
+    # Optional delay before the first check - /ready reports readiness, so none is needed by default
+    if STARTUP_DELAY > 0:
+        log.info("Waiting %s seconds before the first check...", STARTUP_DELAY)
+        await asyncio.sleep(STARTUP_DELAY)
     
+    log.info("Service started successfully!")
+    log.info("🚀 URL checker service started - Running initial check...")
+    
+    # docker stop sends SIGTERM: cancel main so the queued Slack messages are still posted below
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await run_forever()
+    finally:
+        await slack.aclose()
+
+async def run_forever():
+    """Run checks in the configured mode until the process is stopped"""
     # Check if we're in testing mode or production mode
     testing_mode = os.getenv('TESTING_MODE', 'false').lower() == 'true'
     
     if testing_mode:
-        print(f"\nRunning in TESTING mode - checking URLs every {CHECK_INTERVAL} seconds")
+        log.info("Running in TESTING mode - checking URLs every %s seconds", CHECK_INTERVAL)
         
         while True:
-            print("\nStarting URL check cycle...")
-            await check_links()
-            print("\nURL check cycle completed.")
+            log.info("Starting URL check cycle...")
+            await profiling.run('check_links', check_links)
+            log.info("URL check cycle completed.")
             await wait_until_next_interval(CHECK_INTERVAL)
+    elif SCHEDULE_MODE == 'continuous':
+        log.info("Running in PRODUCTION mode - continuous scheduler, checking cells as they come due")
+        await run_continuous_scheduler()
     else:
-        print("\nRunning in PRODUCTION mode - checking URLs every 24 hours")
-        
+        log.info("Running in PRODUCTION mode - checking URLs every 24 hours")
+
         while True:
-            print("\nStarting URL check cycle...")
+            log.info("Starting URL check cycle...")
             start_time = time.time()
             
             # Run the check
-            await check_links()
+            await profiling.run('check_links', check_links)
             
             end_time = time.time()
             duration = end_time - start_time
-            print(f"\nURL check cycle completed. Duration: {duration/60/60:.2f} hours")
+            log.info("URL check cycle completed. Duration: %.2f hours", duration / 60 / 60)
             
             # Wait 24 hours from when this run completed
             await wait_for_next_run(hours=24)
 
 if __name__ == "__main__":
-    # Install any missing packages
-    required_packages = [
-        'gspread', 'oauth2client', 'requests', 'pytz', 'python-dotenv', 
-        'beautifulsoup4', 'selenium', 'gspread-formatting'
-    ]
-    
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            print(f"Installing required package: {package}")
-            import subprocess
-            subprocess.check_call(["pip", "install", package])
-    
-    # Run the main function
+    # Dependencies come from requirements.txt (installed in the Docker image)
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Per-URL stage timing traces, written as one JSON line per checked URL, and a summary CLI.
+
+Usage: python url_traces.py TRACE_FILE [--top 10]
+
+Stages: dns, ttfb (connect, TLS and server time, over all redirects), download,
+parse (HTML analysis), navigation (Chrome page load), dom_probe (reading the rendered DOM)
+sheets_wait (Sheets rate limiter) and sheets_write. Time outside all stages is summarized as 'other'.
+"""
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+_current_trace = contextvars.ContextVar('url_trace', default=None)
+
+class UrlTrace:
+    """Stage durations and result fields of one URL check"""
+
+    def __init__(self, url, **fields):
+        self.url = url
+        self.started = time.monotonic()
+        self.stages = defaultdict(float)
+        self.fields = dict(fields)
+
+    def add(self, stage, seconds):
+        self.stages[stage] += seconds
+
+    def to_record(self):
+        return {
+            'ts': round(time.time(), 3),
+            'url': self.url,
+            'total': round(time.monotonic() - self.started, 4),
+            'stages': {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            **self.fields,
+        }
+
+class TraceSink:
+    """Appends trace records to a JSONL file; safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+class TeeSink:
+    """Passes each record to several sinks, e.g. the trace file and the result history"""
+
+    def __init__(self, *sinks):
+        self.sinks = [sink for sink in sinks if sink is not None]
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+@contextmanager
+def url_trace(sink, url, **fields):
+    """Trace the URL check running inside the block; written to sink when the block exits"""
+    trace = UrlTrace(url, **fields)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        sink.write(trace.to_record())
+
+@contextmanager
+def trace_stage(stage):
+    """Add the block's duration to a stage of the current trace, if there is one"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.monotonic() - started)
+
+def add_stage_time(stage, seconds):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+def annotate_trace(**fields):
+    """Set result fields (tier, redirects, ...) on the current trace, if there is one"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+def tracing():
+    return _current_trace.get() is not None
+
+def load_traces(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(records, top=10):
+    """Text report of the slowest URLs, domains and stages"""
+    lines = [f"{len(records)} traced URLs, {sum(r.get('total', 0) for r in records) / 3600:.2f} hours in total"]
+
+    lines.append("\nSlowest URLs:")
+    for record in sorted(records, key=lambda r: r.get('total', 0), reverse=True)[:top]:
+        slowest_stage = max(record.get('stages', {}).items(), key=lambda item: item[1], default=('-', 0))
+        lines.append(f"  {record.get('total', 0):8.2f}s  {record.get('tier', '-'):8}  "
+                     f"{slowest_stage[0]} {slowest_stage[1]:.2f}s  {record['url']}")
+
+    domains = defaultdict(lambda: [0, 0.0])
+    for record in records:
+        domain = domains[(urlparse(record['url']).hostname or '').lower()]
+        domain[0] += 1
+        domain[1] += record.get('total', 0)
+    lines.append("\nSlowest domains (total time):")
+    for domain, (count, total) in sorted(domains.items(), key=lambda item: item[1][1], reverse=True)[:top]:
+        lines.append(f"  {total:8.2f}s  {count:5} URLs  {total / count:6.2f}s avg  {domain}")
+
+    stages = defaultdict(list)
+    for record in records:
+        for stage, seconds in record.get('stages', {}).items():
+            stages[stage].append(seconds)
+        # Time outside any stage: pauses, retries, classification
+        stages['other'].append(max(0.0, record.get('total', 0) - sum(record.get('stages', {}).values())))
+    lines.append("\nStages:")
+    for stage, values in sorted(stages.items(), key=lambda item: sum(item[1]), reverse=True):
+        values.sort()
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        lines.append(f"  {stage:12} {sum(values):9.2f}s total  {sum(values) / len(values):6.2f}s avg  "
+                     f"{p95:6.2f}s p95  ({len(values)} URLs)")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a URL trace file (TRACE_FILE)")
+    parser.add_argument('trace_file')
+    parser.add_argument('--top', type=int, default=10, help="Rows per table")
+    args = parser.parse_args()
+    if not os.path.exists(args.trace_file):
+        parser.error(f"{args.trace_file} does not exist")
+    print(summarize(load_traces(args.trace_file), args.top))
+
+if __name__ == '__main__':
+    main()